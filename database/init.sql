@@ -355,6 +355,26 @@ CREATE TABLE IF NOT EXISTS lab_results (
 CREATE INDEX IF NOT EXISTS idx_lab_results_subject ON lab_results(subject_id);
 CREATE INDEX IF NOT EXISTS idx_lab_results_visit ON lab_results(visit_name);
 
+-- 17. RBQM KRI Daily Rollups (materialized by analytics-service)
+CREATE TABLE IF NOT EXISTS rbqm_kri_daily (
+    rollup_date DATE NOT NULL,
+    site_id VARCHAR(50) NOT NULL,
+
+    -- Raw counts so any period can be re-aggregated exactly
+    vitals_rows INTEGER DEFAULT 0,
+    late_entries INTEGER DEFAULT 0,       -- entered >72h after measurement
+    total_queries INTEGER DEFAULT 0,
+    ae_queries INTEGER DEFAULT 0,
+    ae_queries_on_time INTEGER DEFAULT 0, -- 24h critical / 7d otherwise
+    subjects_screened INTEGER DEFAULT 0,
+    screen_failures INTEGER DEFAULT 0,
+
+    refreshed_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (rollup_date, site_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rbqm_kri_daily_site ON rbqm_kri_daily(site_id, rollup_date);
+
 -- ============= FUNCTIONS & TRIGGERS =============
 
 -- Auto-update timestamp function
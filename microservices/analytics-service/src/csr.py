@@ -1,27 +1,76 @@
 """
 Clinical Study Report (CSR) generation functions
 Extracted from existing monolithic app.py
+
+Efficacy and safety tables are cached per dataset hash and the report is
+rendered from one precompiled template, so regenerating CSRs across
+parameter sweeps only re-renders.
 """
+import os
 import pandas as pd
 from datetime import datetime
-from typing import Dict, Optional
+from string import Template
+from typing import Any, Dict, List, Optional
 
+from reference_cache import LRUCache, dataset_fingerprint
+from stats import calculate_week12_statistics
 
-def generate_csr_draft(stats: Dict, ae_df: Optional[pd.DataFrame], n_rows: int) -> str:
-    """
-    Generate CSR draft markdown
+_CSR_TEMPLATE = Template("\n".join([
+    "# CSR Draft (Auto) — $report_date",
+    "",
+    "## 9. Efficacy — Primary Endpoint",
+    "**Endpoint:** Systolic Blood Pressure at Week 12 (Active − Placebo).",
+    "**Analysis set:** N≈$n_rows rows of vitals across visits; "
+    "Week-12 subsets: n(Active)=$n_active, n(Placebo)=$n_placebo.",
+    "**Results:** mean(SBP)_Active=$mean_active mmHg; "
+    "mean(SBP)_Placebo=$mean_placebo mmHg.",
+    "**Effect:** $effect mmHg "
+    "(SE=$se); **p**=$ptxt (Welch t-test or normal approx).",
+    "",
+    "## 10. Safety",
+    "Serious & related AEs: **$serious_related**; Fatal outcomes: **$fatal**.",
+    "Common events included constitutional symptoms and laboratory abnormalities "
+    "consistent with the therapeutic area. No unexpected safety signals were observed "
+    "in this synthetic demonstration dataset.",
+    "",
+    "## 11. Data Handling & Quality",
+    "- Edit checks enforced: value ranges, visit completeness, SubjectID regex, "
+    "treatment-arm constancy, unique SubjectID+VisitName.",
+    "- Auto-repair applied for mild violations (clipping ranges, enforcing fever HR link, "
+    "Week-12 effect alignment).",
+    "- Dataset validated post-repair; see `checks/validation_report.md`.",
+    "",
+    "> **Note:** Dataset is synthetic for development/demo only; not for clinical decision-making."
+]))
 
-    Args:
-        stats: Statistical analysis results (Week 12)
-        ae_df: Adverse events DataFrame
-        n_rows: Total number of vitals rows
+# Efficacy/safety tables keyed by dataset fingerprint
+csr_table_cache = LRUCache(maxsize=int(os.getenv("CSR_TABLE_CACHE_SIZE", "64")))
 
-    Returns:
-        CSR markdown string
+
+def efficacy_table(stats: Dict[str, Any]) -> Dict[str, Any]:
     """
-    pval = stats.get("p_value_two_sided")
-    ptxt = f"{pval:.3g}" if pval == pval else "n/a"  # Check for NaN
+    Flat efficacy fields used by the CSR
 
+    Accepts either the flat keys (n_active, mean_active, ...,
+    p_value_two_sided) or the nested /stats/week12 response.
+    """
+    if "treatment_groups" not in stats:
+        return stats
+    groups = stats["treatment_groups"]
+    effect = stats.get("treatment_effect", {})
+    return {
+        "n_active": groups["Active"]["n"],
+        "n_placebo": groups["Placebo"]["n"],
+        "mean_active": groups["Active"]["mean_systolic"],
+        "mean_placebo": groups["Placebo"]["mean_systolic"],
+        "diff_active_minus_placebo": effect.get("difference"),
+        "se": effect.get("se_difference"),
+        "p_value_two_sided": effect.get("p_value")
+    }
+
+
+def safety_table(ae_df: Optional[pd.DataFrame]) -> Dict[str, int]:
+    """Serious & related and fatal AE counts"""
     fatal = 0
     sr = 0
     if isinstance(ae_df, pd.DataFrame) and not ae_df.empty:
@@ -29,44 +78,110 @@ def generate_csr_draft(stats: Dict, ae_df: Optional[pd.DataFrame], n_rows: int)
             fatal = int((ae_df["AEOUT"] == "FATAL").sum())
         if set(["AESER", "AEREL"]).issubset(ae_df.columns):
             sr = int(((ae_df["AESER"] == "Y") & (ae_df["AEREL"] == "Y")).sum())
+    return {"serious_related": sr, "fatal": fatal}
 
-    lines = []
-    lines.append(f"# CSR Draft (Auto) — {datetime.utcnow().date().isoformat()}")
-    lines.append("")
-    lines.append("## 9. Efficacy — Primary Endpoint")
-    lines.append("**Endpoint:** Systolic Blood Pressure at Week 12 (Active − Placebo).")
-    lines.append(
-        f"**Analysis set:** N≈{n_rows} rows of vitals across visits; "
-        f"Week-12 subsets: n(Active)={stats.get('n_active')}, n(Placebo)={stats.get('n_placebo')}."
-    )
-    lines.append(
-        f"**Results:** mean(SBP)_Active={stats.get('mean_active'):.1f} mmHg; "
-        f"mean(SBP)_Placebo={stats.get('mean_placebo'):.1f} mmHg."
-    )
-    lines.append(
-        f"**Effect:** {stats.get('diff_active_minus_placebo'):+.2f} mmHg "
-        f"(SE={stats.get('se'):.2f}); **p**={ptxt} (Welch t-test or normal approx)."
-    )
-    lines.append("")
-    lines.append("## 10. Safety")
-    lines.append(f"Serious & related AEs: **{sr}**; Fatal outcomes: **{fatal}**.")
-    lines.append(
-        "Common events included constitutional symptoms and laboratory abnormalities "
-        "consistent with the therapeutic area. No unexpected safety signals were observed "
-        "in this synthetic demonstration dataset."
-    )
-    lines.append("")
-    lines.append("## 11. Data Handling & Quality")
-    lines.append(
-        "- Edit checks enforced: value ranges, visit completeness, SubjectID regex, "
-        "treatment-arm constancy, unique SubjectID+VisitName."
-    )
-    lines.append(
-        "- Auto-repair applied for mild violations (clipping ranges, enforcing fever HR link, "
-        "Week-12 effect alignment)."
+
+def cached_efficacy_table(vitals_df: pd.DataFrame) -> Dict[str, Any]:
+    """Week-12 efficacy table for a vitals dataset, cached by content hash"""
+    key = "efficacy:" + dataset_fingerprint(vitals_df)
+    table = csr_table_cache.get(key)
+    if table is None:
+        table = {**efficacy_table(calculate_week12_statistics(vitals_df)), "n_rows": len(vitals_df)}
+        csr_table_cache.put(key, table)
+    return table
+
+
+def cached_safety_table(ae_df: Optional[pd.DataFrame]) -> Dict[str, int]:
+    """AE safety counts for an AE dataset, cached by content hash"""
+    if not isinstance(ae_df, pd.DataFrame) or ae_df.empty:
+        return safety_table(None)
+    key = "safety:" + dataset_fingerprint(ae_df)
+    table = csr_table_cache.get(key)
+    if table is None:
+        table = safety_table(ae_df)
+        csr_table_cache.put(key, table)
+    return table
+
+
+def render_csr(efficacy: Dict[str, Any], safety: Dict[str, int], n_rows: int,
+               report_date: Optional[str] = None) -> str:
+    """
+    Render the CSR markdown from efficacy and safety tables
+
+    Args:
+        efficacy: Flat efficacy fields (see efficacy_table)
+        safety: Safety counts (see safety_table)
+        n_rows: Total number of vitals rows
+        report_date: ISO date for the title (default: today, UTC)
+
+    Returns:
+        CSR markdown string
+    """
+    pval = efficacy.get("p_value_two_sided")
+    ptxt = f"{pval:.3g}" if pval == pval and pval is not None else "n/a"  # Check for NaN
+
+    return _CSR_TEMPLATE.substitute(
+        report_date=report_date or datetime.utcnow().date().isoformat(),
+        n_rows=n_rows,
+        n_active=efficacy.get("n_active"),
+        n_placebo=efficacy.get("n_placebo"),
+        mean_active=f"{efficacy.get('mean_active'):.1f}",
+        mean_placebo=f"{efficacy.get('mean_placebo'):.1f}",
+        effect=f"{efficacy.get('diff_active_minus_placebo'):+.2f}",
+        se=f"{efficacy.get('se'):.2f}",
+        ptxt=ptxt,
+        serious_related=safety["serious_related"],
+        fatal=safety["fatal"]
     )
-    lines.append("- Dataset validated post-repair; see `checks/validation_report.md`.")
-    lines.append("")
-    lines.append("> **Note:** Dataset is synthetic for development/demo only; not for clinical decision-making.")
 
-    return "\n".join(lines)
+
+def generate_csr_draft(stats: Dict, ae_df: Optional[pd.DataFrame], n_rows: int) -> str:
+    """
+    Generate CSR draft markdown
+
+    Args:
+        stats: Statistical analysis results (Week 12), flat or as returned
+            by /stats/week12
+        ae_df: Adverse events DataFrame
+        n_rows: Total number of vitals rows
+
+    Returns:
+        CSR markdown string
+    """
+    return render_csr(efficacy_table(stats), safety_table(ae_df), n_rows)
+
+
+def generate_csr_batch(variants: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Render CSRs for many study variants
+
+    Each variant gives either precomputed statistics (+ n_rows) or a vitals
+    DataFrame, plus an optional AE DataFrame. Tables for datasets shared
+    between variants are computed once (and cached across calls).
+
+    Args:
+        variants: Dicts with name, and statistics/n_rows or vitals_df,
+            optional ae_df
+
+    Returns:
+        [{"name", "csr_markdown"}] in input order
+    """
+    report_date = datetime.utcnow().date().isoformat()
+    rendered = []
+    for i, variant in enumerate(variants):
+        if variant.get("vitals_df") is not None:
+            efficacy = cached_efficacy_table(variant["vitals_df"])
+            n_rows = variant.get("n_rows") or efficacy["n_rows"]
+        elif variant.get("statistics") is not None:
+            efficacy = efficacy_table(variant["statistics"])
+            n_rows = variant.get("n_rows")
+            if n_rows is None:
+                raise ValueError(f"Variant {i}: n_rows required with statistics")
+        else:
+            raise ValueError(f"Variant {i}: statistics or vitals data required")
+        safety = cached_safety_table(variant.get("ae_df"))
+        rendered.append({
+            "name": variant.get("name") or f"variant_{i + 1}",
+            "csr_markdown": render_csr(efficacy, safety, n_rows, report_date)
+        })
+    return rendered
@@ -0,0 +1,306 @@
+"""
+Group-sequential interim analysis
+Lan-DeMets alpha-spending boundaries (O'Brien-Fleming or Pocock type) for
+the Week-12 SBP comparison, applied to accumulating trial data or to
+thousands of simulated trials at once
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+SPENDING_FUNCTIONS = ("obrien_fleming", "pocock")
+DEFAULT_INFORMATION_FRACTIONS = (0.25, 0.5, 0.75, 1.0)
+
+# Simulation defaults: pilot Week-12 SBP (placebo) and the generators'
+# default target effect
+DEFAULT_PLACEBO_MEAN = 132.6
+DEFAULT_SD = 15.0
+DEFAULT_EFFECT = -5.0
+SBP_RANGE = (95, 200)
+
+# Replicates per simulated chunk; each chunk has its own child seed
+SIM_CHUNK = 1000
+# Grid points per look for the boundary recursion
+_GRID_POINTS = 401
+
+
+def alpha_spent(t: np.ndarray, alpha: float, spending: str) -> np.ndarray:
+    """
+    Cumulative two-sided alpha spent at information fractions t
+
+    Boundaries are symmetric: each side spends alpha/2 through the
+    one-sided spending function.
+    """
+    from scipy import stats as sps
+
+    t = np.asarray(t, dtype=float)
+    if spending == "obrien_fleming":
+        return 2 * (2.0 - 2.0 * sps.norm.cdf(sps.norm.ppf(1 - alpha / 4) / np.sqrt(t)))
+    if spending == "pocock":
+        return alpha * np.log(1 + (np.e - 1) * t)
+    raise ValueError(f"spending must be one of: {', '.join(SPENDING_FUNCTIONS)}")
+
+
+def validate_information_fractions(fractions: Sequence[float]) -> np.ndarray:
+    t = np.asarray(fractions, dtype=float)
+    if t.ndim != 1 or len(t) == 0:
+        raise ValueError("At least one information fraction is required")
+    if (t <= 0).any() or (t > 1).any() or (np.diff(t) <= 0).any():
+        raise ValueError("Information fractions must be increasing in (0, 1]")
+    if t[-1] != 1.0:
+        raise ValueError("The last information fraction must be 1.0")
+    return t
+
+
+def spending_boundaries(information_fractions: Sequence[float] = DEFAULT_INFORMATION_FRACTIONS,
+                        alpha: float = 0.05, spending: str = "obrien_fleming") -> Dict[str, Any]:
+    """
+    Two-sided Z boundaries from a Lan-DeMets spending function
+
+    The score process S_k = Z_k * sqrt(t_k) has independent N(0, dt)
+    increments under H0. Its sub-density on the continuation region is
+    carried forward look by look on a grid (trapezoid rule), and each
+    boundary is solved so the crossing probability equals the alpha
+    newly spent at that look.
+
+    Args:
+        information_fractions: Increasing fractions ending at 1.0
+        alpha: Overall two-sided type I error
+        spending: obrien_fleming or pocock
+
+    Returns:
+        Dict with z_boundaries, nominal_p and cumulative alpha_spent
+    """
+    from scipy import stats as sps
+    from scipy.optimize import brentq
+
+    t = validate_information_fractions(information_fractions)
+    spent = alpha_spent(t, alpha, spending)
+    norm = sps.norm
+
+    bounds = np.empty(len(t))
+    bounds[0] = norm.isf(spent[0] / 2)
+    grid = np.linspace(-bounds[0], bounds[0], _GRID_POINTS) * np.sqrt(t[0])
+    dens = norm.pdf(grid, scale=np.sqrt(t[0]))
+
+    for k in range(1, len(t)):
+        sigma = np.sqrt(t[k] - t[k - 1])
+        h = grid[1] - grid[0]
+        w = np.full(len(grid), h)
+        w[[0, -1]] = h / 2
+        mass = w * dens
+
+        def crossing(b):
+            edge = b * np.sqrt(t[k])
+            return np.sum(mass * (norm.cdf((-edge - grid) / sigma) + norm.sf((edge - grid) / sigma)))
+
+        target = spent[k] - spent[k - 1]
+        bounds[k] = brentq(lambda b: crossing(b) - target, 1e-6, 40.0) if target > 0 else np.inf
+
+        # Carry the continuation sub-density to the next look
+        half = min(bounds[k], 8.0) * np.sqrt(t[k])
+        new_grid = np.linspace(-half, half, _GRID_POINTS)
+        dens = norm.pdf((new_grid[:, None] - grid[None, :]) / sigma) @ mass / sigma
+        grid = new_grid
+
+    return {
+        "information_fractions": t.tolist(),
+        "z_boundaries": bounds,
+        "nominal_p": 2 * norm.sf(bounds),
+        "alpha_spent": spent
+    }
+
+
+def _look_statistics(active: np.ndarray, placebo: np.ndarray,
+                     looks_active: np.ndarray, looks_placebo: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Welch difference, SE and Z at every look from running sums
+
+    Args:
+        active, placebo: (r, n) outcomes in enrollment order
+        looks_active, looks_placebo: Subjects per arm at each look
+
+    Returns:
+        Dict of (r, looks) arrays: difference, se, z
+    """
+    def moments(x, n):
+        s = np.cumsum(x, axis=1)[:, n - 1]
+        ss = np.cumsum(x * x, axis=1)[:, n - 1]
+        mean = s / n
+        var = np.maximum(ss - n * mean ** 2, 0.0) / np.maximum(n - 1, 1)
+        return mean, var
+
+    m1, v1 = moments(active, looks_active)
+    m2, v2 = moments(placebo, looks_placebo)
+    diff = m1 - m2
+    se = np.sqrt(v1 / looks_active + v2 / looks_placebo)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(se > 0, diff / se, np.nan)
+    return {"difference": diff, "se": se, "z": z}
+
+
+def _look_sizes(n: int, t: np.ndarray) -> np.ndarray:
+    return np.maximum(np.ceil(t * n - 1e-9).astype(int), 2)
+
+
+def _design_table(design: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "look": k + 1,
+            "information_fraction": round(float(frac), 4),
+            "z_boundary": round(float(b), 4) if np.isfinite(b) else None,
+            "nominal_p": round(float(p), 6),
+            "alpha_spent": round(float(a), 6)
+        }
+        for k, (frac, b, p, a) in enumerate(zip(design["information_fractions"], design["z_boundaries"],
+                                                design["nominal_p"], design["alpha_spent"]))
+    ]
+
+
+def interim_analysis(df: pd.DataFrame,
+                     information_fractions: Sequence[float] = DEFAULT_INFORMATION_FRACTIONS,
+                     alpha: float = 0.05, spending: str = "obrien_fleming",
+                     order_col: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Evaluate accumulating Week-12 SBP data at each interim look
+
+    Subjects enter each look in enrollment order (order_col, else row
+    order); look k uses the first ceil(t_k * n) Week-12 subjects of each
+    arm. The statistic is the Welch difference Active - Placebo over its
+    SE, as in calculate_week12_statistics, compared with the boundary.
+
+    Args:
+        df: Vitals DataFrame
+        information_fractions: Increasing fractions ending at 1.0
+        alpha: Overall two-sided type I error
+        spending: obrien_fleming or pocock
+        order_col: Column giving enrollment order (e.g. a randomization date)
+
+    Returns:
+        Dict with the boundary table, per-look statistics and the look at
+        which the trial would have stopped (None if it runs to completion
+        without crossing)
+    """
+    design = spending_boundaries(information_fractions, alpha, spending)
+    t = np.asarray(design["information_fractions"])
+
+    wk12 = df[df["VisitName"] == "Week 12"].copy()
+    if wk12.empty:
+        raise ValueError("No Week 12 data found")
+    if order_col:
+        wk12 = wk12.sort_values(order_col, kind="stable")
+    wk12["SystolicBP"] = pd.to_numeric(wk12["SystolicBP"], errors="coerce")
+    active = wk12.loc[wk12["TreatmentArm"] == "Active", "SystolicBP"].dropna().to_numpy(dtype=float)
+    placebo = wk12.loc[wk12["TreatmentArm"] == "Placebo", "SystolicBP"].dropna().to_numpy(dtype=float)
+    if len(active) < 2 or len(placebo) < 2:
+        raise ValueError("Insufficient data for both arms at Week 12")
+
+    n_a, n_p = _look_sizes(len(active), t), _look_sizes(len(placebo), t)
+    looks = _look_statistics(active[None, :], placebo[None, :], n_a, n_p)
+
+    rows, stopped_at = [], None
+    for k, row in enumerate(_design_table(design)):
+        z = float(looks["z"][0, k])
+        crossed = bool(np.isfinite(z) and abs(z) >= design["z_boundaries"][k])
+        if crossed and stopped_at is None:
+            stopped_at = k + 1
+        rows.append({
+            **row,
+            "n_active": int(n_a[k]),
+            "n_placebo": int(n_p[k]),
+            "difference": round(float(looks["difference"][0, k]), 3),
+            "se": round(float(looks["se"][0, k]), 3),
+            "z": round(z, 3) if np.isfinite(z) else None,
+            "crossed": crossed
+        })
+
+    return {
+        "spending": spending,
+        "alpha": alpha,
+        "looks": rows,
+        "stopped_at_look": stopped_at,
+        "reject_null": stopped_at is not None
+    }
+
+
+def simulate_group_sequential(n_per_arm: int = 100, effect: float = DEFAULT_EFFECT,
+                              placebo_mean: float = DEFAULT_PLACEBO_MEAN, sd: float = DEFAULT_SD,
+                              information_fractions: Sequence[float] = DEFAULT_INFORMATION_FRACTIONS,
+                              alpha: float = 0.05, spending: str = "obrien_fleming",
+                              n_sims: int = 10_000, seed: int = 42) -> Dict[str, Any]:
+    """
+    Operating characteristics of a group-sequential design by simulation
+
+    Week-12 SBP is drawn per arm (rounded and clipped like the generators)
+    for a block of simulated trials at once. Running sums over subjects
+    give every look's statistic by indexing, so each look costs O(1) per
+    trial instead of recomputing from scratch.
+
+    Args:
+        n_per_arm: Subjects per arm at the final look
+        effect: True Active - Placebo difference (0 for type I error)
+        placebo_mean: Placebo Week-12 SBP mean
+        sd: Week-12 SBP standard deviation (both arms)
+        information_fractions: Increasing fractions ending at 1.0
+        alpha: Overall two-sided type I error
+        spending: obrien_fleming or pocock
+        n_sims: Number of simulated trials
+        seed: Random seed
+
+    Returns:
+        Dict with the boundary table, stopping probabilities per look,
+        rejection rate, expected sample size and the fixed-design
+        rejection rate on the same trials
+    """
+    design = spending_boundaries(information_fractions, alpha, spending)
+    t = np.asarray(design["information_fractions"])
+    bounds = design["z_boundaries"]
+    n_looks = _look_sizes(n_per_arm, t)
+    lo, hi = SBP_RANGE
+
+    stop_look = np.empty(n_sims, dtype=np.int64)
+    estimate = np.empty(n_sims)
+    final_z = np.empty(n_sims)
+    seeds = np.random.SeedSequence(seed).spawn(-(-n_sims // SIM_CHUNK))
+    for c, child in enumerate(seeds):
+        start = c * SIM_CHUNK
+        r = min(SIM_CHUNK, n_sims - start)
+        rng = np.random.default_rng(child)
+        active = np.clip(np.round(rng.normal(placebo_mean + effect, sd, size=(r, n_per_arm))), lo, hi)
+        placebo = np.clip(np.round(rng.normal(placebo_mean, sd, size=(r, n_per_arm))), lo, hi)
+        looks = _look_statistics(active, placebo, n_looks, n_looks)
+
+        crossed = np.abs(np.nan_to_num(looks["z"])) >= bounds
+        # First crossing look, or len(t) when the trial never stops early
+        first = np.where(crossed.any(axis=1), crossed.argmax(axis=1), len(t))
+        stop_look[start:start + r] = first
+        at = np.minimum(first, len(t) - 1)
+        estimate[start:start + r] = looks["difference"][np.arange(r), at]
+        final_z[start:start + r] = looks["z"][:, -1]
+
+    from scipy import stats as sps
+
+    stops = np.bincount(stop_look, minlength=len(t) + 1)[:len(t)] / n_sims
+    rejected = stop_look < len(t)
+    n_used = n_looks[np.minimum(stop_look, len(t) - 1)]
+    fixed_reject = np.abs(np.nan_to_num(final_z)) >= sps.norm.isf(alpha / 2)
+
+    table = _design_table(design)
+    for k, row in enumerate(table):
+        row["n_per_arm"] = int(n_looks[k])
+        row["stop_probability"] = round(float(stops[k]), 4)
+        row["cumulative_rejection"] = round(float(stops[:k + 1].sum()), 4)
+
+    return {
+        "spending": spending,
+        "alpha": alpha,
+        "n_sims": int(n_sims),
+        "seed": int(seed),
+        "effect": effect,
+        "looks": table,
+        "rejection_rate": round(float(rejected.mean()), 4),
+        "fixed_design_rejection_rate": round(float(fixed_reject.mean()), 4),
+        "expected_n_per_arm": round(float(n_used.mean()), 2),
+        "mean_estimate_at_stop": round(float(estimate.mean()), 3)
+    }
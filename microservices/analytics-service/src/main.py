@@ -4,23 +4,51 @@ Handles statistics, RBQM, CSR generation, SDTM export
 """
 from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, date, timedelta
 import uvicorn
 import os
+import shutil
+import tempfile
+import asyncio
+import functools
+import logging
 
 from stats import (
     calculate_week12_statistics,
     calculate_recist_orr,
-    ks_distance
+    bootstrap_treatment_effect,
+    ks_distance,
+    BOOTSTRAP_METHODS
+)
+from mmrm import fit_mmrm
+from group_sequential import (
+    interim_analysis, simulate_group_sequential, validate_information_fractions,
+    SPENDING_FUNCTIONS, DEFAULT_INFORMATION_FRACTIONS,
+    DEFAULT_PLACEBO_MEAN, DEFAULT_SD, DEFAULT_EFFECT
 )
 from rbqm import generate_rbqm_summary
-from csr import generate_csr_draft
-from sdtm import export_to_sdtm_vs
+from rbqm_trends import refresh_kri_rollups, fetch_kri_trends, fetch_kri_totals
+from csr import generate_csr_batch
+from sdtm import export_to_sdtm_vs, write_sdtm_vs, write_sdtm_package, EXPORT_FORMATS
+from streaming_quality import create_session, get_session, close_session
+from quality import (
+    compute_pca_comparison, compute_comprehensive_quality, compute_distribution_distances,
+    QUALITY_METRICS
+)
+from reference_cache import (
+    get_reference, register_reference, resolve_reference,
+    unregister_reference, list_references, reference_cache_stats
+)
+from response_cache import cached_response, response_cache
 from db_utils import db, cache, startup_db, shutdown_db
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(
     title="Analytics Service",
     description="Clinical Trial Analytics, RBQM, CSR, and SDTM Export",
@@ -99,6 +127,84 @@ class StatisticsResponse(BaseModel):
     treatment_effect: TreatmentEffect
     interpretation: Interpretation
 
+class MMRMRequest(BaseModel):
+    vitals_data: List[Dict[str, Any]]
+    baseline_visit: str = Field(default="Day 1", description="Visit used as baseline")
+    replicate_column: Optional[str] = Field(default=None, description="Column identifying simulation replicates (one fit per replicate)")
+    max_iter: int = Field(default=50, ge=1, le=500)
+
+class MMRMResponse(BaseModel):
+    baseline_visit: str
+    post_visits: List[str]
+    iterations: int
+    converged: bool
+    results: List[Dict[str, Any]] = Field(..., description="Per replicate: LS means, Active - Placebo contrasts, covariance")
+
+class BootstrapRequest(BaseModel):
+    vitals_data: List[Dict[str, Any]]
+    n_boot: int = Field(default=10000, ge=100, le=1_000_000, description="Bootstrap replicates")
+    method: str = Field(default="percentile", description="percentile or bca")
+    confidence: float = Field(default=0.95, gt=0, lt=1)
+    seed: int = Field(default=42)
+    chunk_size: Optional[int] = Field(default=None, ge=1, description="Replicates per vectorized chunk, at most 64 (default: fit max_memory_mb)")
+    max_memory_mb: float = Field(default=256.0, gt=0, le=4096)
+
+class BootstrapResponse(BaseModel):
+    method: str
+    n_boot: int
+    seed: int
+    confidence: float
+    chunk_size: int
+    n_active: int
+    n_placebo: int
+    estimate: float
+    bootstrap_se: float
+    bias: float
+    ci_lower: float
+    ci_upper: float
+    normal_ci_lower: Optional[float] = None
+    normal_ci_upper: Optional[float] = None
+    z0: Optional[float] = None
+    acceleration: Optional[float] = None
+
+class InterimAnalysisRequest(BaseModel):
+    vitals_data: List[Dict[str, Any]]
+    information_fractions: List[float] = Field(default=list(DEFAULT_INFORMATION_FRACTIONS), description="Increasing look fractions ending at 1.0")
+    alpha: float = Field(default=0.05, gt=0, lt=1, description="Overall two-sided type I error")
+    spending: str = Field(default="obrien_fleming", description="obrien_fleming or pocock")
+    order_column: Optional[str] = Field(default=None, description="Enrollment order column (default: row order)")
+
+class InterimAnalysisResponse(BaseModel):
+    spending: str
+    alpha: float
+    looks: List[Dict[str, Any]] = Field(..., description="Per look: boundary, subjects per arm, difference, SE, Z, crossed")
+    stopped_at_look: Optional[int] = None
+    reject_null: bool
+
+class GroupSequentialSimulationRequest(BaseModel):
+    n_per_arm: int = Field(default=100, ge=4, le=20000, description="Subjects per arm at the final look")
+    effect: float = Field(default=DEFAULT_EFFECT, description="True Active - Placebo SBP difference")
+    placebo_mean: Optional[float] = Field(default=None, description=f"Placebo Week-12 SBP mean (default: vitals_data or {DEFAULT_PLACEBO_MEAN})")
+    sd: Optional[float] = Field(default=None, gt=0, description=f"Week-12 SBP SD (default: vitals_data or {DEFAULT_SD})")
+    vitals_data: Optional[List[Dict[str, Any]]] = Field(default=None, description="Pilot vitals to estimate placebo mean and SD from")
+    information_fractions: List[float] = Field(default=list(DEFAULT_INFORMATION_FRACTIONS), description="Increasing look fractions ending at 1.0")
+    alpha: float = Field(default=0.05, gt=0, lt=1)
+    spending: str = Field(default="obrien_fleming", description="obrien_fleming or pocock")
+    n_sims: int = Field(default=10000, ge=100, le=200000, description="Simulated trials")
+    seed: int = Field(default=42)
+
+class GroupSequentialSimulationResponse(BaseModel):
+    spending: str
+    alpha: float
+    n_sims: int
+    seed: int
+    effect: float
+    looks: List[Dict[str, Any]] = Field(..., description="Per look: boundary, stop probability, cumulative rejection")
+    rejection_rate: float
+    fixed_design_rejection_rate: float
+    expected_n_per_arm: float
+    mean_estimate_at_stop: float
+
 class RECISTRequest(BaseModel):
     vitals_data: List[Dict[str, Any]]
     p_active: float = Field(default=0.35, ge=0, le=1)
@@ -118,20 +224,47 @@ class RBQMRequest(BaseModel):
     ae_data: Optional[List[Dict[str, Any]]] = None
     thresholds: Dict[str, float] = Field(default={"q_rate_site": 6.0, "missing_subj": 3, "serious_related": 5})
     site_size: int = Field(default=20)
+    use_db_kris: bool = Field(default=False, description="Use database KRI rollups instead of demo placeholders")
+    kri_window_days: int = Field(default=30, ge=1, le=3650, description="Rollup window for database KRIs")
 
 class RBQMResponse(BaseModel):
     summary_markdown: str
     site_summary: List[Dict[str, Any]]
     kris: Dict[str, Any]
 
+class KRIRefreshRequest(BaseModel):
+    start_date: date
+    end_date: date
+    late_entry_hours: int = Field(default=72, ge=1, le=24 * 30)
+
+class KRIRefreshResponse(BaseModel):
+    start_date: date
+    end_date: date
+    rollup_rows: int
+
+class KRITrendResponse(BaseModel):
+    granularity: str
+    site_id: Optional[str]
+    series: List[Dict[str, Any]]
+
 class CSRRequest(BaseModel):
-    statistics: Dict[str, Any]
+    statistics: Optional[Dict[str, Any]] = Field(default=None, description="Week-12 statistics (flat or /stats/week12 response)")
+    vitals_data: Optional[List[Dict[str, Any]]] = Field(default=None, description="Vitals to compute (and cache) statistics from, instead of statistics")
     ae_data: Optional[List[Dict[str, Any]]] = None
-    n_rows: int
+    n_rows: Optional[int] = Field(default=None, description="Total vitals rows (defaults to len(vitals_data))")
 
 class CSRResponse(BaseModel):
     csr_markdown: str
 
+class CSRVariant(CSRRequest):
+    name: Optional[str] = None
+
+class CSRBatchRequest(BaseModel):
+    variants: List[CSRVariant] = Field(..., min_length=1, description="Study variants to render")
+
+class CSRBatchResponse(BaseModel):
+    reports: List[Dict[str, str]] = Field(..., description="[{name, csr_markdown}] in request order")
+
 class SDTMRequest(BaseModel):
     vitals_data: List[Dict[str, Any]]
 
@@ -139,30 +272,106 @@ class SDTMResponse(BaseModel):
     sdtm_data: List[Dict[str, Any]]
     rows: int
 
+class SDTMFileRequest(BaseModel):
+    vitals_data: List[Dict[str, Any]]
+    format: str = Field(default="csv", description="csv, xpt or parquet")
+    chunk_size: int = Field(default=250_000, ge=1000, description="Input rows per write chunk")
+
+class SDTMPackageRequest(BaseModel):
+    vitals_data: Optional[List[Dict[str, Any]]] = Field(default=None, description="Vitals -> VS")
+    demographics_data: Optional[List[Dict[str, Any]]] = Field(default=None, description="generate_demographics output -> DM")
+    labs_data: Optional[List[Dict[str, Any]]] = Field(default=None, description="generate_labs output -> LB")
+    ae_data: Optional[List[Dict[str, Any]]] = Field(default=None, description="generate_oncology_ae output -> AE")
+    format: str = Field(default="xpt", description="xpt, parquet or csv")
+    chunk_size: int = Field(default=250_000, ge=1000, description="Source rows per write chunk")
+
 class PCAComparisonRequest(BaseModel):
-    original_data: List[Dict[str, Any]] = Field(..., description="Original/pilot data")
+    original_data: Optional[List[Dict[str, Any]]] = Field(default=None, description="Original/pilot data")
+    reference_id: Optional[str] = Field(default=None, description="Registered reference set (instead of original_data)")
     synthetic_data: List[Dict[str, Any]] = Field(..., description="Synthetic data to compare")
+    output: str = Field(default="points", description="points or density (2D binned counts)")
+    max_points: Optional[int] = Field(default=None, ge=100, description="Per-dataset cap on returned points (stratified subsample)")
+    bins: int = Field(default=50, ge=5, le=500, description="Bins per axis for density output")
+    solver: str = Field(default="auto", description="PCA solver: auto, full, randomized or incremental")
+    seed: int = Field(default=42)
+    basis: str = Field(default="combined", description="combined (fit on both) or reference (cached basis fitted on original)")
 
 class PCAComparisonResponse(BaseModel):
     original_pca: List[Dict[str, float]] = Field(..., description="PCA coordinates for original data")
     synthetic_pca: List[Dict[str, float]] = Field(..., description="PCA coordinates for synthetic data")
+    density: Optional[Dict[str, Any]] = Field(default=None, description="2D binned counts when output=density")
     explained_variance: List[float] = Field(..., description="Explained variance ratio per component")
     quality_score: float = Field(..., description="Similarity score (0-1, higher is better)")
+    n_original: int = Field(..., description="Original rows used for the score")
+    n_synthetic: int = Field(..., description="Synthetic rows used for the score")
+    sampled: bool = Field(..., description="Whether returned points were subsampled")
 
 class ComprehensiveQualityRequest(BaseModel):
-    original_data: List[Dict[str, Any]] = Field(..., description="Original/real clinical trial data")
+    original_data: Optional[List[Dict[str, Any]]] = Field(default=None, description="Original/real clinical trial data")
+    reference_id: Optional[str] = Field(default=None, description="Registered reference set (instead of original_data)")
     synthetic_data: List[Dict[str, Any]] = Field(..., description="Synthetic data to validate")
     k: int = Field(default=5, ge=1, le=20, description="Number of nearest neighbors")
+    neighbor_backend: str = Field(default="auto", description="Neighbor search: exact, approximate (random-projection forest) or auto")
+    ann_trees: int = Field(default=8, ge=1, le=64, description="Approximate backend trees (more = higher recall, slower)")
+    metrics: Optional[List[str]] = Field(default=None, description="Subset of wasserstein, correlation, rmse, knn, euclidean (default: all)")
 
 class ComprehensiveQualityResponse(BaseModel):
-    wasserstein_distances: Dict[str, float] = Field(..., description="Wasserstein distance per numeric column")
-    correlation_preservation: float = Field(..., description="How well correlations are preserved (0-1)")
-    rmse_by_column: Dict[str, float] = Field(..., description="RMSE for each numeric column")
-    knn_imputation_score: float = Field(..., description="K-NN imputation quality score (0-1)")
+    wasserstein_distances: Optional[Dict[str, float]] = Field(default=None, description="Wasserstein distance per numeric column")
+    correlation_preservation: Optional[float] = Field(default=None, description="How well correlations are preserved (0-1)")
+    rmse_by_column: Optional[Dict[str, float]] = Field(default=None, description="RMSE for each numeric column")
+    knn_imputation_score: Optional[float] = Field(default=None, description="K-NN imputation quality score (0-1)")
     overall_quality_score: float = Field(..., description="Aggregate quality score (0-1)")
-    euclidean_distances: Dict[str, Any] = Field(..., description="Distance statistics")
+    euclidean_distances: Optional[Dict[str, Any]] = Field(default=None, description="Distance statistics")
+    metrics: List[str] = Field(..., description="Metrics computed")
+    neighbor_search: Optional[Dict[str, Any]] = Field(default=None, description="Neighbor backend used and its measured recall@k")
+    distribution_distances: Optional[Dict[str, Dict[str, Any]]] = Field(default=None, description="Per-column KS, Wasserstein, energy distance and quantile deltas")
     summary: str = Field(..., description="Human-readable quality summary")
 
+class DistributionDistanceRequest(BaseModel):
+    original_data: Optional[List[Dict[str, Any]]] = Field(default=None, description="Original/real data")
+    reference_id: Optional[str] = Field(default=None, description="Registered reference set (instead of original_data)")
+    replicates: List[List[Dict[str, Any]]] = Field(..., min_length=1, description="Synthetic datasets to score against the reference")
+    columns: Optional[List[str]] = Field(default=None, description="Numeric columns (default: vitals)")
+    quantiles: List[float] = Field(default=[0.05, 0.25, 0.5, 0.75, 0.95], description="Probabilities for quantile deltas")
+
+class DistributionDistanceResponse(BaseModel):
+    n_replicates: int
+    quantiles: List[float]
+    columns: Dict[str, Dict[str, Any]] = Field(..., description="Per column: ks, wasserstein, energy, quantile_deltas (one entry per replicate)")
+
+class StreamSessionRequest(BaseModel):
+    columns: List[str] = Field(default=["SystolicBP", "DiastolicBP", "HeartRate", "Temperature"], min_length=1, description="Numeric columns to accumulate")
+    compression: int = Field(default=200, ge=50, le=2000, description="t-digest compression (higher = more accurate KS/Wasserstein)")
+
+class StreamChunkRequest(BaseModel):
+    dataset: str = Field(..., description="original or synthetic")
+    records: Optional[List[Dict[str, Any]]] = Field(default=None, description="Chunk as row records")
+    columns: Optional[Dict[str, List[Optional[float]]]] = Field(default=None, description="Chunk as column arrays (more compact)")
+
+class StreamSessionStatus(BaseModel):
+    session_id: str
+    columns: List[str]
+    rows: Dict[str, int]
+    chunks: Dict[str, int]
+
+class StreamingQualityResponse(StreamSessionStatus):
+    column_metrics: Dict[str, Dict[str, Any]] = Field(..., description="Per column: means, stds, approximate KS and Wasserstein")
+    correlation_preservation: float
+    wasserstein_avg: Optional[float] = None
+    overall_quality_score: float = Field(..., description="Wasserstein + correlation terms of the comprehensive score (0-1)")
+
+class ReferenceRegisterRequest(BaseModel):
+    data: List[Dict[str, Any]] = Field(..., description="Original/pilot data to pin as a reference set")
+    reference_id: Optional[str] = Field(default=None, description="ID to register under (defaults to content hash)")
+
+class ReferenceInfo(BaseModel):
+    reference_id: str
+    fingerprint: str
+    n_rows: int
+    columns: List[str]
+    artifacts: List[str] = Field(..., description="Fitted artifacts cached so far")
+    created_at: str
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -177,6 +386,17 @@ async def health_check():
         "cache": cache_status
     }
 
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Response cache hit rates per endpoint (local LRU and Redis tiers)"""
+    return response_cache.stats()
+
+@app.delete("/cache")
+async def clear_response_cache():
+    """Drop all cached analytics responses"""
+    deleted = await response_cache.clear()
+    return {"cleared": True, "redis_keys_deleted": deleted}
+
 @app.get("/")
 async def root():
     """Root endpoint with service information"""
@@ -194,14 +414,27 @@ async def root():
             "health": "/health",
             "stats": "/stats/week12",
             "recist": "/stats/recist",
+            "mmrm": "/stats/mmrm",
+            "bootstrap": "/stats/bootstrap",
+            "interim": "/stats/interim",
+            "group_sequential_simulation": "/stats/group-sequential/simulate",
             "rbqm": "/rbqm/summary",
+            "kri_trends": "/rbqm/kri/trends",
             "csr": "/csr/draft",
+            "csr_batch": "/csr/draft/batch",
             "sdtm": "/sdtm/export",
+            "sdtm_file": "/sdtm/export/file",
+            "sdtm_package": "/sdtm/package",
+            "quality_references": "/quality/references",
+            "quality_distances": "/quality/distances",
+            "quality_stream": "/quality/stream/sessions",
+            "cache_stats": "/cache/stats",
             "docs": "/docs"
         }
     }
 
 @app.post("/stats/week12", response_model=StatisticsResponse)
+@cached_response("stats_week12")
 async def calculate_statistics(request: StatisticsRequest):
     """
     Calculate Week-12 statistics (Active vs Placebo)
@@ -232,7 +465,158 @@ async def calculate_statistics(request: StatisticsRequest):
             detail=f"Statistics calculation failed: {str(e)}"
         )
 
+@app.post("/stats/mmrm", response_model=MMRMResponse)
+@cached_response("stats_mmrm")
+async def calculate_mmrm(request: MMRMRequest):
+    """
+    Longitudinal change-from-baseline SBP analysis (MMRM-style GLS)
+
+    Models change from baseline at every post-baseline visit with
+    visit-specific intercept, treatment and baseline effects and an
+    unstructured within-subject covariance; subjects with missing visits
+    are kept. Returns LS means per arm and visit, and Active - Placebo
+    differences with 95% CI and p-values. With replicate_column, every
+    replicate is fitted in the same batched solve.
+    """
+    try:
+        df = pd.DataFrame(request.vitals_data)
+        result = await _run_blocking(
+            fit_mmrm,
+            df,
+            baseline_visit=request.baseline_visit,
+            replicate_col=request.replicate_column,
+            max_iter=request.max_iter
+        )
+        return MMRMResponse(**result)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"MMRM analysis failed: {str(e)}"
+        )
+
+@app.post("/stats/bootstrap", response_model=BootstrapResponse)
+@cached_response("stats_bootstrap")
+async def calculate_bootstrap(request: BootstrapRequest):
+    """
+    Bootstrap confidence interval for the Week-12 SBP treatment effect
+
+    Resamples both arms in vectorized chunks sized to max_memory_mb and
+    returns a percentile or BCa interval alongside the normal
+    approximation. Results are reproducible for a given seed regardless
+    of chunk size.
+    """
+    if request.method not in BOOTSTRAP_METHODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"method must be one of: {', '.join(BOOTSTRAP_METHODS)}"
+        )
+
+    try:
+        df = pd.DataFrame(request.vitals_data)
+        result = await _run_blocking(
+            bootstrap_treatment_effect,
+            df,
+            n_boot=request.n_boot,
+            method=request.method,
+            confidence=request.confidence,
+            seed=request.seed,
+            chunk_size=request.chunk_size,
+            max_memory_mb=request.max_memory_mb
+        )
+        return BootstrapResponse(**result)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Bootstrap CI failed: {str(e)}"
+        )
+
+def _check_sequential_design(spending: str, information_fractions: List[float]):
+    """400 for an unknown spending function or invalid look fractions"""
+    if spending not in SPENDING_FUNCTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"spending must be one of: {', '.join(SPENDING_FUNCTIONS)}"
+        )
+    try:
+        validate_information_fractions(information_fractions)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@app.post("/stats/interim", response_model=InterimAnalysisResponse)
+@cached_response("stats_interim")
+async def calculate_interim(request: InterimAnalysisRequest):
+    """
+    Group-sequential interim analysis of Week-12 SBP
+
+    Evaluates the Active - Placebo Welch statistic at each information
+    fraction over subjects in enrollment order, against Lan-DeMets
+    O'Brien-Fleming or Pocock boundaries, and reports where the trial
+    would have stopped.
+    """
+    _check_sequential_design(request.spending, request.information_fractions)
+
+    try:
+        df = pd.DataFrame(request.vitals_data)
+        result = await _run_blocking(
+            interim_analysis,
+            df,
+            information_fractions=request.information_fractions,
+            alpha=request.alpha,
+            spending=request.spending,
+            order_col=request.order_column
+        )
+        return InterimAnalysisResponse(**result)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Interim analysis failed: {str(e)}"
+        )
+
+@app.post("/stats/group-sequential/simulate", response_model=GroupSequentialSimulationResponse)
+@cached_response("stats_group_sequential")
+async def simulate_sequential_design(request: GroupSequentialSimulationRequest):
+    """
+    Operating characteristics of a group-sequential design
+
+    Simulates n_sims trials vectorized over replicates (running sums give
+    every look's statistic) and returns stopping probabilities per look,
+    overall rejection rate (power, or type I error with effect=0),
+    expected sample size and the fixed-design rejection rate. Placebo
+    mean and SD default to estimates from vitals_data when given.
+    """
+    _check_sequential_design(request.spending, request.information_fractions)
+
+    try:
+        placebo_mean, sd = request.placebo_mean, request.sd
+        if request.vitals_data and (placebo_mean is None or sd is None):
+            stats = calculate_week12_statistics(pd.DataFrame(request.vitals_data))
+            groups = stats["treatment_groups"]
+            if placebo_mean is None:
+                placebo_mean = groups["Placebo"]["mean_systolic"]
+            if sd is None:
+                sd = (groups["Active"]["std_systolic"] + groups["Placebo"]["std_systolic"]) / 2
+
+        result = await _run_blocking(
+            simulate_group_sequential,
+            n_per_arm=request.n_per_arm,
+            effect=request.effect,
+            placebo_mean=DEFAULT_PLACEBO_MEAN if placebo_mean is None else placebo_mean,
+            sd=DEFAULT_SD if sd is None else sd,
+            information_fractions=request.information_fractions,
+            alpha=request.alpha,
+            spending=request.spending,
+            n_sims=request.n_sims,
+            seed=request.seed
+        )
+        return GroupSequentialSimulationResponse(**result)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Group-sequential simulation failed: {str(e)}"
+        )
+
 @app.post("/stats/recist", response_model=RECISTResponse)
+@cached_response("stats_recist")
 async def calculate_recist(request: RECISTRequest):
     """
     Simulate RECIST responses and calculate ORR (Objective Response Rate)
@@ -256,6 +640,7 @@ async def calculate_recist(request: RECISTRequest):
         )
 
 @app.post("/rbqm/summary", response_model=RBQMResponse)
+@cached_response("rbqm_summary", when=lambda r: not r.use_db_kris)
 async def generate_rbqm(request: RBQMRequest):
     """
     Generate Risk-Based Quality Management (RBQM) summary
@@ -270,13 +655,26 @@ async def generate_rbqm(request: RBQMRequest):
         queries_df = pd.DataFrame(request.queries_data)
         ae_df = pd.DataFrame(request.ae_data) if request.ae_data else None
 
+        kri_overrides = None
+        if request.use_db_kris and db.pool:
+            end_date = datetime.utcnow().date()
+            start_date = end_date - timedelta(days=request.kri_window_days - 1)
+            kri_overrides = await fetch_kri_totals(db, start_date, end_date)
+        elif request.use_db_kris:
+            logger.warning("use_db_kris requested but no database pool; using placeholder KRIs")
+
         summary_md, site_summary_df, kris = generate_rbqm_summary(
             queries_df=queries_df,
             vitals_df=vitals_df,
             ae_df=ae_df,
             thresholds=request.thresholds,
-            site_size=request.site_size
+            site_size=request.site_size,
+            kri_overrides=kri_overrides
         )
+        if kri_overrides is not None and kris["kri_source"] != "database":
+            placeholders = [name for name, source in kris["kri_sources"].items() if source == "placeholder"]
+            logger.warning(f"use_db_kris requested but no rollups for {', '.join(placeholders)}; "
+                           f"using placeholder values")
 
         return RBQMResponse(
             summary_markdown=summary_md,
@@ -289,21 +687,109 @@ async def generate_rbqm(request: RBQMRequest):
             detail=f"RBQM generation failed: {str(e)}"
         )
 
+@app.post("/rbqm/kri/refresh", response_model=KRIRefreshResponse)
+async def refresh_kris(request: KRIRefreshRequest):
+    """
+    Recompute daily RBQM KRI rollups from the database
+
+    Aggregates vital_signs (late entry), queries (AE timeliness) and
+    subjects (screen-fail) per day and site into rbqm_kri_daily.
+    Run nightly for the trailing days, or over a range to backfill.
+    """
+    if not db.pool:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database not connected"
+        )
+    try:
+        rows = await refresh_kri_rollups(
+            db,
+            start_date=request.start_date,
+            end_date=request.end_date,
+            late_entry_hours=request.late_entry_hours
+        )
+        return KRIRefreshResponse(
+            start_date=request.start_date,
+            end_date=request.end_date,
+            rollup_rows=rows
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"KRI refresh failed: {str(e)}"
+        )
+
+@app.get("/rbqm/kri/trends", response_model=KRITrendResponse)
+async def get_kri_trends(
+    start_date: date,
+    end_date: date,
+    granularity: str = "day",
+    site_id: Optional[str] = None
+):
+    """
+    KRI trend series (late entry %, AE timeliness, screen-fail rate)
+
+    Reads the daily rollup table only, so month-long series are index
+    lookups. Granularity: day, week or month.
+    """
+    if not db.pool:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database not connected"
+        )
+    try:
+        series = await fetch_kri_trends(
+            db,
+            start_date=start_date,
+            end_date=end_date,
+            granularity=granularity,
+            site_id=site_id
+        )
+        return KRITrendResponse(granularity=granularity, site_id=site_id, series=series)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"KRI trend query failed: {str(e)}"
+        )
+
+def _check_csr_n_rows(requests: List[CSRRequest], batch: bool = False):
+    """422 for statistics without n_rows (only vitals_data can supply it)"""
+    for i, request in enumerate(requests):
+        if request.vitals_data is None and request.statistics is not None and request.n_rows is None:
+            prefix = f"{getattr(request, 'name', None) or f'variant_{i + 1}'}: " if batch else ""
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"{prefix}n_rows is required with statistics"
+            )
+
+def _csr_variant(request: CSRRequest) -> Dict[str, Any]:
+    """CSR request -> generate_csr_batch variant"""
+    return {
+        "name": getattr(request, "name", None),
+        "statistics": request.statistics,
+        "vitals_df": pd.DataFrame(request.vitals_data) if request.vitals_data else None,
+        "ae_df": pd.DataFrame(request.ae_data) if request.ae_data else None,
+        "n_rows": request.n_rows
+    }
+
 @app.post("/csr/draft", response_model=CSRResponse)
 async def generate_csr(request: CSRRequest):
     """
     Generate Clinical Study Report (CSR) draft
 
-    Includes efficacy, safety, and data quality sections
+    Includes efficacy, safety, and data quality sections. Pass statistics
+    (+ n_rows), or vitals_data to have the Week-12 table computed and
+    cached by dataset hash.
     """
-    try:
-        ae_df = pd.DataFrame(request.ae_data) if request.ae_data else None
+    _check_csr_n_rows([request])
 
-        csr_md = generate_csr_draft(
-            stats=request.statistics,
-            ae_df=ae_df,
-            n_rows=request.n_rows
-        )
+    try:
+        variant = _csr_variant(request)
+        csr_md = generate_csr_batch([variant])[0]["csr_markdown"]
 
         return CSRResponse(csr_markdown=csr_md)
     except Exception as e:
@@ -312,6 +798,26 @@ async def generate_csr(request: CSRRequest):
             detail=f"CSR generation failed: {str(e)}"
         )
 
+@app.post("/csr/draft/batch", response_model=CSRBatchResponse)
+async def generate_csr_variants(request: CSRBatchRequest):
+    """
+    Render CSR drafts for many study variants in one call
+
+    Efficacy and safety tables are cached per dataset hash, so variants
+    sharing vitals or AE data (e.g. a parameter sweep) compute them once
+    and only re-render the template.
+    """
+    _check_csr_n_rows(request.variants, batch=True)
+
+    try:
+        reports = await _run_blocking(generate_csr_batch, [_csr_variant(v) for v in request.variants])
+        return CSRBatchResponse(reports=reports)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"CSR batch generation failed: {str(e)}"
+        )
+
 @app.post("/sdtm/export", response_model=SDTMResponse)
 async def export_sdtm(request: SDTMRequest):
     """
@@ -333,7 +839,149 @@ async def export_sdtm(request: SDTMRequest):
             detail=f"SDTM export failed: {str(e)}"
         )
 
+@app.post("/sdtm/export/file")
+async def export_sdtm_file(request: SDTMFileRequest):
+    """
+    Export vitals to an SDTM VS file (CSV, SAS XPORT v5 or Parquet)
+
+    The VS domain is written chunk by chunk, so memory stays bounded by
+    chunk_size rather than by the size of the long-format output.
+    """
+    fmt = request.format.lower()
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}"
+        )
+
+    tmp = tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=False)
+    try:
+        df = pd.DataFrame(request.vitals_data)
+        await _run_blocking(write_sdtm_vs, df, tmp, fmt=fmt, chunk_size=request.chunk_size)
+        tmp.close()
+        return FileResponse(
+            tmp.name,
+            filename=f"vs.{fmt}",
+            media_type="application/octet-stream",
+            background=BackgroundTask(os.unlink, tmp.name)
+        )
+    except Exception as e:
+        tmp.close()
+        os.unlink(tmp.name)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"SDTM file export failed: {str(e)}"
+        )
+
+@app.post("/sdtm/package")
+async def export_sdtm_package(request: SDTMPackageRequest):
+    """
+    Build a multi-domain SDTM submission package (DM, VS, LB, AE)
+
+    Each supplied dataset is converted to its SDTM domain (--SEQ assigned
+    per subject), the domain files are written concurrently, and a
+    define-style define.json is added. Returned as a zip archive.
+    """
+    fmt = request.format.lower()
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}"
+        )
+
+    sources = {
+        domain: pd.DataFrame(records)
+        for domain, records in [
+            ("DM", request.demographics_data),
+            ("VS", request.vitals_data),
+            ("LB", request.labs_data),
+            ("AE", request.ae_data)
+        ]
+        if records
+    }
+    if not sources:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one of vitals_data, demographics_data, labs_data, ae_data is required"
+        )
+
+    work_dir = tempfile.mkdtemp(prefix="sdtm_")
+    try:
+        package_dir = os.path.join(work_dir, "sdtm")
+        await _run_blocking(write_sdtm_package, sources, package_dir, fmt=fmt, chunk_size=request.chunk_size)
+        archive = await _run_blocking(shutil.make_archive, os.path.join(work_dir, "sdtm_package"), "zip",
+                                      package_dir)
+        return FileResponse(
+            archive,
+            filename="sdtm_package.zip",
+            media_type="application/zip",
+            background=BackgroundTask(shutil.rmtree, work_dir, ignore_errors=True)
+        )
+    except Exception as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"SDTM package export failed: {str(e)}"
+        )
+
+async def _run_blocking(func, *args, **kwargs):
+    """Run CPU-bound work in the default executor, off the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+def _load_reference(original_data: Optional[List[Dict[str, Any]]], reference_id: Optional[str]):
+    """Resolve the original dataset of a quality request to a reference set"""
+    if reference_id:
+        try:
+            return resolve_reference(reference_id)
+        except KeyError as e:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e.args[0]))
+    if not original_data:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Either original_data or reference_id is required"
+        )
+    return get_reference(pd.DataFrame(original_data))
+
+def _reference_fingerprint(request) -> Optional[str]:
+    """Cache key material for a registered reference (LookupError if unknown)"""
+    if request.reference_id:
+        return resolve_reference(request.reference_id).fingerprint
+    return None
+
+@app.post("/quality/references", response_model=ReferenceInfo)
+async def register_quality_reference(request: ReferenceRegisterRequest):
+    """
+    Register an original/pilot dataset as a reusable reference set
+
+    Quality endpoints can then be called with reference_id instead of
+    re-posting original_data; fitted artifacts (scaler, neighbor index,
+    sorted columns, correlation matrix, PCA basis) are built once and
+    reused for every candidate.
+    """
+    try:
+        ref = register_reference(pd.DataFrame(request.data), request.reference_id)
+        return ReferenceInfo(**ref.describe())
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Reference registration failed: {str(e)}"
+        )
+
+@app.get("/quality/references")
+async def get_quality_references():
+    """List registered reference sets and reference cache statistics"""
+    return {"references": list_references(), **reference_cache_stats()}
+
+@app.delete("/quality/references/{reference_id}")
+async def delete_quality_reference(reference_id: str):
+    """Unregister a reference set"""
+    if not unregister_reference(reference_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown reference_id: {reference_id}")
+    return {"deleted": reference_id}
+
 @app.post("/quality/pca-comparison", response_model=PCAComparisonResponse)
+@cached_response("quality_pca", vary=_reference_fingerprint)
 async def compare_data_with_pca(request: PCAComparisonRequest):
     """
     Compare original vs synthetic data using PCA visualization
@@ -359,96 +1007,37 @@ async def compare_data_with_pca(request: PCAComparisonRequest):
     - 0.8+ = Excellent similarity
     - 0.6-0.8 = Good similarity
     - <0.6 = Poor match, review generation parameters
+
+    **Large inputs:**
+    Set max_points (stratified subsample of the returned
+    points) or output="density" (2D binned counts); the quality score is
+    always computed on the full data. solver="auto" switches to randomized
+    PCA above 200k rows; "incremental" fits in batches.
+
+    **Reference sets:**
+    Pass reference_id (see /quality/references) instead of original_data,
+    and basis="reference" to project candidates onto a PCA basis fitted
+    once on the original data.
     """
+    reference = _load_reference(request.original_data, request.reference_id)
     try:
-        from sklearn.preprocessing import LabelEncoder, StandardScaler
-        from sklearn.decomposition import PCA
-        import numpy as np
-
         # Load datasets
-        df_orig = pd.DataFrame(request.original_data)
         df_syn = pd.DataFrame(request.synthetic_data)
 
-        # Add source labels
-        df_orig["_Source"] = "Original"
-        df_syn["_Source"] = "Synthetic"
-
-        # Combine for uniform encoding
-        df_all = pd.concat([df_orig, df_syn], ignore_index=True)
-
-        # Label encode categorical columns
-        for col in ["VisitName", "TreatmentArm"]:
-            if col in df_all.columns:
-                le = LabelEncoder()
-                df_all[col] = le.fit_transform(df_all[col].astype(str))
-
-        # Select numeric columns (ignore SubjectID and _Source)
-        numeric_cols = ["SystolicBP", "DiastolicBP", "HeartRate", "Temperature"]
-        if "VisitName" in df_all.columns:
-            numeric_cols.insert(0, "VisitName")
-        if "TreatmentArm" in df_all.columns:
-            numeric_cols.insert(1, "TreatmentArm")
-
-        # Filter to only columns that exist
-        numeric_cols = [c for c in numeric_cols if c in df_all.columns]
-
-        X = df_all[numeric_cols].copy()
-        y = df_all["_Source"]
-
-        # Scale features
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
-
-        # PCA to 2D
-        pca = PCA(n_components=2, random_state=42)
-        X_pca = pca.fit_transform(X_scaled)
-
-        # Attach coordinates
-        df_all["PCA1"] = X_pca[:, 0]
-        df_all["PCA2"] = X_pca[:, 1]
-
-        # Separate for output
-        df_orig_pca = df_all[df_all["_Source"] == "Original"]
-        df_syn_pca = df_all[df_all["_Source"] == "Synthetic"]
-
-        # Format output
-        original_pca = [
-            {"pca1": row["PCA1"], "pca2": row["PCA2"]}
-            for _, row in df_orig_pca.iterrows()
-        ]
-        synthetic_pca = [
-            {"pca1": row["PCA1"], "pca2": row["PCA2"]}
-            for _, row in df_syn_pca.iterrows()
-        ]
-
-        # Calculate quality score (Wasserstein distance in PCA space)
-        from scipy.stats import wasserstein_distance
-
-        # Calculate distance in each PC dimension
-        dist_pc1 = wasserstein_distance(
-            df_orig_pca["PCA1"].values,
-            df_syn_pca["PCA1"].values
-        )
-        dist_pc2 = wasserstein_distance(
-            df_orig_pca["PCA2"].values,
-            df_syn_pca["PCA2"].values
+        result = await _run_blocking(
+            compute_pca_comparison,
+            reference.df,
+            df_syn,
+            output=request.output,
+            max_points=request.max_points,
+            bins=request.bins,
+            solver=request.solver,
+            seed=request.seed,
+            basis=request.basis,
+            reference=reference
         )
 
-        # Normalize distances and convert to similarity score (0-1)
-        # Lower distance = higher score
-        max_dist = max(
-            df_all["PCA1"].std() * 2,  # Rough estimate of max expected distance
-            df_all["PCA2"].std() * 2
-        )
-        normalized_dist = (dist_pc1 + dist_pc2) / (2 * max_dist)
-        quality_score = max(0.0, 1.0 - normalized_dist)
-
-        return PCAComparisonResponse(
-            original_pca=original_pca,
-            synthetic_pca=synthetic_pca,
-            explained_variance=pca.explained_variance_ratio_.tolist(),
-            quality_score=round(float(quality_score), 3)
-        )
+        return PCAComparisonResponse(**result)
 
     except Exception as e:
         raise HTTPException(
@@ -457,6 +1046,7 @@ async def compare_data_with_pca(request: PCAComparisonRequest):
         )
 
 @app.post("/quality/comprehensive", response_model=ComprehensiveQualityResponse)
+@cached_response("quality_comprehensive", vary=_reference_fingerprint)
 async def comprehensive_quality_assessment(request: ComprehensiveQualityRequest):
     """
     Comprehensive quality assessment for synthetic data (Professor's Requirements)
@@ -480,135 +1070,145 @@ async def comprehensive_quality_assessment(request: ComprehensiveQualityRequest)
     - Overall Score ≥ 0.85: Excellent quality, production-ready
     - Overall Score 0.70-0.85: Good quality, minor adjustments needed
     - Overall Score < 0.70: Review generation parameters
+
+    Pass reference_id instead of original_data to score against a
+    registered reference set without re-posting it.
+
+    neighbor_backend="approximate" swaps the exact KD-tree for a
+    random-projection forest (ann_trees trades recall for speed); the
+    measured recall@k is reported in neighbor_search.
+
+    metrics=[...] limits the work to the listed metrics; the overall
+    score is re-weighted over those selected. Computation runs off the
+    event loop, with per-column work in a thread pool.
     """
+    unknown = sorted(set(request.metrics or []) - set(QUALITY_METRICS))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"metrics must be from: {', '.join(QUALITY_METRICS)} (got {', '.join(unknown)})"
+        )
+    reference = _load_reference(request.original_data, request.reference_id)
     try:
-        from sklearn.preprocessing import StandardScaler
-        from sklearn.neighbors import NearestNeighbors
-        from scipy.stats import wasserstein_distance
-        import numpy as np
-
         # Load datasets
-        df_orig = pd.DataFrame(request.original_data)
         df_syn = pd.DataFrame(request.synthetic_data)
 
-        # Select numeric columns for analysis
-        numeric_cols = ["SystolicBP", "DiastolicBP", "HeartRate", "Temperature"]
-        numeric_cols = [c for c in numeric_cols if c in df_orig.columns and c in df_syn.columns]
-
-        if not numeric_cols:
-            raise ValueError("No common numeric columns found for comparison")
-
-        # ===== 1. Wasserstein Distance (Distribution Similarity) =====
-        wasserstein_distances = {}
-        for col in numeric_cols:
-            orig_vals = df_orig[col].dropna().values
-            syn_vals = df_syn[col].dropna().values
-            if len(orig_vals) > 0 and len(syn_vals) > 0:
-                wasserstein_distances[col] = float(wasserstein_distance(orig_vals, syn_vals))
-
-        # ===== 2. Correlation Preservation =====
-        corr_orig = df_orig[numeric_cols].corr()
-        corr_syn = df_syn[numeric_cols].corr()
-
-        # Flatten correlation matrices and compute similarity
-        corr_diff = np.abs(corr_orig.values - corr_syn.values)
-        # Use 1 - mean absolute difference as correlation preservation score
-        correlation_preservation = float(1.0 - np.mean(corr_diff[np.triu_indices_from(corr_diff, k=1)]))
-        correlation_preservation = max(0.0, min(1.0, correlation_preservation))
-
-        # ===== 3. RMSE by Column (Compared to Nearest Neighbors) =====
-        rmse_by_column = {}
-
-        # Standardize data for distance calculations
-        scaler = StandardScaler()
-        X_orig = scaler.fit_transform(df_orig[numeric_cols].fillna(df_orig[numeric_cols].mean()))
-        X_syn = scaler.transform(df_syn[numeric_cols].fillna(df_syn[numeric_cols].mean()))
-
-        # Fit K-NN on original data
-        knn = NearestNeighbors(n_neighbors=min(request.k, len(X_orig)), metric='euclidean')
-        knn.fit(X_orig)
-
-        # Find nearest neighbors for each synthetic point
-        distances, indices = knn.kneighbors(X_syn)
-
-        # For each synthetic row, find its K nearest original rows
-        # Calculate RMSE for each column using the nearest neighbor mean
-        for col_idx, col in enumerate(numeric_cols):
-            syn_vals = df_syn[col].fillna(df_syn[col].mean()).values
-            # For each synthetic point, get the mean of its K nearest neighbors
-            orig_vals_knn = np.array([
-                df_orig[col].iloc[indices[i]].mean()
-                for i in range(len(indices))
-            ])
-            rmse = float(np.sqrt(np.mean((syn_vals - orig_vals_knn) ** 2)))
-            rmse_by_column[col] = round(rmse, 3)
-
-        # ===== 4. K-NN Imputation Score =====
-        # Lower distance = better match = higher score
-        mean_distance = float(np.mean(distances))
-        # Normalize by typical distance scale (use max observed distance)
-        max_distance = float(np.max(distances))
-        if max_distance > 0:
-            knn_imputation_score = float(1.0 - (mean_distance / max_distance))
-        else:
-            knn_imputation_score = 1.0
-        knn_imputation_score = max(0.0, min(1.0, knn_imputation_score))
-
-        # ===== 5. Euclidean Distance Statistics =====
-        euclidean_distances = {
-            "mean_distance": round(mean_distance, 3),
-            "median_distance": round(float(np.median(distances)), 3),
-            "min_distance": round(float(np.min(distances)), 3),
-            "max_distance": round(float(np.max(distances)), 3),
-            "std_distance": round(float(np.std(distances)), 3)
-        }
-
-        # ===== 6. Overall Quality Score (Weighted Average) =====
-        # Wasserstein: normalize and invert (lower is better)
-        wasserstein_avg = np.mean(list(wasserstein_distances.values()))
-        # Typical Wasserstein for vitals is 0-20 range, normalize to 0-1
-        wasserstein_score = max(0.0, 1.0 - (wasserstein_avg / 20.0))
-
-        # RMSE: normalize (lower is better)
-        rmse_avg = np.mean(list(rmse_by_column.values()))
-        # Typical RMSE is 0-15, normalize
-        rmse_score = max(0.0, 1.0 - (rmse_avg / 15.0))
-
-        # Weighted average
-        overall_quality_score = float(
-            0.25 * wasserstein_score +
-            0.30 * correlation_preservation +
-            0.20 * rmse_score +
-            0.25 * knn_imputation_score
-        )
-        overall_quality_score = round(max(0.0, min(1.0, overall_quality_score)), 3)
-
-        # ===== 7. Generate Summary =====
-        if overall_quality_score >= 0.85:
-            summary = f"✅ EXCELLENT - Quality score: {overall_quality_score:.2f}. Synthetic data is production-ready and closely matches original distribution."
-        elif overall_quality_score >= 0.70:
-            summary = f"✓ GOOD - Quality score: {overall_quality_score:.2f}. Synthetic data is usable with minor differences from original."
-        else:
-            summary = f"⚠️ NEEDS IMPROVEMENT - Quality score: {overall_quality_score:.2f}. Consider adjusting generation parameters or using a different method."
-
-        summary += f" | Wasserstein avg: {wasserstein_avg:.2f}, Correlation preserved: {correlation_preservation:.2%}, RMSE avg: {rmse_avg:.2f}, K-NN score: {knn_imputation_score:.2f}"
-
-        return ComprehensiveQualityResponse(
-            wasserstein_distances={k: round(v, 3) for k, v in wasserstein_distances.items()},
-            correlation_preservation=round(correlation_preservation, 3),
-            rmse_by_column=rmse_by_column,
-            knn_imputation_score=round(knn_imputation_score, 3),
-            overall_quality_score=overall_quality_score,
-            euclidean_distances=euclidean_distances,
-            summary=summary
+        result = await _run_blocking(
+            compute_comprehensive_quality,
+            reference.df,
+            df_syn,
+            k=request.k,
+            reference=reference,
+            neighbor_backend=request.neighbor_backend,
+            ann_trees=request.ann_trees,
+            metrics=request.metrics
         )
 
+        return ComprehensiveQualityResponse(**result)
+
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Quality assessment failed: {str(e)}"
         )
 
+@app.post("/quality/distances", response_model=DistributionDistanceResponse)
+@cached_response("quality_distances", vary=_reference_fingerprint)
+async def distribution_distances(request: DistributionDistanceRequest):
+    """
+    Distribution distances for one or many synthetic replicates
+
+    Scores every replicate against the original data per column: KS
+    statistic, Wasserstein-1, energy distance and quantile deltas
+    (replicate minus original). All four come from one merged ordering of
+    sorted buffers, and replicates are batched per column.
+    """
+    reference = _load_reference(request.original_data, request.reference_id)
+    if any(not 0.0 <= q <= 1.0 for q in request.quantiles):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="quantiles must be within [0, 1]")
+    try:
+        replicates = [pd.DataFrame(records) for records in request.replicates]
+        result = await _run_blocking(
+            compute_distribution_distances,
+            reference,
+            replicates,
+            columns=request.columns,
+            quantiles=request.quantiles
+        )
+        return DistributionDistanceResponse(**result)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Distribution distance calculation failed: {str(e)}"
+        )
+
+def _stream_session(session_id: str):
+    try:
+        return get_session(session_id)
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e.args[0]))
+
+@app.post("/quality/stream/sessions", response_model=StreamSessionStatus)
+async def create_quality_stream(request: StreamSessionRequest):
+    """
+    Open a streaming quality session for datasets too large to post at once
+
+    Upload original and synthetic data in any number of chunks, then
+    finalize. Only running moments, co-moments and per-column t-digests
+    are kept, so memory does not grow with row count.
+    """
+    session = create_session(request.columns, request.compression)
+    return StreamSessionStatus(**session.status())
+
+@app.post("/quality/stream/sessions/{session_id}/chunks", response_model=StreamSessionStatus)
+async def upload_quality_stream_chunk(session_id: str, request: StreamChunkRequest):
+    """Fold one chunk of original or synthetic data into the session"""
+    session = _stream_session(session_id)
+    if (request.records is None) == (request.columns is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide exactly one of records or columns"
+        )
+    try:
+        df = pd.DataFrame(request.records) if request.records is not None else pd.DataFrame(request.columns)
+        return StreamSessionStatus(**session.add_chunk(request.dataset, df))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@app.get("/quality/stream/sessions/{session_id}", response_model=StreamSessionStatus)
+async def get_quality_stream(session_id: str):
+    """Rows and chunks received so far"""
+    return StreamSessionStatus(**_stream_session(session_id).status())
+
+@app.post("/quality/stream/sessions/{session_id}/finalize", response_model=StreamingQualityResponse)
+async def finalize_quality_stream(session_id: str, keep: bool = False):
+    """
+    Score the accumulated data and (unless keep=true) close the session
+
+    Means/stds are exact; KS and Wasserstein are approximated from
+    t-digests; correlation preservation uses exact running covariance.
+    """
+    session = _stream_session(session_id)
+    try:
+        result = session.score()
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Streaming quality assessment failed: {str(e)}"
+        )
+    if not keep:
+        close_session(session_id)
+    return StreamingQualityResponse(**result)
+
+@app.delete("/quality/stream/sessions/{session_id}")
+async def delete_quality_stream(session_id: str):
+    """Discard a streaming session"""
+    if not close_session(session_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown session_id: {session_id}")
+    return {"deleted": session_id}
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8003)
@@ -0,0 +1,257 @@
+"""
+Nearest-neighbor search backends for quality and privacy metrics
+Exact (sklearn KD-tree) and approximate (random-projection forest, pure
+NumPy) indexes behind one fit/kneighbors interface
+
+Canonical copy: microservices/shared/neighbors.py. Services ship their own
+copy in src/; scripts/check_shared_modules.py fails when they diverge.
+"""
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+NEIGHBOR_BACKENDS = ("auto", "exact", "approximate")
+
+# "auto" picks the approximate index only for large, higher-dimensional
+# references; on a handful of vitals columns the KD-tree is faster
+ANN_MIN_ROWS = int(os.getenv("ANN_MIN_ROWS", "100000"))
+ANN_MIN_DIMS = int(os.getenv("ANN_MIN_DIMS", "16"))
+DEFAULT_ANN_TREES = 8
+DEFAULT_ANN_LEAF_SIZE = 64
+
+# Upper bound on floats materialized per query chunk (candidates x dims)
+_QUERY_CHUNK_FLOATS = 8_000_000
+
+
+class ExactNeighbors:
+    """Exact k-NN (sklearn KD-tree)"""
+
+    backend = "exact"
+
+    def fit(self, X: np.ndarray) -> "ExactNeighbors":
+        from sklearn.neighbors import NearestNeighbors
+
+        self._knn = NearestNeighbors(algorithm="kd_tree").fit(X)
+        self.n_samples = len(X)
+        return self
+
+    def kneighbors(self, Q: np.ndarray, n_neighbors: int) -> Tuple[np.ndarray, np.ndarray]:
+        return self._knn.kneighbors(Q, n_neighbors=n_neighbors)
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.backend}
+
+
+class RandomProjectionForest:
+    """
+    Approximate k-NN with a forest of random-projection trees
+
+    Each tree splits every node at the median of its points projected on a
+    random direction, down to leaves of about leaf_size points. A query
+    descends every tree, the union of the reached leaves is ranked exactly,
+    and the best n_neighbors are returned. More trees (or larger leaves)
+    raise recall at the cost of more candidates per query. Queries whose
+    leaves hold fewer than n_neighbors distinct points (heavily duplicated
+    data leaves some leaves nearly empty) fall back to an exact search.
+    """
+
+    backend = "approximate"
+
+    def __init__(self, n_trees: int = DEFAULT_ANN_TREES,
+                 leaf_size: int = DEFAULT_ANN_LEAF_SIZE, seed: int = 42):
+        self.n_trees = max(1, int(n_trees))
+        self.leaf_size = max(2, int(leaf_size))
+        self.seed = seed
+
+    def fit(self, X: np.ndarray) -> "RandomProjectionForest":
+        self._X = np.ascontiguousarray(X, dtype=float)
+        self.n_samples, n_dims = self._X.shape
+        self.depth = max(0, int(np.floor(np.log2(max(self.n_samples, 1) / self.leaf_size))))
+        rng = np.random.default_rng(self.seed)
+
+        self._trees = []
+        for _ in range(self.n_trees):
+            node = np.zeros(self.n_samples, dtype=np.int64)
+            directions, thresholds = [], []
+            for level in range(self.depth):
+                n_nodes = 1 << level
+                dirs = rng.standard_normal((n_nodes, n_dims))
+                proj = np.einsum("ij,ij->i", self._X, dirs[node])
+                thresholds.append(_group_medians(node, proj, n_nodes))
+                directions.append(dirs)
+                node = 2 * node + (proj > thresholds[-1][node])
+
+            # Leaf membership as one sorted index array plus offsets
+            order = np.argsort(node, kind="stable")
+            offsets = np.searchsorted(node[order], np.arange((1 << self.depth) + 1))
+            self._trees.append((directions, thresholds, order, offsets))
+        return self
+
+    def _leaves(self, Q: np.ndarray, tree) -> np.ndarray:
+        directions, thresholds, _, _ = tree
+        node = np.zeros(len(Q), dtype=np.int64)
+        for dirs, thr in zip(directions, thresholds):
+            proj = np.einsum("ij,ij->i", Q, dirs[node])
+            node = 2 * node + (proj > thr[node])
+        return node
+
+    def kneighbors(self, Q: np.ndarray, n_neighbors: int) -> Tuple[np.ndarray, np.ndarray]:
+        Q = np.ascontiguousarray(Q, dtype=float)
+        n_neighbors = min(n_neighbors, self.n_samples)
+        leaves = [self._leaves(Q, tree) for tree in self._trees]
+        widest = sum(int(np.diff(tree[3]).max()) for tree in self._trees)
+        chunk = max(1, _QUERY_CHUNK_FLOATS // max(widest * Q.shape[1], 1))
+
+        distances = np.empty((len(Q), n_neighbors))
+        indices = np.empty((len(Q), n_neighbors), dtype=np.int64)
+        for start in range(0, len(Q), chunk):
+            stop = min(start + chunk, len(Q))
+            cand = self._candidates([leaf[start:stop] for leaf in leaves])
+            d, i = self._rank(Q[start:stop], cand, n_neighbors)
+            distances[start:stop], indices[start:stop] = d, i
+
+        short = np.flatnonzero(indices[:, -1] < 0)
+        if len(short):
+            distances[short], indices[short] = self._exact(Q[short], n_neighbors)
+        return distances, indices
+
+    def _exact(self, Q: np.ndarray, n_neighbors: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force k-NN, in query batches bounded by _QUERY_CHUNK_FLOATS"""
+        x_sq = (self._X ** 2).sum(axis=1)
+        batch = max(1, _QUERY_CHUNK_FLOATS // max(self.n_samples, 1))
+        distances = np.empty((len(Q), n_neighbors))
+        indices = np.empty((len(Q), n_neighbors), dtype=np.int64)
+        for start in range(0, len(Q), batch):
+            q = Q[start:start + batch]
+            d2 = (q ** 2).sum(axis=1)[:, None] - 2 * q @ self._X.T + x_sq[None, :]
+            top = np.argpartition(d2, n_neighbors - 1, axis=1)[:, :n_neighbors]
+            top_d = np.sqrt(np.maximum(np.take_along_axis(d2, top, axis=1), 0))
+            order = np.argsort(top_d, axis=1)
+            distances[start:start + batch] = np.take_along_axis(top_d, order, axis=1)
+            indices[start:start + batch] = np.take_along_axis(top, order, axis=1)
+        return distances, indices
+
+    def _candidates(self, leaves) -> np.ndarray:
+        """(n_queries, width) reference indices of reached leaves, -1 padded"""
+        blocks = []
+        for tree, leaf in zip(self._trees, leaves):
+            order, offsets = tree[2], tree[3]
+            start, size = offsets[leaf], offsets[leaf + 1] - offsets[leaf]
+            width = int(size.max()) if len(size) else 0
+            pos = start[:, None] + np.arange(width)
+            valid = np.arange(width) < size[:, None]
+            blocks.append(np.where(valid, order[np.minimum(pos, len(order) - 1)], -1))
+        cand = np.concatenate(blocks, axis=1)
+
+        # Drop duplicates reached through several trees
+        cand.sort(axis=1)
+        cand[:, 1:][cand[:, 1:] == cand[:, :-1]] = -1
+        return cand
+
+    def _rank(self, Q: np.ndarray, cand: np.ndarray, n_neighbors: int) -> Tuple[np.ndarray, np.ndarray]:
+        diff = self._X[np.maximum(cand, 0)] - Q[:, None, :]
+        dist = np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+        dist[cand < 0] = np.inf
+
+        # Pad when the reached leaves hold fewer than n_neighbors points
+        if dist.shape[1] < n_neighbors:
+            pad = n_neighbors - dist.shape[1]
+            dist = np.pad(dist, ((0, 0), (0, pad)), constant_values=np.inf)
+            cand = np.pad(cand, ((0, 0), (0, pad)), constant_values=-1)
+
+        top = np.argpartition(dist, n_neighbors - 1, axis=1)[:, :n_neighbors]
+        top_dist = np.take_along_axis(dist, top, axis=1)
+        order = np.argsort(top_dist, axis=1)
+        return (np.take_along_axis(top_dist, order, axis=1),
+                np.take_along_axis(np.take_along_axis(cand, top, axis=1), order, axis=1))
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "n_trees": self.n_trees, "leaf_size": self.leaf_size}
+
+
+def _group_medians(groups: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    """Median of values within each group id (0 for empty groups)"""
+    order = np.lexsort((values, groups))
+    sorted_vals = values[order]
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    lo = starts + np.maximum(counts - 1, 0) // 2
+    hi = starts + counts // 2
+    medians = np.zeros(n_groups)
+    filled = counts > 0
+    medians[filled] = (sorted_vals[lo[filled]] + sorted_vals[np.minimum(hi, len(values) - 1)[filled]]) / 2
+    return medians
+
+
+def build_neighbor_index(X: np.ndarray, backend: str = "auto",
+                         n_trees: int = DEFAULT_ANN_TREES,
+                         leaf_size: int = DEFAULT_ANN_LEAF_SIZE,
+                         seed: int = 42):
+    """
+    Fit a neighbor index on reference points
+
+    Args:
+        X: (n, d) reference matrix (already scaled)
+        backend: exact, approximate, or auto (approximate above ANN_MIN_ROWS
+            rows and ANN_MIN_DIMS columns)
+        n_trees: Approximate only; more trees = higher recall, slower
+        leaf_size: Approximate only; points per leaf
+        seed: Approximate only; projection seed
+
+    Returns:
+        Fitted ExactNeighbors or RandomProjectionForest
+    """
+    if backend not in NEIGHBOR_BACKENDS:
+        raise ValueError(f"backend must be one of: {', '.join(NEIGHBOR_BACKENDS)}")
+    if backend == "auto":
+        large = len(X) > ANN_MIN_ROWS and X.shape[1] >= ANN_MIN_DIMS
+        backend = "approximate" if large else "exact"
+
+    if backend == "approximate":
+        return RandomProjectionForest(n_trees=n_trees, leaf_size=leaf_size, seed=seed).fit(X)
+    return ExactNeighbors().fit(X)
+
+
+def measure_recall(index, X: np.ndarray, Q: np.ndarray, n_neighbors: int,
+                   approx_indices: Optional[np.ndarray] = None,
+                   sample: int = 200, seed: int = 0) -> float:
+    """
+    Recall@k of an index against brute-force search on a query sample
+
+    Args:
+        index: Fitted neighbor index
+        X: Reference matrix the index was fitted on
+        Q: Query matrix
+        n_neighbors: k
+        approx_indices: Already computed neighbors for Q (avoids re-querying)
+        sample: Number of queries to check
+        seed: Sampling seed
+
+    Returns:
+        Fraction of true k nearest neighbors found (1.0 for exact)
+    """
+    if index.backend == "exact" or len(Q) == 0:
+        return 1.0
+
+    n_neighbors = min(n_neighbors, len(X))
+    rows = np.random.default_rng(seed).choice(len(Q), size=min(sample, len(Q)), replace=False)
+    if approx_indices is None:
+        _, found = index.kneighbors(Q[rows], n_neighbors)
+    else:
+        found = approx_indices[rows]
+
+    # Brute-force k-th distance per sampled query, in batches bounded by
+    # _QUERY_CHUNK_FLOATS; a found neighbor counts if it is no farther than
+    # that (so ties between equidistant points are not penalized)
+    x_sq = (X ** 2).sum(axis=1)
+    batch = max(1, _QUERY_CHUNK_FLOATS // max(len(X), 1))
+    hits = 0
+    for start in range(0, len(rows), batch):
+        q = Q[rows[start:start + batch]]
+        d2 = (q ** 2).sum(axis=1)[:, None] - 2 * q @ X.T + x_sq[None, :]
+        kth = np.partition(d2, n_neighbors - 1, axis=1)[:, n_neighbors - 1]
+        f = found[start:start + batch]
+        f_d2 = ((X[f] - q[:, None, :]) ** 2).sum(axis=2)
+        hits += int(((f >= 0) & (f_d2 <= kth[:, None] + 1e-9 * (1 + np.abs(kth[:, None])))).sum())
+    return round(hits / (len(rows) * n_neighbors), 4)
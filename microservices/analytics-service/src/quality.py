@@ -0,0 +1,601 @@
+"""
+Synthetic data quality assessment functions
+PCA comparison and comprehensive quality metrics between original and
+synthetic datasets
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import numpy as np
+from typing import Dict, Any, List, Optional, Sequence
+
+from distances import (
+    DEFAULT_QUANTILES, compare_columns, compare_replicates, compare_samples,
+    compare_sorted, sort_sample
+)
+from neighbors import DEFAULT_ANN_TREES, build_neighbor_index, measure_recall
+from reference_cache import ReferenceSet, get_reference
+
+# Above this many combined rows, "auto" switches to randomized PCA
+LARGE_PCA_ROWS = 200_000
+PCA_SOLVERS = ("auto", "full", "randomized", "incremental")
+PCA_OUTPUTS = ("points", "density")
+PCA_BASES = ("combined", "reference")
+
+PCA_CATEGORICAL_COLS = ["VisitName", "TreatmentArm"]
+PCA_NUMERIC_COLS = ["SystolicBP", "DiastolicBP", "HeartRate", "Temperature"]
+QUALITY_NUMERIC_COLS = ["SystolicBP", "DiastolicBP", "HeartRate", "Temperature"]
+
+# Selectable /quality/comprehensive metrics and their overall-score weights
+QUALITY_METRICS = ("wasserstein", "correlation", "rmse", "knn", "euclidean")
+SCORE_WEIGHTS = {"wasserstein": 0.25, "correlation": 0.30, "rmse": 0.20, "knn": 0.25}
+
+METRIC_WORKERS = int(os.getenv("QUALITY_METRIC_WORKERS", "4"))
+# Minimum synthetic rows per parallel neighbor-search block
+KNN_BLOCK_ROWS = 5_000
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _pca_feature_matrix(df_all: pd.DataFrame,
+                        categories: Optional[Dict[str, Any]] = None) -> np.ndarray:
+    """
+    Build the PCA feature matrix (label-encoded categoricals + vitals)
+
+    Categoricals are coded with a sorted factorize, which yields the same
+    codes as sklearn's LabelEncoder without its per-row string sort. When
+    categories (from a reference set) are given, those codes are reused
+    and unseen labels are coded -1.
+    """
+    cols = []
+    for col in PCA_CATEGORICAL_COLS:
+        if categories is not None:
+            if col in categories:
+                labels = df_all[col].astype(str)
+                cols.append(pd.Categorical(labels, categories=categories[col]).codes.astype(float))
+        elif col in df_all.columns:
+            cols.append(pd.factorize(df_all[col].astype(str), sort=True)[0].astype(float))
+    for col in PCA_NUMERIC_COLS:
+        if categories is not None:
+            if col in categories["_numeric"]:
+                cols.append(pd.to_numeric(df_all[col], errors="coerce").to_numpy(dtype=float))
+        elif col in df_all.columns:
+            cols.append(pd.to_numeric(df_all[col], errors="coerce").to_numpy(dtype=float))
+
+    if not cols:
+        raise ValueError("No PCA feature columns found")
+    return np.column_stack(cols)
+
+
+def _fit_pca(X_scaled: np.ndarray, solver: str, batch_size: int = 50_000):
+    """Fit a 2-component PCA with the requested solver"""
+    from sklearn.decomposition import PCA, IncrementalPCA
+
+    if solver == "auto":
+        solver = "randomized" if len(X_scaled) > LARGE_PCA_ROWS else "full"
+
+    if solver == "incremental":
+        pca = IncrementalPCA(n_components=2, batch_size=max(batch_size, 10))
+    elif solver == "randomized":
+        pca = PCA(n_components=2, svd_solver="randomized", random_state=42)
+    else:
+        pca = PCA(n_components=2, random_state=42)
+
+    return pca, pca.fit_transform(X_scaled)
+
+
+def _pca_basis(ref: ReferenceSet, solver: str) -> Dict[str, Any]:
+    """Scaler + 2D PCA fitted on the reference alone (cached on the set)"""
+    def build(df_orig: pd.DataFrame) -> Dict[str, Any]:
+        from sklearn.preprocessing import StandardScaler
+
+        categories = {
+            col: np.sort(df_orig[col].astype(str).unique())
+            for col in PCA_CATEGORICAL_COLS if col in df_orig.columns
+        }
+        categories["_numeric"] = [c for c in PCA_NUMERIC_COLS if c in df_orig.columns]
+        X = _pca_feature_matrix(df_orig, categories)
+        scaler = StandardScaler().fit(X)
+        pca, coords = _fit_pca(scaler.transform(X), solver)
+        return {"categories": categories, "scaler": scaler, "pca": pca, "coords": coords,
+                "coords_sorted": np.sort(coords, axis=0)}
+
+    return ref.artifact(("pca_basis", solver), build)
+
+
+def _scaled_reference(ref: ReferenceSet, numeric_cols: List[str]) -> Dict[str, Any]:
+    """
+    Fitted scaler and scaled matrix for a reference set
+
+    Returns a dict with scaler, X_orig (scaled) and values (raw float
+    matrix, NaNs kept). NaNs are mean-filled before scaling.
+    """
+    def build(df_orig: pd.DataFrame) -> Dict[str, Any]:
+        from sklearn.preprocessing import StandardScaler
+
+        values = df_orig[numeric_cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        filled = np.where(np.isnan(values), np.nanmean(values, axis=0), values)
+        scaler = StandardScaler()
+        X_orig = scaler.fit_transform(filled)
+        return {"scaler": scaler, "X_orig": X_orig, "values": values}
+
+    return ref.artifact(("scaled", tuple(numeric_cols)), build)
+
+
+def _knn_index(ref: ReferenceSet, numeric_cols: List[str], backend: str = "auto",
+               n_trees: int = DEFAULT_ANN_TREES) -> Dict[str, Any]:
+    """
+    Scaled reference plus a fitted neighbor index (see neighbors.py)
+
+    Returns the _scaled_reference dict with the index added under knn.
+    """
+    scaled = _scaled_reference(ref, numeric_cols)
+    if backend == "exact":
+        n_trees = 0
+    knn = ref.artifact(
+        ("knn_index", tuple(numeric_cols), backend, n_trees),
+        lambda _: build_neighbor_index(scaled["X_orig"], backend, n_trees=max(n_trees, 1))
+    )
+    return {**scaled, "knn": knn}
+
+
+def _sorted_columns(ref: ReferenceSet, numeric_cols: List[str]) -> Dict[str, np.ndarray]:
+    """Per-column sorted non-null reference values (for distribution distances)"""
+    def build(df_orig: pd.DataFrame) -> Dict[str, np.ndarray]:
+        return {col: sort_sample(pd.to_numeric(df_orig[col], errors="coerce")) for col in numeric_cols}
+
+    return ref.artifact(("sorted_columns", tuple(numeric_cols)), build)
+
+
+def _correlation(ref: ReferenceSet, numeric_cols: List[str]) -> np.ndarray:
+    """Pearson correlation matrix of the reference columns"""
+    return ref.artifact(
+        ("correlation", tuple(numeric_cols)),
+        lambda df_orig: df_orig[numeric_cols].corr().to_numpy()
+    )
+
+
+def stratified_sample_indices(strata: np.ndarray, max_points: int,
+                              rng: np.random.Generator) -> np.ndarray:
+    """
+    Proportional stratified subsample without replacement
+
+    Args:
+        strata: Integer stratum code per row
+        max_points: Target sample size
+        rng: NumPy random generator
+
+    Returns:
+        Sorted row indices of the sample
+    """
+    n = len(strata)
+    if n <= max_points:
+        return np.arange(n)
+
+    # Largest-remainder allocation so quotas sum to exactly max_points
+    counts = np.bincount(strata)
+    share = counts * (max_points / n)
+    quota = np.floor(share).astype(int)
+    quota[np.argsort(quota - share)[:max_points - quota.sum()]] += 1
+
+    # Shuffle, rank rows within their stratum, keep the first quota[stratum]
+    perm = rng.permutation(n)
+    shuffled = strata[perm]
+    rank = pd.Series(shuffled).groupby(shuffled).cumcount().to_numpy()
+    return np.sort(perm[rank < quota[shuffled]])
+
+
+def _points(coords: np.ndarray) -> List[Dict[str, float]]:
+    """Serialize (n, 2) coordinates as [{"pca1", "pca2"}] records"""
+    return [{"pca1": a, "pca2": b} for a, b in coords.tolist()]
+
+
+def _density(orig: np.ndarray, syn: np.ndarray, bins: int) -> Dict[str, Any]:
+    """2D histograms of both datasets on shared bin edges"""
+    both = np.vstack([orig, syn])
+    x_edges = np.histogram_bin_edges(both[:, 0], bins=bins)
+    y_edges = np.histogram_bin_edges(both[:, 1], bins=bins)
+    h_orig, _, _ = np.histogram2d(orig[:, 0], orig[:, 1], bins=[x_edges, y_edges])
+    h_syn, _, _ = np.histogram2d(syn[:, 0], syn[:, 1], bins=[x_edges, y_edges])
+    return {
+        "x_edges": x_edges.tolist(),
+        "y_edges": y_edges.tolist(),
+        "original_counts": h_orig.astype(int).tolist(),
+        "synthetic_counts": h_syn.astype(int).tolist()
+    }
+
+
+def compute_pca_comparison(df_orig: pd.DataFrame, df_syn: pd.DataFrame,
+                           output: str = "points",
+                           max_points: Optional[int] = None,
+                           bins: int = 50,
+                           solver: str = "auto",
+                           seed: int = 42,
+                           basis: str = "combined",
+                           reference: Optional[ReferenceSet] = None) -> Dict[str, Any]:
+    """
+    Project original + synthetic data to 2D PCA and score their similarity
+
+    The quality score is always computed on all rows; max_points and
+    output="density" only shrink what is returned for plotting.
+
+    Args:
+        df_orig: Original/pilot data
+        df_syn: Synthetic data
+        output: "points" (coordinates) or "density" (2D binned counts)
+        max_points: Per-dataset cap on returned points (stratified by
+            VisitName x TreatmentArm when present)
+        bins: Bins per axis for density output
+        solver: auto, full, randomized or incremental
+        seed: Seed for subsampling
+        basis: "combined" fits PCA on original + synthetic; "reference"
+            reuses a basis fitted on the original alone (cached per
+            reference set) and only projects the synthetic rows
+        reference: Cached reference set for df_orig (looked up by content
+            hash when omitted)
+
+    Returns:
+        Dict with original_pca, synthetic_pca, density, explained_variance,
+        quality_score and row counts
+    """
+    from sklearn.preprocessing import StandardScaler
+
+    if output not in PCA_OUTPUTS:
+        raise ValueError(f"output must be one of: {', '.join(PCA_OUTPUTS)}")
+    if solver not in PCA_SOLVERS:
+        raise ValueError(f"solver must be one of: {', '.join(PCA_SOLVERS)}")
+    if basis not in PCA_BASES:
+        raise ValueError(f"basis must be one of: {', '.join(PCA_BASES)}")
+
+    n_orig = len(df_orig)
+
+    # Scale features and project to 2D
+    if basis == "reference":
+        fitted = _pca_basis(reference or get_reference(df_orig), solver)
+        pca = fitted["pca"]
+        orig_pca = fitted["coords"]
+        X_syn = _pca_feature_matrix(df_syn, fitted["categories"])
+        syn_pca = pca.transform(fitted["scaler"].transform(X_syn))
+        X_pca = np.vstack([orig_pca, syn_pca])
+    else:
+        X = _pca_feature_matrix(pd.concat([df_orig, df_syn], ignore_index=True))
+        X_scaled = StandardScaler().fit_transform(X)
+        pca, X_pca = _fit_pca(X_scaled, solver)
+        orig_pca = X_pca[:n_orig]
+        syn_pca = X_pca[n_orig:]
+
+    # Quality score (Wasserstein distance in PCA space, full data)
+    if basis == "reference":
+        orig_sorted = fitted["coords_sorted"]
+        dist_pc1, dist_pc2 = (
+            compare_sorted(orig_sorted[:, j], np.sort(syn_pca[:, j]), quantiles=None)["wasserstein"]
+            for j in range(2)
+        )
+    else:
+        dist_pc1, dist_pc2 = (
+            compare_samples(orig_pca[:, j], syn_pca[:, j], quantiles=None)["wasserstein"]
+            for j in range(2)
+        )
+
+    # Normalize distances and convert to similarity score (0-1)
+    # Lower distance = higher score
+    max_dist = max(
+        X_pca[:, 0].std(ddof=1) * 2,  # Rough estimate of max expected distance
+        X_pca[:, 1].std(ddof=1) * 2
+    )
+    normalized_dist = (dist_pc1 + dist_pc2) / (2 * max_dist)
+    quality_score = max(0.0, 1.0 - normalized_dist)
+
+    result = {
+        "original_pca": [],
+        "synthetic_pca": [],
+        "density": None,
+        "explained_variance": pca.explained_variance_ratio_.tolist(),
+        "quality_score": round(float(quality_score), 3),
+        "n_original": int(n_orig),
+        "n_synthetic": int(len(df_syn)),
+        "sampled": False
+    }
+
+    if output == "density":
+        result["density"] = _density(orig_pca, syn_pca, bins)
+        return result
+
+    if max_points and (n_orig > max_points or len(df_syn) > max_points):
+        strata_cols = [c for c in PCA_CATEGORICAL_COLS if c in df_orig.columns and c in df_syn.columns]
+        if strata_cols:
+            df_strata = pd.concat([df_orig[strata_cols], df_syn[strata_cols]], ignore_index=True)
+            strata = df_strata.groupby(strata_cols, sort=False, dropna=False).ngroup().to_numpy()
+        else:
+            strata = np.zeros(n_orig + len(df_syn), dtype=int)
+        rng = np.random.default_rng(seed)
+        orig_pca = orig_pca[stratified_sample_indices(strata[:n_orig], max_points, rng)]
+        syn_pca = syn_pca[stratified_sample_indices(strata[n_orig:], max_points, rng)]
+        result["sampled"] = True
+
+    result["original_pca"] = _points(orig_pca)
+    result["synthetic_pca"] = _points(syn_pca)
+    return result
+
+
+def knn_neighbor_means(values: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """
+    Mean of each row's K nearest reference rows, for every column at once
+
+    One fancy-indexed gather on the (n_syn, k) neighbor matrix replaces a
+    per-row, per-column pandas lookup. NaNs in the reference are skipped,
+    matching pandas' mean().
+
+    Args:
+        values: (n_orig, n_cols) raw reference values
+        indices: (n_syn, k) neighbor indices into values
+
+    Returns:
+        (n_syn, n_cols) neighbor means
+    """
+    out = np.empty((indices.shape[0], values.shape[1]))
+    has_nan = np.isnan(values).any(axis=0)
+    for j in range(values.shape[1]):
+        gathered = values[:, j][indices]
+        if has_nan[j]:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[:, j] = np.nansum(gathered, axis=1) / (~np.isnan(gathered)).sum(axis=1)
+        else:
+            out[:, j] = gathered.mean(axis=1)
+    return out
+
+
+def _metric_pool() -> ThreadPoolExecutor:
+    """Shared pool for per-column / per-metric work (NumPy releases the GIL)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=METRIC_WORKERS, thread_name_prefix="quality-metric")
+        return _pool
+
+
+def _select_metrics(metrics: Optional[Sequence[str]]) -> List[str]:
+    if not metrics:
+        return list(QUALITY_METRICS)
+    unknown = sorted(set(metrics) - set(QUALITY_METRICS))
+    if unknown:
+        raise ValueError(f"Unknown metrics: {', '.join(unknown)}. Choose from: {', '.join(QUALITY_METRICS)}")
+    return [m for m in QUALITY_METRICS if m in metrics]
+
+
+def _parallel_kneighbors(pool: ThreadPoolExecutor, knn, X: np.ndarray, n_neighbors: int):
+    """kneighbors over row blocks of X in the metric pool"""
+    n_blocks = min(METRIC_WORKERS, max(1, len(X) // KNN_BLOCK_ROWS))
+    if n_blocks == 1:
+        return knn.kneighbors(X, n_neighbors)
+    blocks = [pool.submit(knn.kneighbors, block, n_neighbors) for block in np.array_split(X, n_blocks)]
+    results = [f.result() for f in blocks]
+    return np.vstack([d for d, _ in results]), np.vstack([i for _, i in results])
+
+
+def compute_comprehensive_quality(df_orig: pd.DataFrame, df_syn: pd.DataFrame,
+                                  k: int = 5,
+                                  reference: Optional[ReferenceSet] = None,
+                                  neighbor_backend: str = "auto",
+                                  ann_trees: int = DEFAULT_ANN_TREES,
+                                  metrics: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Comprehensive quality metrics for synthetic vs original data
+
+    Wasserstein distance, correlation preservation, K-NN RMSE, K-NN
+    imputation score and Euclidean distance statistics, combined into a
+    weighted overall score. Everything derived from the original data
+    (scaler, KD-tree, sorted columns, correlation matrix) is cached on its
+    reference set, so each new candidate is scored without refitting.
+    Per-column distances, the correlation matrix and blocks of the
+    neighbor search run concurrently in the metric thread pool.
+
+    Args:
+        df_orig: Original/real data
+        df_syn: Synthetic data
+        k: Number of nearest neighbors
+        reference: Cached reference set for df_orig (looked up by content
+            hash when omitted)
+        neighbor_backend: exact, approximate or auto (see neighbors.py)
+        ann_trees: Random-projection trees for the approximate backend;
+            more trees = higher recall, slower queries
+        metrics: Subset of QUALITY_METRICS to compute (default: all). The
+            overall score is re-weighted over the selected components;
+            rmse, knn and euclidean share one neighbor search.
+
+    Returns:
+        Dict matching ComprehensiveQualityResponse (unselected metrics None)
+    """
+    selected = _select_metrics(metrics)
+
+    # Select numeric columns for analysis
+    numeric_cols = [c for c in QUALITY_NUMERIC_COLS if c in df_orig.columns and c in df_syn.columns]
+
+    if not numeric_cols:
+        raise ValueError("No common numeric columns found for comparison")
+
+    ref = reference or get_reference(df_orig)
+    pool = _metric_pool()
+    result: Dict[str, Any] = {
+        "wasserstein_distances": None,
+        "correlation_preservation": None,
+        "rmse_by_column": None,
+        "knn_imputation_score": None,
+        "euclidean_distances": None,
+        "neighbor_search": None,
+        "distribution_distances": None
+    }
+    components: Dict[str, float] = {}
+    summary_parts: List[str] = []
+
+    # Submit independent work first, then collect
+    # ===== 1. Wasserstein Distance (Distribution Similarity) =====
+    # KS, energy distance and quantile deltas come from the same sorted
+    # buffers (see distances.py)
+    if "wasserstein" in selected:
+        orig_sorted = _sorted_columns(ref, numeric_cols)
+        column_futures = {
+            col: pool.submit(compare_columns, {col: orig_sorted[col]}, df_syn[[col]])
+            for col in numeric_cols
+        }
+
+    # ===== 2. Correlation Preservation =====
+    if "correlation" in selected:
+        corr_orig = _correlation(ref, numeric_cols)
+        corr_future = pool.submit(lambda: df_syn[numeric_cols].corr().to_numpy())
+
+    # ===== 3. K-NN search (shared by RMSE, K-NN score, Euclidean) =====
+    if {"rmse", "knn", "euclidean"} & set(selected):
+        # Standardize + fit K-NN on original data (cached per original dataset)
+        index = _knn_index(ref, numeric_cols, neighbor_backend, ann_trees)
+        syn_values = df_syn[numeric_cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        syn_filled = np.where(np.isnan(syn_values), np.nanmean(syn_values, axis=0), syn_values)
+        X_syn = index["scaler"].transform(syn_filled)
+
+        # Find nearest neighbors for each synthetic point
+        distances, indices = _parallel_kneighbors(
+            pool, index["knn"], X_syn, min(k, len(index["X_orig"]))
+        )
+        result["neighbor_search"] = {
+            **index["knn"].describe(),
+            "recall": measure_recall(index["knn"], index["X_orig"], X_syn, k, approx_indices=indices)
+        }
+
+    if "wasserstein" in selected:
+        column_distances = {}
+        for col, future in column_futures.items():
+            column_distances.update(future.result())
+        wasserstein_distances = {col: d["wasserstein"] for col, d in column_distances.items()}
+        wasserstein_avg = np.mean(list(wasserstein_distances.values()))
+        # Typical Wasserstein for vitals is 0-20 range, normalize to 0-1
+        components["wasserstein"] = max(0.0, 1.0 - (wasserstein_avg / 20.0))
+        summary_parts.append(f"Wasserstein avg: {wasserstein_avg:.2f}")
+        result["wasserstein_distances"] = {col: round(v, 3) for col, v in wasserstein_distances.items()}
+        result["distribution_distances"] = {
+            col: {
+                "ks": round(d["ks"], 4),
+                "wasserstein": round(d["wasserstein"], 4),
+                "energy": round(d["energy"], 4),
+                "quantile_deltas": {
+                    f"q{int(q * 100):02d}": round(float(delta), 4)
+                    for q, delta in zip(DEFAULT_QUANTILES, d["quantile_deltas"])
+                }
+            }
+            for col, d in column_distances.items()
+        }
+
+    if "correlation" in selected:
+        # Flatten correlation matrices and compute similarity
+        corr_diff = np.abs(corr_orig - corr_future.result())
+        # Use 1 - mean absolute difference as correlation preservation score
+        correlation_preservation = float(1.0 - np.mean(corr_diff[np.triu_indices_from(corr_diff, k=1)]))
+        correlation_preservation = max(0.0, min(1.0, correlation_preservation))
+        components["correlation"] = correlation_preservation
+        summary_parts.append(f"Correlation preserved: {correlation_preservation:.2%}")
+        result["correlation_preservation"] = round(correlation_preservation, 3)
+
+    # ===== 4. RMSE by Column (Compared to Nearest Neighbors) =====
+    if "rmse" in selected:
+        # RMSE per column between each synthetic row and the mean of its
+        # K nearest original rows (one gather per column)
+        knn_means = knn_neighbor_means(index["values"], indices)
+        rmse = np.sqrt(np.mean((syn_filled - knn_means) ** 2, axis=0))
+        rmse_by_column = {col: round(float(rmse[j]), 3) for j, col in enumerate(numeric_cols)}
+        rmse_avg = np.mean(list(rmse_by_column.values()))
+        # Typical RMSE is 0-15, normalize (lower is better)
+        components["rmse"] = max(0.0, 1.0 - (rmse_avg / 15.0))
+        summary_parts.append(f"RMSE avg: {rmse_avg:.2f}")
+        result["rmse_by_column"] = rmse_by_column
+
+    # ===== 5. K-NN Imputation Score =====
+    if "knn" in selected:
+        # Lower distance = better match = higher score
+        mean_distance = float(np.mean(distances))
+        # Normalize by typical distance scale (use max observed distance)
+        max_distance = float(np.max(distances))
+        if max_distance > 0:
+            knn_imputation_score = float(1.0 - (mean_distance / max_distance))
+        else:
+            knn_imputation_score = 1.0
+        knn_imputation_score = max(0.0, min(1.0, knn_imputation_score))
+        components["knn"] = knn_imputation_score
+        summary_parts.append(f"K-NN score: {knn_imputation_score:.2f}")
+        result["knn_imputation_score"] = round(knn_imputation_score, 3)
+
+    # ===== 6. Euclidean Distance Statistics =====
+    if "euclidean" in selected:
+        result["euclidean_distances"] = {
+            "mean_distance": round(float(np.mean(distances)), 3),
+            "median_distance": round(float(np.median(distances)), 3),
+            "min_distance": round(float(np.min(distances)), 3),
+            "max_distance": round(float(np.max(distances)), 3),
+            "std_distance": round(float(np.std(distances)), 3)
+        }
+
+    # ===== 7. Overall Quality Score (Weighted Average) =====
+    weights = {name: w for name, w in SCORE_WEIGHTS.items() if name in components}
+    if weights:
+        overall_quality_score = float(sum(w * components[name] for name, w in weights.items()) / sum(weights.values()))
+    else:
+        overall_quality_score = 0.0
+    overall_quality_score = round(max(0.0, min(1.0, overall_quality_score)), 3)
+
+    # ===== 8. Generate Summary =====
+    if overall_quality_score >= 0.85:
+        summary = f"✅ EXCELLENT - Quality score: {overall_quality_score:.2f}. Synthetic data is production-ready and closely matches original distribution."
+    elif overall_quality_score >= 0.70:
+        summary = f"✓ GOOD - Quality score: {overall_quality_score:.2f}. Synthetic data is usable with minor differences from original."
+    else:
+        summary = f"⚠️ NEEDS IMPROVEMENT - Quality score: {overall_quality_score:.2f}. Consider adjusting generation parameters or using a different method."
+
+    if summary_parts:
+        summary += " | " + ", ".join(summary_parts)
+
+    result["overall_quality_score"] = overall_quality_score
+    result["metrics"] = selected
+    result["summary"] = summary
+    return result
+
+
+def compute_distribution_distances(reference: ReferenceSet, replicates: List[pd.DataFrame],
+                                   columns: Optional[List[str]] = None,
+                                   quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Dict[str, Any]:
+    """
+    KS, Wasserstein-1, energy distance and quantile deltas for many
+    synthetic replicates against one reference, column by column
+
+    Reference columns are sorted once (cached on the reference set) and
+    each column is scored for all replicates in batched calls.
+
+    Args:
+        reference: Reference set (original data)
+        replicates: Synthetic datasets to score
+        columns: Numeric columns (defaults to the vitals columns present)
+        quantiles: Probabilities for quantile deltas
+
+    Returns:
+        Dict with n_replicates, quantiles and per-column lists (one value
+        per replicate)
+    """
+    df_orig = reference.df
+    if columns is None:
+        columns = [c for c in QUALITY_NUMERIC_COLS if c in df_orig.columns]
+    columns = [c for c in columns if c in df_orig.columns and all(c in r.columns for r in replicates)]
+    if not columns:
+        raise ValueError("No common numeric columns found for comparison")
+
+    orig_sorted = _sorted_columns(reference, columns)
+    result = {}
+    for col in columns:
+        samples = [pd.to_numeric(r[col], errors="coerce").to_numpy(dtype=float) for r in replicates]
+        scores = compare_replicates(orig_sorted[col], samples, quantiles)
+        result[col] = {key: np.round(val, 4).tolist() for key, val in scores.items()}
+
+    return {
+        "n_replicates": len(replicates),
+        "quantiles": list(quantiles),
+        "columns": result
+    }
+
@@ -6,6 +6,9 @@ import pandas as pd
 from datetime import datetime
 from typing import Dict, Tuple, Optional
 
+# KRIs that rbqm_trends.fetch_kri_totals can supply from the database
+DB_KRIS = ("late_entry_pct", "ae_reporting_timeliness_score", "screen_fail_rate")
+
 
 def subject_to_site(subject_id: str, site_size: int = 20) -> str:
     """
@@ -29,7 +32,8 @@ def subject_to_site(subject_id: str, site_size: int = 20) -> str:
 def generate_rbqm_summary(queries_df: pd.DataFrame, vitals_df: pd.DataFrame,
                           ae_df: Optional[pd.DataFrame],
                           thresholds: Dict[str, float],
-                          site_size: int) -> Tuple[str, pd.DataFrame, Dict]:
+                          site_size: int,
+                          kri_overrides: Optional[Dict] = None) -> Tuple[str, pd.DataFrame, Dict]:
     """
     Generate RBQM summary with KRIs and site-level quality metrics
 
@@ -46,6 +50,8 @@ def generate_rbqm_summary(queries_df: pd.DataFrame, vitals_df: pd.DataFrame,
         ae_df: Adverse events DataFrame (optional)
         thresholds: Quality tolerance limit thresholds
         site_size: Number of subjects per site
+        kri_overrides: Database-computed KRIs (see rbqm_trends.fetch_kri_totals)
+            replacing the demo placeholders where available
 
     Returns:
         Tuple of (markdown_summary, site_summary_df, kris_dict)
@@ -106,6 +112,23 @@ def generate_rbqm_summary(queries_df: pd.DataFrame, vitals_df: pd.DataFrame,
     enrolled_count = int(total_rows / 4)
     screen_fails = screened_count - enrolled_count
 
+    # Replace demo placeholders with DB-backed KRIs when provided; a window
+    # without rollups yields None values, which keep the placeholders
+    kri_sources = {
+        name: "database" if kri_overrides and kri_overrides.get(name) is not None else "placeholder"
+        for name in DB_KRIS
+    }
+    if kri_overrides:
+        if kri_overrides.get("late_entry_pct") is not None:
+            late_entry_pct = float(kri_overrides["late_entry_pct"])
+        if kri_overrides.get("ae_reporting_timeliness_score") is not None:
+            ae_reporting_timeliness_score = float(kri_overrides["ae_reporting_timeliness_score"])
+        if kri_overrides.get("screen_fail_rate") is not None:
+            screen_fail_rate = float(kri_overrides["screen_fail_rate"])
+            screened_count = int(kri_overrides.get("subjects_screened") or 0)
+            screen_fails = int(kri_overrides.get("screen_failures") or 0)
+            enrolled_count = screened_count - screen_fails
+
     # Site roll-up with enhanced drill-downs
     v = vitals_df.copy()
     v["SiteID"] = v["SubjectID"].apply(lambda s: subject_to_site(s, site_size=site_size))
@@ -245,7 +268,12 @@ def generate_rbqm_summary(queries_df: pd.DataFrame, vitals_df: pd.DataFrame,
         # Enrollment KRIs
         "screen_fail_rate": screen_fail_rate,
         "screened_count": screened_count,
-        "enrolled_count": enrolled_count
+        "enrolled_count": enrolled_count,
+
+        # Where each DB-backed KRI came from ("database" or "placeholder"),
+        # and overall: "database", "placeholder" or "mixed"
+        "kri_sources": kri_sources,
+        "kri_source": kri_sources[DB_KRIS[0]] if len(set(kri_sources.values())) == 1 else "mixed"
     }
 
     return "\n".join(lines), site_summary, kris
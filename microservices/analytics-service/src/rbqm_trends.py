@@ -0,0 +1,215 @@
+"""
+Database-backed RBQM Key Risk Indicator (KRI) pipeline
+
+Computes late-entry %, AE reporting timeliness and screen-fail rate from the
+vital_signs, queries and subjects tables with set-based SQL aggregations, and
+stores them as daily per-site rollups in rbqm_kri_daily. Trend queries over
+months then read the (small, indexed) rollup table instead of scanning the
+source tables.
+"""
+from datetime import date, timedelta
+from typing import Dict, Any, List, Optional
+
+
+# Rollups keep raw numerators/denominators so any period can be re-aggregated
+# exactly; percentages are only derived at read time.
+REFRESH_KRI_ROLLUPS_SQL = """
+WITH vitals_daily AS (
+    SELECT v.visit_date AS rollup_date,
+           p.site_id AS site_id,
+           COUNT(*) AS vitals_rows,
+           COUNT(*) FILTER (
+               WHERE v.created_at - v.measurement_time > $3::interval
+           ) AS late_entries
+    FROM vital_signs v
+    JOIN patients p ON p.patient_id = v.patient_id
+    WHERE v.visit_date BETWEEN $1 AND $2
+    GROUP BY 1, 2
+),
+queries_daily AS (
+    SELECT q.opened_at::date AS rollup_date,
+           COALESCE(s.site_id, 'UNKNOWN') AS site_id,
+           COUNT(*) AS total_queries,
+           COUNT(*) FILTER (
+               WHERE q.form_id = 'AE' OR q.check_id LIKE 'AE%'
+           ) AS ae_queries,
+           COUNT(*) FILTER (
+               WHERE (q.form_id = 'AE' OR q.check_id LIKE 'AE%')
+                 AND q.responded_at IS NOT NULL
+                 AND q.responded_at - q.opened_at <= CASE
+                     WHEN q.severity = 'critical' THEN INTERVAL '24 hours'
+                     ELSE INTERVAL '7 days'
+                 END
+           ) AS ae_queries_on_time
+    FROM queries q
+    LEFT JOIN subjects s ON s.subject_id = q.subject_id
+    WHERE q.opened_at >= $1 AND q.opened_at < $2 + 1
+    GROUP BY 1, 2
+),
+subjects_daily AS (
+    SELECT COALESCE(s.enrollment_date, s.created_at::date) AS rollup_date,
+           COALESCE(s.site_id, 'UNKNOWN') AS site_id,
+           COUNT(*) AS subjects_screened,
+           -- subjects has no screen-fail status; a registered subject that
+           -- never got an enrollment date did not pass screening
+           COUNT(*) FILTER (WHERE s.enrollment_date IS NULL) AS screen_failures
+    FROM subjects s
+    WHERE COALESCE(s.enrollment_date, s.created_at::date) BETWEEN $1 AND $2
+    GROUP BY 1, 2
+)
+INSERT INTO rbqm_kri_daily (
+    rollup_date, site_id, vitals_rows, late_entries, total_queries,
+    ae_queries, ae_queries_on_time, subjects_screened, screen_failures,
+    refreshed_at
+)
+SELECT COALESCE(v.rollup_date, q.rollup_date, s.rollup_date),
+       COALESCE(v.site_id, q.site_id, s.site_id),
+       COALESCE(v.vitals_rows, 0),
+       COALESCE(v.late_entries, 0),
+       COALESCE(q.total_queries, 0),
+       COALESCE(q.ae_queries, 0),
+       COALESCE(q.ae_queries_on_time, 0),
+       COALESCE(s.subjects_screened, 0),
+       COALESCE(s.screen_failures, 0),
+       NOW()
+FROM vitals_daily v
+FULL OUTER JOIN queries_daily q
+    ON q.rollup_date = v.rollup_date AND q.site_id = v.site_id
+FULL OUTER JOIN subjects_daily s
+    ON s.rollup_date = COALESCE(v.rollup_date, q.rollup_date)
+   AND s.site_id = COALESCE(v.site_id, q.site_id)
+ON CONFLICT (rollup_date, site_id) DO UPDATE SET
+    vitals_rows = EXCLUDED.vitals_rows,
+    late_entries = EXCLUDED.late_entries,
+    total_queries = EXCLUDED.total_queries,
+    ae_queries = EXCLUDED.ae_queries,
+    ae_queries_on_time = EXCLUDED.ae_queries_on_time,
+    subjects_screened = EXCLUDED.subjects_screened,
+    screen_failures = EXCLUDED.screen_failures,
+    refreshed_at = EXCLUDED.refreshed_at
+"""
+
+# Aggregates shared by the trend and totals queries (rollup table only)
+_KRI_AGGREGATES_SQL = """
+    SUM(vitals_rows) AS vitals_rows,
+    SUM(late_entries) AS late_entries,
+    SUM(total_queries) AS total_queries,
+    SUM(ae_queries) AS ae_queries,
+    SUM(subjects_screened) AS subjects_screened,
+    SUM(screen_failures) AS screen_failures,
+    ROUND(100.0 * SUM(late_entries) / NULLIF(SUM(vitals_rows), 0), 2) AS late_entry_pct,
+    ROUND(100.0 * SUM(ae_queries_on_time) / NULLIF(SUM(ae_queries), 0), 2) AS ae_reporting_timeliness_score,
+    ROUND(100.0 * SUM(screen_failures) / NULLIF(SUM(subjects_screened), 0), 2) AS screen_fail_rate
+"""
+
+TREND_GRANULARITIES = ("day", "week", "month")
+
+
+def _kri_row_to_dict(row) -> Dict[str, Any]:
+    """Convert an aggregated rollup row to plain JSON-friendly values"""
+    out = {}
+    for key, value in dict(row).items():
+        if isinstance(value, date):
+            out[key] = value.isoformat()
+        elif value is None:
+            out[key] = None
+        elif key.endswith(("_pct", "_score", "_rate")):
+            out[key] = float(value)
+        else:
+            out[key] = int(value)
+    return out
+
+
+async def refresh_kri_rollups(db, start_date: date, end_date: date,
+                              late_entry_hours: int = 72) -> int:
+    """
+    Recompute daily KRI rollups for a date window
+
+    Days in the window are deleted and re-aggregated in one transaction so
+    rollups for days whose source rows disappeared do not linger.
+
+    Args:
+        db: DatabaseConnection with an open pool
+        start_date: First day to recompute (inclusive)
+        end_date: Last day to recompute (inclusive)
+        late_entry_hours: Entry delay after measurement that counts as late
+
+    Returns:
+        Number of (day, site) rollup rows written
+    """
+    if not db.pool:
+        raise RuntimeError("Database not connected")
+    if end_date < start_date:
+        raise ValueError("end_date must not be before start_date")
+
+    async with db.pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute(
+                "DELETE FROM rbqm_kri_daily WHERE rollup_date BETWEEN $1 AND $2",
+                start_date, end_date
+            )
+            result = await conn.execute(
+                REFRESH_KRI_ROLLUPS_SQL,
+                start_date, end_date, timedelta(hours=late_entry_hours)
+            )
+
+    # asyncpg returns the command tag, e.g. "INSERT 0 42"
+    return int(result.split()[-1])
+
+
+async def fetch_kri_trends(db, start_date: date, end_date: date,
+                           granularity: str = "day",
+                           site_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Read a KRI time series from the daily rollup table
+
+    Args:
+        db: DatabaseConnection with an open pool
+        start_date: First day of the series (inclusive)
+        end_date: Last day of the series (inclusive)
+        granularity: Bucket size - day, week or month
+        site_id: Restrict to a single site (optional)
+
+    Returns:
+        List of per-period KRI dicts ordered by period
+    """
+    if granularity not in TREND_GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(TREND_GRANULARITIES)}")
+
+    params = [granularity, start_date, end_date]
+    site_sql = ""
+    if site_id:
+        params.append(site_id)
+        site_sql = "AND site_id = $4"
+
+    rows = await db.fetch(f"""
+        SELECT date_trunc($1, rollup_date)::date AS period,
+               {_KRI_AGGREGATES_SQL}
+        FROM rbqm_kri_daily
+        WHERE rollup_date BETWEEN $2 AND $3 {site_sql}
+        GROUP BY 1
+        ORDER BY 1
+    """, *params)
+
+    return [_kri_row_to_dict(r) for r in rows]
+
+
+async def fetch_kri_totals(db, start_date: date, end_date: date) -> Dict[str, Any]:
+    """
+    Aggregate KRIs over a whole window (all sites)
+
+    Args:
+        db: DatabaseConnection with an open pool
+        start_date: First day of the window (inclusive)
+        end_date: Last day of the window (inclusive)
+
+    Returns:
+        Dict of KRI values; percentages are None when there is no denominator
+    """
+    row = await db.fetchrow(f"""
+        SELECT {_KRI_AGGREGATES_SQL}
+        FROM rbqm_kri_daily
+        WHERE rollup_date BETWEEN $1 AND $2
+    """, start_date, end_date)
+
+    return _kri_row_to_dict(row) if row else {}
@@ -0,0 +1,190 @@
+"""
+Reference dataset cache for quality assessments
+Original/pilot datasets and their fitted scoring artifacts, keyed by
+content hash or by a registered ID
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+
+def dataset_fingerprint(df: pd.DataFrame, columns: Optional[List[str]] = None) -> str:
+    """
+    Content hash of selected columns (order-sensitive, index-insensitive)
+
+    Rows are hashed with pandas' vectorized hash_pandas_object, so
+    fingerprinting costs one pass over the data. Defaults to all columns
+    in name order, so key order in the posted records does not matter.
+    """
+    if columns is None:
+        columns = sorted(df.columns, key=str)
+    row_hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    h = hashlib.blake2b(digest_size=16)
+    h.update("|".join(map(str, columns)).encode("utf-8"))
+    h.update(row_hashes.tobytes())
+    return h.hexdigest()
+
+
+class LRUCache:
+    """Small thread-safe LRU mapping with hit/miss counters"""
+
+    def __init__(self, maxsize: int = 8):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
+
+
+def _artifact_label(key: Any) -> str:
+    """Readable artifact key, e.g. knn_index[SystolicBP,DiastolicBP]"""
+    if not isinstance(key, tuple):
+        return str(key)
+    name, *params = key
+    flat = [str(p) for param in params for p in (param if isinstance(param, tuple) else (param,))]
+    return f"{name}[{','.join(flat)}]" if flat else str(name)
+
+
+class ReferenceSet:
+    """
+    An original/pilot dataset plus lazily built scoring artifacts
+
+    Artifacts (fitted scaler, neighbor index, sorted columns, correlation
+    matrix, PCA basis, ...) are built on first use by the caller-supplied
+    builder and then reused for every candidate scored against this set.
+    """
+
+    def __init__(self, df: pd.DataFrame, fingerprint: str, reference_id: Optional[str] = None):
+        self.df = df
+        self.fingerprint = fingerprint
+        self.reference_id = reference_id or fingerprint
+        self.created_at = datetime.utcnow()
+        self._artifacts: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+
+    def artifact(self, key: Any, build: Callable[[pd.DataFrame], Any]) -> Any:
+        """Return the artifact stored under key, building it once if missing"""
+        with self._lock:
+            if key not in self._artifacts:
+                self._artifacts[key] = build(self.df)
+            return self._artifacts[key]
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            artifacts = sorted(_artifact_label(k) for k in self._artifacts)
+        return {
+            "reference_id": self.reference_id,
+            "fingerprint": self.fingerprint,
+            "n_rows": int(len(self.df)),
+            "columns": [str(c) for c in self.df.columns],
+            "artifacts": artifacts,
+            "created_at": self.created_at.isoformat()
+        }
+
+
+# Anonymous references (looked up by content hash) are LRU-evicted;
+# registered references stay until explicitly removed
+reference_cache = LRUCache(maxsize=int(os.getenv("REFERENCE_CACHE_SIZE", "8")))
+_registered: Dict[str, ReferenceSet] = {}
+_registered_lock = threading.Lock()
+
+
+def get_reference(df: pd.DataFrame) -> ReferenceSet:
+    """
+    Reference set for a posted original dataset
+
+    Identical content maps to the same set (registered or cached), so its
+    artifacts are reused instead of refitted.
+    """
+    fingerprint = dataset_fingerprint(df)
+    with _registered_lock:
+        for ref in _registered.values():
+            if ref.fingerprint == fingerprint:
+                return ref
+
+    ref = reference_cache.get(fingerprint)
+    if ref is None:
+        ref = ReferenceSet(df, fingerprint)
+        reference_cache.put(fingerprint, ref)
+    return ref
+
+
+def register_reference(df: pd.DataFrame, reference_id: Optional[str] = None) -> ReferenceSet:
+    """
+    Pin an original dataset under an ID (defaults to its content hash)
+
+    Args:
+        df: Original/pilot DataFrame
+        reference_id: Optional caller-chosen ID
+
+    Returns:
+        The registered ReferenceSet
+    """
+    fingerprint = dataset_fingerprint(df)
+    ref = reference_cache.get(fingerprint)
+    if ref is None or (reference_id and ref.reference_id != reference_id):
+        ref = ReferenceSet(df, fingerprint, reference_id)
+    with _registered_lock:
+        _registered[ref.reference_id] = ref
+    return ref
+
+
+def resolve_reference(reference_id: str) -> ReferenceSet:
+    """Registered reference by ID (KeyError if unknown)"""
+    with _registered_lock:
+        if reference_id not in _registered:
+            raise KeyError(f"Unknown reference_id: {reference_id}")
+        return _registered[reference_id]
+
+
+def unregister_reference(reference_id: str) -> bool:
+    with _registered_lock:
+        return _registered.pop(reference_id, None) is not None
+
+
+def list_references() -> List[Dict[str, Any]]:
+    with _registered_lock:
+        refs = list(_registered.values())
+    return [ref.describe() for ref in refs]
+
+
+def reference_cache_stats() -> Dict[str, Any]:
+    with _registered_lock:
+        registered = len(_registered)
+    return {"registered": registered, "cache": reference_cache.stats()}
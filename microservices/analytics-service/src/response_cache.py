@@ -0,0 +1,153 @@
+"""
+Response caching for pure analytics endpoints
+Responses are keyed by a canonical hash of the request body and kept in a
+two-tier cache: an in-process LRU in front of Redis (shared by replicas)
+"""
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from db_utils import cache
+from reference_cache import LRUCache
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+# Bump to invalidate cached responses after output format changes
+RESPONSE_CACHE_VERSION = "v1"
+KEY_PREFIX = f"analytics:response:{RESPONSE_CACHE_VERSION}"
+
+# Seconds; override per endpoint with RESPONSE_CACHE_TTL_<ENDPOINT>
+DEFAULT_TTL = 3600
+ENDPOINT_TTLS = {
+    "stats_week12": 3600,
+    "stats_recist": 3600,
+    "stats_mmrm": 3600,
+    "stats_bootstrap": 3600,
+    "stats_interim": 3600,
+    "stats_group_sequential": 3600,
+    "rbqm_summary": 300,
+    "quality_pca": 1800,
+    "quality_comprehensive": 1800,
+    "quality_distances": 1800
+}
+
+
+def endpoint_ttl(endpoint: str) -> int:
+    default = ENDPOINT_TTLS.get(endpoint, DEFAULT_TTL)
+    return int(os.getenv(f"RESPONSE_CACHE_TTL_{endpoint.upper()}", str(default)))
+
+
+def payload_hash(payload: Any) -> str:
+    """
+    Canonical hash of a JSON-compatible payload
+
+    Keys are sorted and whitespace stripped, so the same body hashes the
+    same regardless of field order.
+    """
+    canonical = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """In-process LRU + Redis response cache with per-endpoint hit counters"""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self.local = LRUCache(maxsize=maxsize)
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, endpoint: str, outcome: str):
+        with self._lock:
+            counts = self._counts.setdefault(endpoint, {"local_hits": 0, "redis_hits": 0, "misses": 0})
+            counts[outcome] += 1
+
+    async def get(self, endpoint: str, key: str) -> Optional[Any]:
+        entry = self.local.get(key)
+        if entry is not None and entry[0] > time.time():
+            self._count(endpoint, "local_hits")
+            return entry[1]
+
+        raw = await cache.get(key)
+        if raw is not None:
+            value = json.loads(raw)
+            # Redis TTL is authoritative; keep the local copy at most as long
+            self.local.put(key, (time.time() + endpoint_ttl(endpoint), value))
+            self._count(endpoint, "redis_hits")
+            return value
+
+        self._count(endpoint, "misses")
+        return None
+
+    async def set(self, endpoint: str, key: str, value: Any):
+        value = jsonable_encoder(value)
+        ttl = endpoint_ttl(endpoint)
+        self.local.put(key, (time.time() + ttl, value))
+        await cache.set(key, json.dumps(value, separators=(",", ":")), ttl=ttl)
+
+    async def clear(self) -> int:
+        """Drop all cached responses (local and Redis); returns Redis keys deleted"""
+        self.local.clear()
+        return await cache.delete_pattern(f"{KEY_PREFIX}:*")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {name: dict(c) for name, c in self._counts.items()}
+        endpoints = {}
+        for name, c in counts.items():
+            total = c["local_hits"] + c["redis_hits"] + c["misses"]
+            hits = c["local_hits"] + c["redis_hits"]
+            endpoints[name] = {**c, "hit_rate": round(hits / total, 3) if total else 0.0,
+                               "ttl_seconds": endpoint_ttl(name)}
+        local = self.local.stats()
+        return {
+            "enabled": RESPONSE_CACHE_ENABLED,
+            "redis": bool(cache.enabled and cache.client),
+            "local_entries": local["entries"],
+            "local_maxsize": local["maxsize"],
+            "endpoints": endpoints
+        }
+
+
+response_cache = ResponseCache()
+
+
+def cached_response(endpoint: str, vary: Optional[Callable[[Any], Any]] = None,
+                    when: Optional[Callable[[Any], bool]] = None):
+    """
+    Cache an endpoint's response by its request body
+
+    The wrapped endpoint takes the request model as its first argument.
+    Only successful responses are stored (HTTPExceptions pass through).
+
+    Args:
+        endpoint: Cache namespace and TTL key (see ENDPOINT_TTLS)
+        vary: Extra key material derived from the request (e.g. the
+            content hash behind a reference_id); raising LookupError
+            bypasses the cache
+        when: Predicate; requests for which it is False are not cached
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(request, *args, **kwargs):
+            if not RESPONSE_CACHE_ENABLED or (when is not None and not when(request)):
+                return await func(request, *args, **kwargs)
+            try:
+                extra = vary(request) if vary is not None else None
+            except LookupError:
+                return await func(request, *args, **kwargs)
+
+            key = f"{KEY_PREFIX}:{endpoint}:{payload_hash([request, extra])}"
+            hit = await response_cache.get(endpoint, key)
+            if hit is not None:
+                return hit
+            result = await func(request, *args, **kwargs)
+            await response_cache.set(endpoint, key, result)
+            return result
+        return wrapper
+    return decorator
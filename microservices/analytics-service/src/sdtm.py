@@ -2,15 +2,63 @@
 SDTM (Study Data Tabulation Model) export functions
 Extracted from existing monolithic app.py
 """
+import json
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Union, BinaryIO
+
+import numpy as np
 import pandas as pd
-from typing import List, Dict
+
+# Parquet output is optional (pyarrow)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except Exception:
+    HAS_PYARROW = False
+
+
+STUDY_ID = "RASTUDY"
+
+# Source column -> (VSTESTCD, VSORRESU)
+VITALS_MAPPING = [
+    ("SystolicBP", "SYSBP", "mmHg"),
+    ("DiastolicBP", "DIABP", "mmHg"),
+    ("HeartRate", "HR", "bpm"),
+    ("Temperature", "TEMP", "C")
+]
+
+SDTM_VS_COLUMNS = ["STUDYID", "USUBJID", "VISIT", "VSTESTCD", "VSORRES", "VSORRESU"]
+
+# Fixed character lengths for XPT output (must be known before the first chunk)
+SDTM_VS_CHAR_LENGTHS = {
+    "STUDYID": 20,
+    "USUBJID": 40,
+    "VISIT": 40,
+    "VSTESTCD": 8,
+    "VSORRESU": 8
+}
+
+EXPORT_FORMATS = ("csv", "xpt", "parquet")
+DEFAULT_CHUNK_SIZE = 250_000
+
+
+def _usubjid(subject_ids: pd.Series) -> np.ndarray:
+    """Map SubjectID to USUBJID, rewriting each distinct ID once"""
+    codes, subjects = pd.factorize(subject_ids, use_na_sentinel=False)
+    return pd.Index(subjects).astype(str).str.replace("RA001", STUDY_ID, regex=False).to_numpy()[codes]
 
 
 def export_to_sdtm_vs(df: pd.DataFrame) -> pd.DataFrame:
     """
     Export vitals to SDTM VS (Vital Signs) domain
 
-    CDISC SDTM standard format for regulatory submission
+    CDISC SDTM standard format for regulatory submission.
+    Wide-to-long transform done with NumPy: each input row expands to one
+    row per vital sign, in input order.
 
     Args:
         df: Vitals DataFrame
@@ -21,28 +69,612 @@ def export_to_sdtm_vs(df: pd.DataFrame) -> pd.DataFrame:
     if df is None or df.empty:
         return pd.DataFrame()
 
-    rows = []
-    for _, r in df.iterrows():
-        usubjid = str(r["SubjectID"]).replace("RA001", "RASTUDY")
-
-        # Map each vital sign to SDTM format
-        vitals_mapping = [
-            ("SystolicBP", "SYSBP", "mmHg"),
-            ("DiastolicBP", "DIABP", "mmHg"),
-            ("HeartRate", "HR", "bpm"),
-            ("Temperature", "TEMP", "C")
-        ]
-
-        for src_col, test_code, unit in vitals_mapping:
-            rows.append({
-                "STUDYID": "RASTUDY",
-                "USUBJID": usubjid,
-                "VISIT": r["VisitName"],
-                "VSTESTCD": test_code,
-                "VSORRES": r[src_col],
-                "VSORRESU": unit
-            })
-
-    return pd.DataFrame(rows, columns=[
-        "STUDYID", "USUBJID", "VISIT", "VSTESTCD", "VSORRES", "VSORRESU"
-    ])
+    src_cols = [m[0] for m in VITALS_MAPPING]
+    n_tests = len(VITALS_MAPPING)
+
+    # Row-major ravel keeps (row, test) ordering without a sort
+    return pd.DataFrame({
+        "STUDYID": STUDY_ID,
+        "USUBJID": np.repeat(_usubjid(df["SubjectID"]), n_tests),
+        "VISIT": np.repeat(df["VisitName"].to_numpy(), n_tests),
+        "VSTESTCD": np.tile([m[1] for m in VITALS_MAPPING], len(df)),
+        "VSORRES": df[src_cols].to_numpy().ravel(),
+        "VSORRESU": np.tile([m[2] for m in VITALS_MAPPING], len(df))
+    }, columns=SDTM_VS_COLUMNS)
+
+
+def iter_sdtm_vs_chunks(source: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Yield SDTM VS chunks from a vitals DataFrame or an iterable of chunks
+
+    Args:
+        source: Vitals DataFrame, or an iterable of vitals DataFrames
+            (e.g. pd.read_csv(..., chunksize=n))
+        chunk_size: Input rows per chunk when source is a single DataFrame
+
+    Yields:
+        SDTM VS DataFrames of at most chunk_size * 4 rows
+    """
+    if isinstance(source, pd.DataFrame):
+        frame = source
+        source = (frame.iloc[i:i + chunk_size] for i in range(0, len(frame), chunk_size))
+
+    for chunk in source:
+        if chunk is not None and not chunk.empty:
+            yield export_to_sdtm_vs(chunk)
+
+
+# ---------------------------------------------------------------------------
+# Chunked writers (CSV / SAS XPORT v5 / Parquet)
+# ---------------------------------------------------------------------------
+
+def _ieee_to_ibm(values: np.ndarray) -> np.ndarray:
+    """
+    Convert float64 values to 8-byte IBM hexadecimal floats (big-endian)
+
+    NaN becomes the SAS standard missing value ".".
+    """
+    x = np.asarray(values, dtype=np.float64)
+    out = np.zeros(x.shape, dtype=">u8")
+
+    nan = np.isnan(x)
+    out[nan] = 0x2E00000000000000
+
+    nz = ~nan & (x != 0)
+    if nz.any():
+        v = x[nz]
+        mant, exp2 = np.frexp(np.abs(v))          # |v| = mant * 2**exp2, mant in [0.5, 1)
+        exp16 = -((-exp2) // 4)                    # ceil(exp2 / 4)
+        frac = np.ldexp(mant, 56 - (4 * exp16 - exp2)).astype(np.uint64)
+        biased = exp16 + 64
+        if (biased > 127).any():
+            raise ValueError("Value too large for SAS XPORT numeric")
+        underflow = biased < 0
+        bits = (
+            ((v < 0).astype(np.uint64) << np.uint64(63))
+            | (biased.clip(0).astype(np.uint64) << np.uint64(56))
+            | frac
+        )
+        bits[underflow] = 0
+        out[nz] = bits
+
+    return out
+
+
+def _xpt_header(name: str, tail: str = "0" * 30) -> bytes:
+    """80-byte XPORT header record"""
+    return f"HEADER RECORD*******{name:<8}HEADER RECORD!!!!!!!{tail:<32}".encode("ascii")
+
+
+class _XportWriter:
+    """Streaming SAS XPORT v5 writer (single dataset)"""
+
+    def __init__(self, fh: BinaryIO, dataset_name: str, columns: List[str],
+                 dtypes: Dict[str, str], char_lengths: Dict[str, int],
+                 labels: Optional[Dict[str, str]] = None):
+        self.fh = fh
+        self.columns = columns
+        self.char_lengths = char_lengths
+        self.numeric = {c: dtypes[c] == "num" for c in columns}
+        self.record_dtype = np.dtype([
+            (c, ">u8") if self.numeric[c] else (c, f"S{char_lengths.get(c, 200)}")
+            for c in columns
+        ])
+        self.bytes_written = 0
+        self._write_headers(dataset_name.upper()[:8], labels or {})
+
+    def _write(self, data: bytes):
+        self.fh.write(data)
+        self.bytes_written += len(data)
+
+    def _write_headers(self, dataset_name: str, labels: Dict[str, str]):
+        stamp = datetime.utcnow().strftime("%d%b%y:%H:%M:%S").upper().encode("ascii")
+        self._write(_xpt_header("LIBRARY"))
+        self._write(b"SAS     SAS     SASLIB  9.1     " + b"PYTHON  " + b" " * 24 + stamp)
+        self._write(stamp + b" " * 64)
+        self._write(_xpt_header("MEMBER", "000000000000000001600000000140"))
+        self._write(_xpt_header("DSCRPTR"))
+        self._write(b"SAS     " + f"{dataset_name:<8}".encode("ascii") + b"SASDATA 9.1     "
+                    + b"PYTHON  " + b" " * 24 + stamp)
+        self._write(stamp + b" " * 16 + b" " * 40 + b" " * 8)
+        self._write(_xpt_header("NAMESTR", f"000000{len(self.columns):04d}" + "0" * 20))
+
+        namestrs = b""
+        position = 0
+        for varnum, col in enumerate(self.columns, start=1):
+            length = 8 if self.numeric[col] else self.record_dtype[col].itemsize
+            namestrs += struct.pack(
+                ">hhhh8s40s8shhh2s8shhi52s",
+                1 if self.numeric[col] else 2, 0, length, varnum,
+                col.upper()[:8].ljust(8).encode("ascii"),
+                labels.get(col, "")[:40].ljust(40).encode("latin-1"),
+                b" " * 8, 0, 0, 0, b"\x00\x00", b" " * 8, 0, 0, position, b"\x00" * 52
+            )
+            position += length
+        self._write(namestrs)
+        self._pad()
+        self._write(_xpt_header("OBS"))
+
+    def _pad(self):
+        remainder = self.bytes_written % 80
+        if remainder:
+            self._write(b" " * (80 - remainder))
+
+    def write_chunk(self, chunk: pd.DataFrame):
+        records = np.empty(len(chunk), dtype=self.record_dtype)
+        for col in self.columns:
+            if self.numeric[col]:
+                records[col] = _ieee_to_ibm(pd.to_numeric(chunk[col], errors="coerce").to_numpy(dtype=float))
+            else:
+                # Encode/pad each distinct value once, then gather
+                length = self.record_dtype[col].itemsize
+                codes, uniques = pd.factorize(chunk[col].fillna(""))
+                text = pd.Index(uniques).astype(str).to_numpy(dtype="U")
+                encoded = np.char.ljust(np.char.encode(text, "latin-1"), length, fillchar=b" ")
+                records[col] = encoded.astype(f"S{length}")[codes]
+        self._write(records.tobytes())
+
+    def close(self):
+        self._pad()
+
+
+def write_sdtm_chunks(chunks: Iterable[pd.DataFrame], path: Union[str, BinaryIO],
+                      fmt: str = "csv", dataset_name: str = "VS",
+                      columns: Optional[List[str]] = None,
+                      char_lengths: Optional[Dict[str, int]] = None,
+                      labels: Optional[Dict[str, str]] = None) -> int:
+    """
+    Write SDTM domain chunks to a single CSV, SAS XPORT (v5) or Parquet file
+
+    Only one chunk is held in memory at a time. For XPT the column types are
+    taken from the first chunk and character columns use fixed lengths from
+    char_lengths (default 200, the XPORT v5 maximum; longer values are
+    truncated).
+
+    Args:
+        chunks: Iterable of SDTM DataFrames sharing the same columns
+        path: Output path or writable binary file object
+        fmt: csv, xpt or parquet
+        dataset_name: XPT member name (e.g. VS, DM)
+        columns: Column order (defaults to the first chunk's columns)
+        char_lengths: XPT character column lengths
+        labels: XPT variable labels
+
+    Returns:
+        Number of rows written
+    """
+    fmt = fmt.lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported SDTM export format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+    if fmt == "parquet" and not HAS_PYARROW:
+        raise RuntimeError("Parquet export requires pyarrow")
+
+    own_handle = isinstance(path, str)
+    fh = open(path, "wb") if own_handle else path
+    writer = None
+    rows = 0
+
+    try:
+        for chunk in chunks:
+            if columns is None:
+                columns = list(chunk.columns)
+            chunk = chunk[columns]
+
+            if fmt == "csv":
+                fh.write(chunk.to_csv(index=False, header=rows == 0).encode("utf-8"))
+            elif fmt == "xpt":
+                if writer is None:
+                    dtypes = {
+                        c: "num" if pd.api.types.is_numeric_dtype(chunk[c]) else "char"
+                        for c in columns
+                    }
+                    writer = _XportWriter(fh, dataset_name, columns, dtypes,
+                                          char_lengths or {}, labels)
+                writer.write_chunk(chunk)
+            else:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(fh, table.schema)
+                writer.write_table(table.cast(writer.schema))
+
+            rows += len(chunk)
+
+        if writer is not None:
+            writer.close()
+    finally:
+        if own_handle:
+            fh.close()
+
+    return rows
+
+
+def write_sdtm_vs(source: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+                  path: Union[str, BinaryIO], fmt: str = "csv",
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Stream vitals to an SDTM VS file in chunks (bounded memory)
+
+    Args:
+        source: Vitals DataFrame or iterable of vitals chunks
+        path: Output path or writable binary file object
+        fmt: csv, xpt or parquet
+        chunk_size: Input rows per chunk when source is a single DataFrame
+
+    Returns:
+        Number of SDTM VS rows written
+    """
+    return write_sdtm_chunks(
+        iter_sdtm_vs_chunks(source, chunk_size=chunk_size),
+        path,
+        fmt=fmt,
+        dataset_name="VS",
+        columns=SDTM_VS_COLUMNS,
+        char_lengths=SDTM_VS_CHAR_LENGTHS
+    )
+
+
+# ---------------------------------------------------------------------------
+# Multi-domain submission package (DM, VS, LB, AE)
+# ---------------------------------------------------------------------------
+
+SEX_MAP = {"Male": "M", "Female": "F"}
+RACE_MAP = {
+    "White": "WHITE",
+    "Black": "BLACK OR AFRICAN AMERICAN",
+    "Asian": "ASIAN",
+    "Other": "OTHER"
+}
+
+# Source column -> (LBTESTCD, LBTEST, LBORRESU)
+LAB_MAPPING = [
+    ("Hemoglobin", "HGB", "Hemoglobin", "g/dL"),
+    ("Hematocrit", "HCT", "Hematocrit", "%"),
+    ("WBC", "WBC", "Leukocytes", "10^3/uL"),
+    ("Platelets", "PLAT", "Platelets", "10^3/uL"),
+    ("Glucose", "GLUC", "Glucose", "mg/dL"),
+    ("Creatinine", "CREAT", "Creatinine", "mg/dL"),
+    ("BUN", "BUN", "Blood Urea Nitrogen", "mg/dL"),
+    ("ALT", "ALT", "Alanine Aminotransferase", "U/L"),
+    ("AST", "AST", "Aspartate Aminotransferase", "U/L"),
+    ("Bilirubin", "BILI", "Bilirubin", "mg/dL"),
+    ("TotalCholesterol", "CHOL", "Cholesterol", "mg/dL"),
+    ("LDL", "LDL", "LDL Cholesterol", "mg/dL"),
+    ("HDL", "HDL", "HDL Cholesterol", "mg/dL"),
+    ("Triglycerides", "TRIG", "Triglycerides", "mg/dL")
+]
+
+# Define-style dataset metadata
+DOMAIN_METADATA = {
+    "DM": {
+        "label": "Demographics",
+        "class": "Special-Purpose",
+        "structure": "One record per subject",
+        "keys": ["STUDYID", "USUBJID"]
+    },
+    "VS": {
+        "label": "Vital Signs",
+        "class": "Findings",
+        "structure": "One record per vital sign measurement per visit per subject",
+        "keys": ["STUDYID", "USUBJID", "VSTESTCD", "VISIT"]
+    },
+    "LB": {
+        "label": "Laboratory Test Results",
+        "class": "Findings",
+        "structure": "One record per lab test per visit per subject",
+        "keys": ["STUDYID", "USUBJID", "LBTESTCD", "VISIT"]
+    },
+    "AE": {
+        "label": "Adverse Events",
+        "class": "Events",
+        "structure": "One record per adverse event per subject",
+        "keys": ["STUDYID", "USUBJID", "AETERM", "AESEQ"]
+    }
+}
+
+VARIABLE_LABELS = {
+    "STUDYID": "Study Identifier",
+    "DOMAIN": "Domain Abbreviation",
+    "USUBJID": "Unique Subject Identifier",
+    "SUBJID": "Subject Identifier for the Study",
+    "AGE": "Age",
+    "AGEU": "Age Units",
+    "SEX": "Sex",
+    "RACE": "Race",
+    "ETHNIC": "Ethnicity",
+    "ARM": "Description of Planned Arm",
+    "VISIT": "Visit Name",
+    "VSSEQ": "Sequence Number",
+    "VSTESTCD": "Vital Signs Test Short Name",
+    "VSORRES": "Result or Finding in Original Units",
+    "VSORRESU": "Original Units",
+    "LBSEQ": "Sequence Number",
+    "LBTESTCD": "Lab Test or Examination Short Name",
+    "LBTEST": "Lab Test or Examination Name",
+    "LBORRES": "Result or Finding in Original Units",
+    "LBORRESU": "Original Units",
+    "LBDTC": "Date/Time of Specimen Collection",
+    "AESEQ": "Sequence Number",
+    "AETERM": "Reported Term for the Adverse Event",
+    "AEBODSYS": "Body System or Organ Class",
+    "AESER": "Serious Event",
+    "AEREL": "Causality",
+    "AEOUT": "Outcome of Adverse Event"
+}
+
+# XPT character lengths per variable (fixed up front for streaming)
+DOMAIN_CHAR_LENGTHS = {
+    **SDTM_VS_CHAR_LENGTHS,
+    "DOMAIN": 2,
+    "SUBJID": 20,
+    "AGEU": 10,
+    "SEX": 2,
+    "RACE": 40,
+    "ETHNIC": 40,
+    "ARM": 40,
+    "LBTESTCD": 8,
+    "LBTEST": 40,
+    "LBORRESU": 10,
+    "LBDTC": 20,
+    "AETERM": 200,
+    "AEBODSYS": 200,
+    "AESER": 1,
+    "AEREL": 1,
+    "AEOUT": 20
+}
+
+
+def _assign_seq(df: pd.DataFrame, seq_col: str) -> pd.DataFrame:
+    """Assign --SEQ (1..n within USUBJID, in row order) via groupby cumcount"""
+    df.insert(3, seq_col, df.groupby("USUBJID", sort=False).cumcount().to_numpy() + 1)
+    return df
+
+
+def export_to_sdtm_dm(df: pd.DataFrame, arms: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    Export demographics (generate_demographics output) to SDTM DM
+
+    Args:
+        df: Demographics DataFrame (SubjectID, Age, Gender, Race, Ethnicity, ...)
+        arms: Optional SubjectID -> TreatmentArm mapping for ARM
+
+    Returns:
+        SDTM DM DataFrame (one row per subject)
+    """
+    if df is None or df.empty:
+        return pd.DataFrame()
+
+    dm = pd.DataFrame({
+        "STUDYID": STUDY_ID,
+        "DOMAIN": "DM",
+        "USUBJID": _usubjid(df["SubjectID"]),
+        "SUBJID": df["SubjectID"].astype(str).to_numpy(),
+        "AGE": pd.to_numeric(df["Age"], errors="coerce").to_numpy(),
+        "AGEU": "YEARS",
+        "SEX": df["Gender"].map(SEX_MAP).fillna("U").to_numpy(),
+        "RACE": df["Race"].map(RACE_MAP).fillna("OTHER").to_numpy(),
+        "ETHNIC": df["Ethnicity"].astype(str).str.upper().to_numpy()
+    })
+    if arms is not None:
+        dm["ARM"] = df["SubjectID"].map(arms).fillna("").to_numpy()
+    return dm
+
+
+def treatment_arms(vitals_df: pd.DataFrame) -> Optional[pd.Series]:
+    """
+    SubjectID -> TreatmentArm mapping from vitals (first non-null arm per
+    subject), for DM ARM; None if the vitals carry no TreatmentArm
+    """
+    if vitals_df is None or "TreatmentArm" not in vitals_df.columns or "SubjectID" not in vitals_df.columns:
+        return None
+    arms = vitals_df[["SubjectID", "TreatmentArm"]].dropna()
+    return arms.drop_duplicates("SubjectID").set_index("SubjectID")["TreatmentArm"]
+
+
+def export_to_sdtm_lb(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Export labs (generate_labs output) to SDTM LB
+
+    Same wide-to-long transform as VS: one row per lab test per visit.
+
+    Args:
+        df: Labs DataFrame (SubjectID, VisitName, TestDate, one column per test)
+
+    Returns:
+        SDTM LB DataFrame
+    """
+    if df is None or df.empty:
+        return pd.DataFrame()
+
+    present = [m for m in LAB_MAPPING if m[0] in df.columns]
+    n_tests = len(present)
+    if not n_tests:
+        raise ValueError("No known lab test columns found")
+
+    if "TestDate" in df.columns:
+        lbdtc = np.repeat(df["TestDate"].astype(str).to_numpy(), n_tests)
+    else:
+        lbdtc = ""
+
+    lb = pd.DataFrame({
+        "STUDYID": STUDY_ID,
+        "DOMAIN": "LB",
+        "USUBJID": np.repeat(_usubjid(df["SubjectID"]), n_tests),
+        "LBTESTCD": np.tile([m[1] for m in present], len(df)),
+        "LBTEST": np.tile([m[2] for m in present], len(df)),
+        "LBORRES": df[[m[0] for m in present]].to_numpy(dtype=float).ravel(),
+        "LBORRESU": np.tile([m[3] for m in present], len(df)),
+        "VISIT": np.repeat(df["VisitName"].to_numpy(), n_tests),
+        "LBDTC": lbdtc
+    })
+    return _assign_seq(lb, "LBSEQ")
+
+
+def export_to_sdtm_ae(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Export adverse events (generate_oncology_ae output) to SDTM AE
+
+    Args:
+        df: AE DataFrame (USUBJID, AETERM, AEBODSYS, AESER, AEREL, AEOUT)
+
+    Returns:
+        SDTM AE DataFrame with AESEQ
+    """
+    if df is None or df.empty:
+        return pd.DataFrame()
+
+    ae_cols = [c for c in ["AETERM", "AEBODSYS", "AESER", "AEREL", "AEOUT"] if c in df.columns]
+    subject_col = "USUBJID" if "USUBJID" in df.columns else "SubjectID"
+
+    ae = pd.DataFrame({
+        "STUDYID": STUDY_ID,
+        "DOMAIN": "AE",
+        "USUBJID": _usubjid(df[subject_col])
+    })
+    for col in ae_cols:
+        ae[col] = df[col].to_numpy()
+    return _assign_seq(ae, "AESEQ")
+
+
+def _export_vs_domain(df: pd.DataFrame) -> pd.DataFrame:
+    """SDTM VS with DOMAIN and VSSEQ for the submission package"""
+    vs = export_to_sdtm_vs(df)
+    if vs.empty:
+        return vs
+    vs.insert(1, "DOMAIN", "VS")
+    return _assign_seq(vs, "VSSEQ")
+
+
+DOMAIN_BUILDERS: Dict[str, Callable[[pd.DataFrame], pd.DataFrame]] = {
+    "DM": export_to_sdtm_dm,
+    "VS": _export_vs_domain,
+    "LB": export_to_sdtm_lb,
+    "AE": export_to_sdtm_ae
+}
+
+
+def iter_sdtm_domain_chunks(domain: str, source: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+                            chunk_size: int = DEFAULT_CHUNK_SIZE,
+                            arms: Optional[pd.Series] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield SDTM chunks for a domain, keeping --SEQ continuous across chunks
+
+    Each chunk gets 1..n per subject from groupby cumcount; per-subject
+    counts seen so far are carried forward and added as an offset.
+
+    Args:
+        domain: DM, VS, LB or AE
+        source: Source DataFrame or iterable of source chunks
+        chunk_size: Source rows per chunk when source is a single DataFrame
+        arms: SubjectID -> TreatmentArm mapping for DM ARM
+
+    Yields:
+        SDTM DataFrames for the domain
+    """
+    builder = DOMAIN_BUILDERS[domain]
+    if domain == "DM" and arms is not None:
+        builder = lambda chunk: export_to_sdtm_dm(chunk, arms)
+    seq_col = f"{domain}SEQ"
+
+    if isinstance(source, pd.DataFrame):
+        frame = source
+        source = (frame.iloc[i:i + chunk_size] for i in range(0, len(frame), chunk_size))
+
+    offsets = pd.Series(dtype="int64")
+    for chunk in source:
+        if chunk is None or chunk.empty:
+            continue
+        out = builder(chunk)
+        if seq_col in out.columns:
+            if not offsets.empty:
+                out[seq_col] += out["USUBJID"].map(offsets).fillna(0).astype("int64").to_numpy()
+            offsets = offsets.add(out["USUBJID"].value_counts(sort=False), fill_value=0).astype("int64")
+        yield out
+
+
+def write_sdtm_package(sources: Dict[str, Union[pd.DataFrame, Iterable[pd.DataFrame]]],
+                       out_dir: str, fmt: str = "xpt",
+                       chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       max_workers: int = 4,
+                       arms: Optional[pd.Series] = None) -> Dict[str, Any]:
+    """
+    Write a multi-domain SDTM package to a directory
+
+    Domains are converted chunk by chunk and written concurrently (one
+    thread per domain file). A define-style metadata file (define.json)
+    describes each dataset and its variables.
+
+    Args:
+        sources: Domain code (DM, VS, LB, AE) -> source DataFrame or chunks
+        out_dir: Output directory (created if missing)
+        fmt: xpt, parquet or csv
+        chunk_size: Source rows per chunk
+        max_workers: Concurrent domain writers
+        arms: SubjectID -> TreatmentArm mapping for DM ARM (default:
+            derived from the VS source when it is a DataFrame)
+
+    Returns:
+        The define-style metadata dict (also written to define.json)
+    """
+    unknown = set(sources) - set(DOMAIN_BUILDERS)
+    if unknown:
+        raise ValueError(f"Unsupported SDTM domains: {', '.join(sorted(unknown))}")
+    if arms is None and "DM" in sources and isinstance(sources.get("VS"), pd.DataFrame):
+        arms = treatment_arms(sources["VS"])
+
+    fmt = fmt.lower()
+    os.makedirs(out_dir, exist_ok=True)
+
+    def write_domain(domain: str, source) -> Dict[str, Any]:
+        file_name = f"{domain.lower()}.{fmt}"
+        dtypes: Dict[str, str] = {}
+
+        def chunks():
+            for chunk in iter_sdtm_domain_chunks(domain, source, chunk_size=chunk_size, arms=arms):
+                if not dtypes:
+                    dtypes.update({
+                        c: "Num" if pd.api.types.is_numeric_dtype(chunk[c]) else "Char"
+                        for c in chunk.columns
+                    })
+                yield chunk
+
+        records = write_sdtm_chunks(
+            chunks(),
+            os.path.join(out_dir, file_name),
+            fmt=fmt,
+            dataset_name=domain,
+            char_lengths=DOMAIN_CHAR_LENGTHS,
+            labels=VARIABLE_LABELS
+        )
+
+        return {
+            "domain": domain,
+            **DOMAIN_METADATA[domain],
+            "file": file_name,
+            "records": records,
+            "variables": [
+                {
+                    "name": name,
+                    "label": VARIABLE_LABELS.get(name, ""),
+                    "type": var_type,
+                    "length": 8 if var_type == "Num" else DOMAIN_CHAR_LENGTHS.get(name, 200)
+                }
+                for name, var_type in dtypes.items()
+            ]
+        }
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sources)))) as pool:
+        futures = [pool.submit(write_domain, d, src) for d, src in sources.items()]
+        datasets = [f.result() for f in futures]
+
+    define = {
+        "study_id": STUDY_ID,
+        "standard": "SDTMIG 3.3",
+        "format": fmt,
+        "created": datetime.utcnow().isoformat(),
+        "datasets": datasets
+    }
+    with open(os.path.join(out_dir, "define.json"), "w") as fh:
+        json.dump(define, fh, indent=2)
+
+    return define
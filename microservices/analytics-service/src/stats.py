@@ -4,8 +4,12 @@ Extracted from existing monolithic app.py
 """
 import pandas as pd
 import numpy as np
+import warnings
 from math import erf
-from typing import Dict, Any, Tuple
+from statistics import NormalDist
+from typing import Dict, Any, Optional, Tuple
+
+from distances import compare_sorted, sort_sample
 
 # Try to import scipy for exact t-test
 try:
@@ -20,18 +24,8 @@ def _phi(x: float) -> float:
     return 0.5 * (1.0 + erf(x / np.sqrt(2.0)))
 
 
-def calculate_week12_statistics(df: pd.DataFrame) -> Dict[str, Any]:
-    """
-    Calculate Week-12 statistics (Active vs Placebo)
-
-    Performs Welch's t-test on SystolicBP at Week 12
-
-    Args:
-        df: DataFrame with vitals data
-
-    Returns:
-        Dict with statistical test results in nested format
-    """
+def _week12_arms(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Week-12 SystolicBP samples for the Active and Placebo arms"""
     # Filter to Week 12 only
     wk12 = df[df["VisitName"] == "Week 12"].copy()
 
@@ -46,9 +40,22 @@ def calculate_week12_statistics(df: pd.DataFrame) -> Dict[str, Any]:
     if len(active) == 0 or len(placebo) == 0:
         raise ValueError("Insufficient data for both arms at Week 12")
 
-    # Calculate basic statistics
-    x_active = np.asarray(active, dtype=float)
-    x_placebo = np.asarray(placebo, dtype=float)
+    return np.asarray(active, dtype=float), np.asarray(placebo, dtype=float)
+
+
+def calculate_week12_statistics(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Calculate Week-12 statistics (Active vs Placebo)
+
+    Performs Welch's t-test on SystolicBP at Week 12
+
+    Args:
+        df: DataFrame with vitals data
+
+    Returns:
+        Dict with statistical test results in nested format
+    """
+    x_active, x_placebo = _week12_arms(df)
 
     n1, n2 = x_active.size, x_placebo.size
     m1 = x_active.mean() if n1 else np.nan
@@ -131,6 +138,140 @@ def calculate_week12_statistics(df: pd.DataFrame) -> Dict[str, Any]:
     }
 
 
+BOOTSTRAP_METHODS = ("percentile", "bca")
+# Replicates per independently seeded block. Every replicate's draws sit at
+# a fixed offset of its block's stream, so results do not depend on the
+# chunk size
+BOOTSTRAP_SEED_BLOCK = 64
+
+
+def _bootstrap_chunk_rows(n_obs: int, chunk_size: Optional[int], max_memory_mb: float) -> int:
+    """Replicates per chunk (within one seed block): chunk_size, else fit the memory budget"""
+    if chunk_size is None:
+        # int64 indices + float64 gathered values per resampled observation
+        chunk_size = int(max_memory_mb * 1024 * 1024 // (16 * n_obs))
+        if chunk_size < 1:
+            warnings.warn(f"bootstrap: one replicate of {n_obs} observations exceeds "
+                          f"max_memory_mb={max_memory_mb}; resampling one replicate at a time")
+    return max(1, min(chunk_size, BOOTSTRAP_SEED_BLOCK))
+
+
+def _bootstrap_means(x: np.ndarray, block_seed: np.random.SeedSequence, skip: int,
+                     first: int, n_rows: int) -> np.ndarray:
+    """
+    Means of resample rows first..first + n_rows of one arm in a seed block
+
+    Each index is drawn from one uniform (one 64-bit output), so row r of
+    the arm's matrix starts skip + r * len(x) outputs into the block's
+    stream and any row range can be drawn on its own.
+    """
+    bitgen = np.random.PCG64(block_seed)
+    bitgen.advance(skip + first * x.size)
+    u = np.random.Generator(bitgen).random((n_rows, x.size))
+    u *= x.size
+    np.minimum(u, x.size - 1, out=u)
+    idx = u.astype(np.intp)
+    del u
+    return x[idx].mean(axis=1)
+
+
+def bootstrap_treatment_effect(df: pd.DataFrame, n_boot: int = 10_000,
+                               method: str = "percentile", confidence: float = 0.95,
+                               seed: int = 42, chunk_size: Optional[int] = None,
+                               max_memory_mb: float = 256.0) -> Dict[str, Any]:
+    """
+    Bootstrap CI for the Week-12 SBP difference (Active - Placebo)
+
+    Each chunk draws resample index matrices for both arms and reduces
+    them to arm means with a gather + row mean. Every block of
+    BOOTSTRAP_SEED_BLOCK replicates has its own child seed and a chunk is
+    a row range of one block, so results are reproducible for a seed
+    regardless of chunk size; a warning is issued if even a single
+    replicate exceeds max_memory_mb.
+
+    Args:
+        df: Vitals DataFrame
+        n_boot: Number of bootstrap replicates (B)
+        method: percentile or bca (bias-corrected and accelerated)
+        confidence: Two-sided confidence level
+        seed: Random seed
+        chunk_size: Replicates per chunk, at most BOOTSTRAP_SEED_BLOCK
+            (default: fit max_memory_mb)
+        max_memory_mb: Memory budget per chunk when chunk_size is not set
+
+    Returns:
+        Dict with estimate, bootstrap SE and bias, CI bounds, and the
+        normal-approximation CI for comparison
+    """
+    if method not in BOOTSTRAP_METHODS:
+        raise ValueError(f"method must be one of: {', '.join(BOOTSTRAP_METHODS)}")
+    if not 0.0 < confidence < 1.0:
+        raise ValueError("confidence must be between 0 and 1")
+
+    x_active, x_placebo = _week12_arms(df)
+    n1, n2 = x_active.size, x_placebo.size
+    estimate = float(x_active.mean() - x_placebo.mean())
+
+    block = BOOTSTRAP_SEED_BLOCK
+    n_blocks = -(-n_boot // block)
+    block_seeds = np.random.SeedSequence(seed).spawn(n_blocks)
+    rows_per_chunk = _bootstrap_chunk_rows(n1 + n2, chunk_size, max_memory_mb)
+
+    boot = np.empty(n_blocks * block)
+    for b, block_seed in enumerate(block_seeds):
+        # A block's stream holds the active matrix, then the placebo matrix
+        for first in range(0, block, rows_per_chunk):
+            n_rows = min(rows_per_chunk, block - first)
+            start = b * block + first
+            boot[start:start + n_rows] = (_bootstrap_means(x_active, block_seed, 0, first, n_rows)
+                                          - _bootstrap_means(x_placebo, block_seed, block * n1, first, n_rows))
+    boot = boot[:n_boot]
+
+    alpha = 1.0 - confidence
+    quantiles = np.array([alpha / 2, 1 - alpha / 2])
+    z0 = accel = None
+    if method == "bca":
+        norm = NormalDist()
+        # Bias correction: share of replicates below the estimate (ties split)
+        below = (np.sum(boot < estimate) + 0.5 * np.sum(boot == estimate)) / n_boot
+        z0 = norm.inv_cdf(min(max(below, 1.0 / (n_boot + 1)), n_boot / (n_boot + 1)))
+
+        # Acceleration from the closed-form two-sample jackknife
+        jack = np.concatenate([
+            (x_active.sum() - x_active) / max(n1 - 1, 1) - x_placebo.mean(),
+            x_active.mean() - (x_placebo.sum() - x_placebo) / max(n2 - 1, 1)
+        ])
+        d = jack.mean() - jack
+        denom = 6.0 * np.sum(d ** 2) ** 1.5
+        accel = float(np.sum(d ** 3) / denom) if denom > 0 else 0.0
+
+        z = np.array([norm.inv_cdf(q) for q in quantiles])
+        quantiles = np.array([norm.cdf(z0 + (z0 + zq) / (1 - accel * (z0 + zq))) for zq in z])
+
+    lower, upper = np.quantile(boot, quantiles)
+    se_normal = np.sqrt(x_active.var(ddof=1) / n1 + x_placebo.var(ddof=1) / n2) if n1 > 1 and n2 > 1 else np.nan
+    z_crit = NormalDist().inv_cdf(1 - alpha / 2)
+
+    return {
+        "method": method,
+        "n_boot": int(n_boot),
+        "seed": int(seed),
+        "confidence": confidence,
+        "chunk_size": rows_per_chunk,
+        "n_active": int(n1),
+        "n_placebo": int(n2),
+        "estimate": round(estimate, 3),
+        "bootstrap_se": round(float(boot.std(ddof=1)), 3),
+        "bias": round(float(boot.mean() - estimate), 4),
+        "ci_lower": round(float(lower), 3),
+        "ci_upper": round(float(upper), 3),
+        "normal_ci_lower": round(float(estimate - z_crit * se_normal), 3) if np.isfinite(se_normal) else None,
+        "normal_ci_upper": round(float(estimate + z_crit * se_normal), 3) if np.isfinite(se_normal) else None,
+        "z0": round(float(z0), 4) if z0 is not None else None,
+        "acceleration": round(float(accel), 6) if accel is not None else None
+    }
+
+
 def ks_distance(x, y) -> float:
     """
     Calculate Kolmogorov-Smirnov distance between two distributions
@@ -142,17 +283,13 @@ def ks_distance(x, y) -> float:
     Returns:
         KS distance (max difference between CDFs)
     """
-    x = np.asarray(x, float)
-    y = np.asarray(y, float)
+    x = sort_sample(x)
+    y = sort_sample(y)
 
     if len(x) == 0 or len(y) == 0:
         return np.nan
 
-    xs = np.sort(np.concatenate([x, y]))
-    fx = np.searchsorted(np.sort(x), xs, side="right") / len(x)
-    fy = np.searchsorted(np.sort(y), xs, side="right") / len(y)
-
-    return float(np.max(np.abs(fx - fy)))
+    return compare_sorted(x, y, quantiles=None)["ks"]
 
 
 def simulate_recist_from_vitals(df: pd.DataFrame, p_active: float = 0.35,
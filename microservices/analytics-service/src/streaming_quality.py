@@ -0,0 +1,333 @@
+"""
+Streaming quality assessment
+Online accumulators (moments, co-moments, quantile sketches) fed chunk by
+chunk, so original and synthetic datasets never need to fit in memory
+"""
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+STREAM_DATASETS = ("original", "synthetic")
+DEFAULT_COMPRESSION = 200
+# Columns with at most this many distinct values keep exact value counts
+# (rounded/discrete vitals); beyond it only the t-digest is kept
+EXACT_DISTINCT_LIMIT = int(os.getenv("QUALITY_STREAM_EXACT_DISTINCT", "4096"))
+SESSION_TTL_SECONDS = int(os.getenv("QUALITY_STREAM_TTL_SECONDS", "3600"))
+
+
+class RunningMoments:
+    """
+    Welford mean/variance and pairwise co-moments, merged per chunk
+
+    Each chunk is reduced with NumPy and folded in with Chan's parallel
+    update, so cost is one pass over the chunk regardless of history.
+    Covariance uses rows complete across all columns.
+    """
+
+    def __init__(self, n_cols: int):
+        self.count = np.zeros(n_cols)
+        self.mean = np.zeros(n_cols)
+        self.m2 = np.zeros(n_cols)
+        self.cov_count = 0
+        self.cov_mean = np.zeros(n_cols)
+        self.comoment = np.zeros((n_cols, n_cols))
+
+    def update(self, X: np.ndarray):
+        # Per column (NaNs skipped)
+        valid = ~np.isnan(X)
+        n_b = valid.sum(axis=0).astype(float)
+        has = n_b > 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_b = np.where(has, np.nansum(X, axis=0) / np.maximum(n_b, 1), 0.0)
+            m2_b = np.nansum((X - mean_b) ** 2, axis=0)
+        n_a = self.count
+        n = n_a + n_b
+        delta = mean_b - self.mean
+        safe_n = np.maximum(n, 1)
+        self.mean = self.mean + delta * n_b / safe_n
+        self.m2 = self.m2 + m2_b + delta ** 2 * n_a * n_b / safe_n
+        self.count = n
+
+        # Co-moments over complete rows
+        complete = X[valid.all(axis=1)]
+        if len(complete):
+            n_b = len(complete)
+            mean_b = complete.mean(axis=0)
+            centered = complete - mean_b
+            c_b = centered.T @ centered
+            n_a = self.cov_count
+            n = n_a + n_b
+            delta = mean_b - self.cov_mean
+            self.comoment += c_b + np.outer(delta, delta) * n_a * n_b / n
+            self.cov_mean += delta * n_b / n
+            self.cov_count = n
+
+    def variance(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+    def correlation(self) -> np.ndarray:
+        if self.cov_count < 2:
+            return np.full(self.comoment.shape, np.nan)
+        d = np.sqrt(np.diag(self.comoment))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.comoment / np.outer(d, d)
+
+
+class TDigest:
+    """
+    Merging t-digest (k1 scale function), vectorized per chunk
+
+    Incoming values are buffered; when the buffer fills, centroids and
+    buffer are sorted together and regrouped so each centroid spans at
+    most one unit of the k1 scale function. Size stays O(compression).
+
+    Exact counts per distinct value are kept alongside while there are at
+    most exact_limit of them: rounded vitals have a step CDF, which
+    centroid interpolation smooths away.
+    """
+
+    def __init__(self, compression: int = DEFAULT_COMPRESSION,
+                 exact_limit: int = EXACT_DISTINCT_LIMIT):
+        self.compression = compression
+        self.exact_limit = exact_limit
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self._buffer: List[np.ndarray] = []
+        self._buffered = 0
+        self.atom_values: Optional[np.ndarray] = np.empty(0)
+        self.atom_counts = np.empty(0)
+
+    def update(self, values: np.ndarray):
+        values = values[~np.isnan(values)]
+        if len(values):
+            self._buffer.append(values.astype(float))
+            self._buffered += len(values)
+            if self.atom_values is not None:
+                self._count_atoms(values.astype(float))
+            if self._buffered >= 10 * self.compression:
+                self._compress()
+
+    def _count_atoms(self, values: np.ndarray):
+        vals, counts = np.unique(values, return_counts=True)
+        merged, inverse = np.unique(np.concatenate([self.atom_values, vals]), return_inverse=True)
+        if len(merged) > self.exact_limit:
+            self.atom_values, self.atom_counts = None, np.empty(0)
+            return
+        self.atom_values = merged
+        self.atom_counts = np.bincount(inverse, weights=np.concatenate([self.atom_counts, counts]),
+                                       minlength=len(merged))
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        new = np.concatenate(self._buffer)
+        means = np.concatenate([self.means, new])
+        weights = np.concatenate([self.weights, np.ones(len(new))])
+        self._buffer, self._buffered = [], 0
+
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+
+        # k1 scale at each centroid's right edge; a new cluster starts
+        # whenever the scale crosses the next integer
+        q = np.cumsum(weights) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1))
+        cluster = np.floor(k - k[0]).astype(np.int64)
+        cluster = np.concatenate(([0], np.cumsum(np.diff(cluster) > 0)))
+
+        w = np.bincount(cluster, weights=weights)
+        self.means = np.bincount(cluster, weights=means * weights) / w
+        self.weights = w
+
+    def centroids(self):
+        self._compress()
+        return self.means, self.weights
+
+    def distribution(self):
+        """(points, weights, exact): value counts while exact, else centroids"""
+        if self.atom_values is not None:
+            return self.atom_values, self.atom_counts, True
+        means, weights = self.centroids()
+        return means, weights, False
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum()) + self._buffered
+
+
+def _digest_cdf(means: np.ndarray, weights: np.ndarray, grid: np.ndarray,
+                exact: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    CDF at grid points and its left limits there
+
+    exact: means/weights are distinct values and their counts (step CDF);
+    otherwise t-digest centroids, mid-weights linearly interpolated.
+    """
+    if exact:
+        cum = np.concatenate(([0.0], np.cumsum(weights) / weights.sum()))
+        return (cum[np.searchsorted(means, grid, side="right")],
+                cum[np.searchsorted(means, grid, side="left")])
+    mid = (np.cumsum(weights) - weights / 2) / weights.sum()
+    cdf = np.interp(grid, means, mid, left=0.0, right=1.0)
+    return cdf, cdf
+
+
+def digest_distances(u_means: np.ndarray, u_w: np.ndarray,
+                     v_means: np.ndarray, v_w: np.ndarray,
+                     u_exact: bool = False, v_exact: bool = False) -> Dict[str, float]:
+    """
+    Approximate KS and Wasserstein-1 between two t-digests
+
+    Both CDFs are evaluated on the union of their points (where either one
+    jumps or changes slope), at each point and just left of it, so jumps
+    of exact (step) CDFs are measured; W1 integrates |F_u - F_v| over
+    the grid. Two exact sides give the exact KS and W1.
+    """
+    grid = np.union1d(u_means, v_means)
+    u_cdf, u_left = _digest_cdf(u_means, u_w, grid, u_exact)
+    v_cdf, v_left = _digest_cdf(v_means, v_w, grid, v_exact)
+    diff, diff_left = np.abs(u_cdf - v_cdf), np.abs(u_left - v_left)
+    return {
+        "ks": float(max(diff.max(), diff_left.max())),
+        "wasserstein": float(np.sum((diff[:-1] + diff_left[1:]) / 2 * np.diff(grid)))
+    }
+
+
+class QualityAccumulator:
+    """Moments + co-moments + per-column t-digests for one dataset"""
+
+    def __init__(self, columns: List[str], compression: int = DEFAULT_COMPRESSION):
+        self.columns = columns
+        self.rows = 0
+        self.moments = RunningMoments(len(columns))
+        self.digests = [TDigest(compression) for _ in columns]
+
+    def update(self, df: pd.DataFrame):
+        X = np.column_stack([
+            pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+            if col in df.columns else np.full(len(df), np.nan)
+            for col in self.columns
+        ])
+        self.rows += len(df)
+        self.moments.update(X)
+        for j, digest in enumerate(self.digests):
+            digest.update(X[:, j])
+
+
+class StreamingQualitySession:
+    """Chunked upload session accumulating original and synthetic data"""
+
+    def __init__(self, columns: List[str], compression: int = DEFAULT_COMPRESSION):
+        self.session_id = uuid.uuid4().hex
+        self.columns = columns
+        self.accumulators = {name: QualityAccumulator(columns, compression) for name in STREAM_DATASETS}
+        self.chunks = {name: 0 for name in STREAM_DATASETS}
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._lock = threading.Lock()
+
+    def add_chunk(self, dataset: str, df: pd.DataFrame) -> Dict[str, Any]:
+        if dataset not in STREAM_DATASETS:
+            raise ValueError(f"dataset must be one of: {', '.join(STREAM_DATASETS)}")
+        with self._lock:
+            self.accumulators[dataset].update(df)
+            self.chunks[dataset] += 1
+            self.updated_at = time.time()
+            return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "columns": self.columns,
+            "rows": {name: acc.rows for name, acc in self.accumulators.items()},
+            "chunks": dict(self.chunks)
+        }
+
+    def score(self) -> Dict[str, Any]:
+        """
+        Quality metrics from the accumulated state
+
+        Wasserstein/KS come from exact value counts for low-cardinality
+        columns and from t-digest centroids otherwise; the overall score
+        uses the comprehensive endpoint's Wasserstein and correlation terms
+        (K-NN metrics need the raw rows and are not streamed), re-weighted
+        to sum to one.
+        """
+        with self._lock:
+            orig = self.accumulators["original"]
+            syn = self.accumulators["synthetic"]
+            if orig.rows == 0 or syn.rows == 0:
+                raise ValueError("Both original and synthetic chunks are required")
+
+            columns = {}
+            wasserstein = []
+            for j, col in enumerate(self.columns):
+                u_vals, u_w, u_exact = orig.digests[j].distribution()
+                v_vals, v_w, v_exact = syn.digests[j].distribution()
+                entry = {
+                    "original_mean": _round(orig.moments.mean[j]),
+                    "synthetic_mean": _round(syn.moments.mean[j]),
+                    "original_std": _round(np.sqrt(orig.moments.variance()[j])),
+                    "synthetic_std": _round(np.sqrt(syn.moments.variance()[j]))
+                }
+                if len(u_vals) and len(v_vals):
+                    dist = digest_distances(u_vals, u_w, v_vals, v_w, u_exact, v_exact)
+                    entry.update({"ks": round(dist["ks"], 4), "wasserstein": round(dist["wasserstein"], 3)})
+                    wasserstein.append(dist["wasserstein"])
+                columns[col] = entry
+
+            corr_diff = np.abs(orig.moments.correlation() - syn.moments.correlation())
+            upper = corr_diff[np.triu_indices_from(corr_diff, k=1)]
+            correlation_preservation = float(1.0 - np.nanmean(upper)) if np.isfinite(upper).any() else 0.0
+            correlation_preservation = max(0.0, min(1.0, correlation_preservation))
+
+            wasserstein_avg = float(np.mean(wasserstein)) if wasserstein else float("nan")
+            wasserstein_score = max(0.0, 1.0 - wasserstein_avg / 20.0) if wasserstein else 0.0
+            overall = (0.25 * wasserstein_score + 0.30 * correlation_preservation) / 0.55
+
+            return {
+                **self.status(),
+                "column_metrics": columns,
+                "correlation_preservation": round(correlation_preservation, 3),
+                "wasserstein_avg": _round(wasserstein_avg),
+                "overall_quality_score": round(max(0.0, min(1.0, overall)), 3)
+            }
+
+
+def _round(x: float, digits: int = 3) -> Optional[float]:
+    return round(float(x), digits) if np.isfinite(x) else None
+
+
+_sessions: Dict[str, StreamingQualitySession] = {}
+_sessions_lock = threading.Lock()
+
+
+def create_session(columns: List[str], compression: int = DEFAULT_COMPRESSION) -> StreamingQualitySession:
+    """Open a session (idle sessions older than the TTL are dropped)"""
+    session = StreamingQualitySession(columns, compression)
+    cutoff = time.time() - SESSION_TTL_SECONDS
+    with _sessions_lock:
+        for sid in [sid for sid, s in _sessions.items() if s.updated_at < cutoff]:
+            del _sessions[sid]
+        _sessions[session.session_id] = session
+    return session
+
+
+def get_session(session_id: str) -> StreamingQualitySession:
+    """Session by ID (KeyError if unknown or expired)"""
+    with _sessions_lock:
+        if session_id not in _sessions:
+            raise KeyError(f"Unknown session_id: {session_id}")
+        return _sessions[session_id]
+
+
+def close_session(session_id: str) -> bool:
+    with _sessions_lock:
+        return _sessions.pop(session_id, None) is not None
@@ -35,6 +35,8 @@ class ComprehensiveQualityWithEvidenceRequest(BaseModel):
     original_data: List[Dict[str, Any]]
     synthetic_data: List[Dict[str, Any]]
     k: int = Field(default=5, description="Number of nearest neighbors for K-NN imputation")
+    neighbor_backend: str = Field(default="auto", description="Neighbor search: exact, approximate or auto")
+    ann_trees: int = Field(default=8, ge=1, le=64, description="Approximate backend trees (more = higher recall, slower)")
 
 
 class ComprehensiveQualityWithEvidenceResponse(BaseModel):
@@ -45,6 +47,7 @@ class ComprehensiveQualityWithEvidenceResponse(BaseModel):
     knn_imputation_score: Optional[float] = None
     overall_quality_score: Optional[float] = None
     euclidean_distances: Optional[Dict[str, float]] = None
+    neighbor_search: Optional[Dict[str, Any]] = None
     summary: Optional[str] = None
 
     # Evidence pack additions
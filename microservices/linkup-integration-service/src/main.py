@@ -164,7 +164,9 @@ async def comprehensive_quality_with_evidence(
         quality_metrics = await calculate_comprehensive_quality(
             request.original_data,
             request.synthetic_data,
-            request.k
+            request.k,
+            request.neighbor_backend,
+            request.ann_trees
         )
 
         # Fetch citations for key metrics
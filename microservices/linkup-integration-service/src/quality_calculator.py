@@ -8,10 +8,11 @@ standalone calculations when needed.
 
 import logging
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 from scipy import stats
 from scipy.spatial.distance import euclidean
-from sklearn.neighbors import NearestNeighbors
+
+from neighbors import DEFAULT_ANN_TREES, build_neighbor_index, measure_recall
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +20,9 @@ logger = logging.getLogger(__name__)
 async def calculate_comprehensive_quality(
     original_data: List[Dict[str, Any]],
     synthetic_data: List[Dict[str, Any]],
-    k: int = 5
+    k: int = 5,
+    neighbor_backend: str = "auto",
+    ann_trees: int = DEFAULT_ANN_TREES
 ) -> Dict[str, Any]:
     """
     Calculate comprehensive quality metrics between original and synthetic data
@@ -31,6 +34,8 @@ async def calculate_comprehensive_quality(
         original_data: Original/real data records
         synthetic_data: Synthetic data records
         k: Number of nearest neighbors for K-NN analysis
+        neighbor_backend: exact, approximate or auto (see neighbors.py)
+        ann_trees: Random-projection trees for the approximate backend
 
     Returns:
         Dictionary of quality metrics
@@ -64,8 +69,8 @@ async def calculate_comprehensive_quality(
         )
 
         # 4. K-NN imputation score
-        metrics["knn_imputation_score"] = _calculate_knn_score(
-            orig_array, synth_array, k
+        metrics["knn_imputation_score"], metrics["neighbor_search"] = _calculate_knn_score(
+            orig_array, synth_array, k, neighbor_backend, ann_trees
         )
 
         # 5. Euclidean distances
@@ -192,28 +197,36 @@ def _calculate_correlation_preservation(
 def _calculate_knn_score(
     orig: np.ndarray,
     synth: np.ndarray,
-    k: int
-) -> float:
+    k: int,
+    backend: str = "auto",
+    n_trees: int = DEFAULT_ANN_TREES
+) -> Tuple[float, Dict[str, Any]]:
     """
     Calculate K-NN imputation quality score
 
     Measures how well synthetic data can be used to impute missing values
-    in real data using K-nearest neighbors.
+    in real data using K-nearest neighbors. Returns the score and the
+    neighbor backend used with its measured recall@k.
     """
+    search_info: Dict[str, Any] = {"backend": backend, "recall": None}
     try:
         # Remove NaN rows
         orig_clean = orig[~np.isnan(orig).any(axis=1)]
         synth_clean = synth[~np.isnan(synth).any(axis=1)]
 
         if len(orig_clean) < k or len(synth_clean) < k:
-            return 0.0
+            return 0.0, search_info
 
         # Fit K-NN on synthetic data
-        knn = NearestNeighbors(n_neighbors=min(k, len(synth_clean)))
-        knn.fit(synth_clean)
+        knn = build_neighbor_index(synth_clean, backend, n_trees=n_trees)
 
         # Find distances from original data to synthetic data
-        distances, _ = knn.kneighbors(orig_clean[:100])  # Sample 100 points
+        queries = orig_clean[:100]  # Sample 100 points
+        distances, indices = knn.kneighbors(queries, min(k, len(synth_clean)))
+        search_info = {
+            **knn.describe(),
+            "recall": measure_recall(knn, synth_clean, queries, k, approx_indices=indices)
+        }
 
         # Calculate score based on average distance
         # Lower distance = better quality
@@ -223,11 +236,11 @@ def _calculate_knn_score(
         # Normalize by typical vital signs scale (~100)
         score = 1.0 / (1.0 + avg_distance / 10.0)
 
-        return float(max(0.0, min(1.0, score)))
+        return float(max(0.0, min(1.0, score))), search_info
 
     except Exception as e:
         logger.warning(f"Error calculating K-NN score: {e}")
-        return 0.0
+        return 0.0, search_info
 
 
 def _calculate_euclidean_distances(
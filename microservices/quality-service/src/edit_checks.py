@@ -6,7 +6,9 @@ import pandas as pd
 import numpy as np
 import yaml
 import re
-from typing import List, Dict
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
 
 
 DEFAULT_RULES_YAML = """
@@ -97,149 +99,759 @@ def load_default_rules() -> str:
     return DEFAULT_RULES_YAML
 
 
-def run_edit_checks_yaml(df: pd.DataFrame, rules_yaml: str) -> pd.DataFrame:
+QUERY_COLUMNS = ["CheckID", "Severity", "Message", "SubjectID", "VisitName", "Field", "Value"]
+
+
+def _empty_queries() -> pd.DataFrame:
+    return pd.DataFrame(columns=QUERY_COLUMNS)
+
+
+# Rule type name -> check class (see register_check_type)
+CHECK_TYPES: Dict[str, type] = {}
+
+
+def register_check_type(name: str):
     """
-    Run YAML-based edit checks on DataFrame
+    Class decorator adding a rule type to the engine
 
-    Args:
-        df: DataFrame to validate
-        rules_yaml: YAML string with edit check rules
+    The class takes the YAML rule dict in __init__ (raise ValueError for
+    invalid rules) and is evaluated once per run on the whole frame;
+    RowCheck subclasses only return the positions of violating rows.
+    """
+    def decorator(cls):
+        CHECK_TYPES[name] = cls
+        return cls
+    return decorator
+
+
+class CheckContext:
+    """Per-DataFrame arrays shared by all checks in one run"""
+
+    def __init__(self, df: pd.DataFrame, row_ids: Optional[np.ndarray] = None,
+                 domains: Optional[Dict[str, pd.DataFrame]] = None):
+        self.df = df
+        # Lookup datasets for cross_domain rules, by domain name
+        self.domains = domains or {}
+        self.n = len(df)
+        # Positions in the full dataset (differ from 0..n-1 for a partition)
+        self.row_ids = np.arange(self.n) if row_ids is None else row_ids
+        self.subjects = self.column_or_blank("SubjectID")
+        self.visits = self.column_or_blank("VisitName")
+        self.has_subject_id = "SubjectID" in df.columns
+        self._subject_codes = None
+        self._factorized: Dict[str, tuple] = {}
+
+    def column_or_blank(self, col: str) -> np.ndarray:
+        if col in self.df.columns:
+            return self.df[col].to_numpy(dtype=object)
+        return np.full(self.n, "", dtype=object)
+
+    def factorized(self, col: str):
+        """(codes, uniques) of a column, shared by checks; missing values get code -1"""
+        if col not in self._factorized:
+            self._factorized[col] = pd.factorize(self.df[col])
+        return self._factorized[col]
+
+    def has_codes(self, col: str) -> bool:
+        """Whether factorized(col) is free: already computed, or categorical codes"""
+        return col in self._factorized or isinstance(self.df[col].dtype, pd.CategoricalDtype)
+
+    def subject_codes(self):
+        """(codes, sorted unique subjects); NaN subjects get code -1"""
+        if self._subject_codes is None:
+            self._subject_codes = pd.factorize(self.df["SubjectID"], sort=True)
+        return self._subject_codes
+
+
+class EditCheck:
+    """
+    One compiled rule
+
+    Subclasses validate their YAML keys in __init__ and implement
+    evaluate(), returning violations as a column-array DataFrame (or None).
+    scope is "row" (violations indexed by row position, in row order) or
+    "subject" (one violation per subject, in SubjectID order). row_local
+    checks look at each row on its own, so any slice of rows can be
+    checked independently.
+    """
 
-    Returns:
-        DataFrame with queries (violations)
+    required_keys: tuple = ()
+    scope = "row"
+    row_local = True
+
+    def __init__(self, rule: Dict[str, Any]):
+        # Support both "id" and "name" for rule identifier
+        self.id = rule.get("id") or rule.get("name", "RULE")
+        self.type = rule.get("type")
+        self.severity = rule.get("severity", "Major")
+        self.message = rule.get("message", "")
+        missing = [k for k in self.required_keys if k not in rule]
+        if missing:
+            raise ValueError(f"Rule {self.id} ({self.type}): missing {', '.join(missing)}")
+
+    @staticmethod
+    def _field(rule: Dict[str, Any]) -> Optional[str]:
+        # Support both "field" and "column" keys
+        return rule.get("field") or rule.get("column")
+
+    @property
+    def subject_local(self) -> bool:
+        """Whether the check only compares rows of the same subject"""
+        return True
+
+    def evaluate(self, ctx: CheckContext) -> Optional[pd.DataFrame]:
+        raise NotImplementedError
+
+    def row_queries(self, ctx: CheckContext, mask: np.ndarray, field: str, values) -> pd.DataFrame:
+        """Violations for flagged rows: mask -> index -> take"""
+        idx = np.flatnonzero(mask)
+        if not isinstance(values, str):
+            values = np.asarray(values, dtype=object).take(idx)
+        return self.index_queries(ctx, idx, field, values)
+
+    def index_queries(self, ctx: CheckContext, idx: np.ndarray, field: str, values) -> pd.DataFrame:
+        """Violations for row positions idx (values aligned with idx, or one string)"""
+        n = len(idx)
+        return pd.DataFrame({
+            "CheckID": np.full(n, self.id, dtype=object),
+            "Severity": np.full(n, self.severity, dtype=object),
+            "Message": np.full(n, self.message, dtype=object),
+            "SubjectID": ctx.subjects.take(idx),
+            "VisitName": ctx.visits.take(idx),
+            "Field": np.full(n, field, dtype=object),
+            "Value": np.asarray(values, dtype=object) if not isinstance(values, str)
+            else np.full(n, values, dtype=object)
+        }, index=ctx.row_ids.take(idx))
+
+    def subject_queries(self, subjects: np.ndarray, field: str, messages=None) -> pd.DataFrame:
+        """Subject-level violations (blank visit and value)"""
+        n = len(subjects)
+        return pd.DataFrame({
+            "CheckID": np.full(n, self.id, dtype=object),
+            "Severity": np.full(n, self.severity, dtype=object),
+            "Message": np.full(n, self.message, dtype=object) if messages is None else messages,
+            "SubjectID": np.asarray(subjects, dtype=object),
+            "VisitName": np.full(n, "", dtype=object),
+            "Field": np.full(n, field, dtype=object),
+            "Value": np.full(n, "", dtype=object)
+        })
+
+
+class FieldCheck(EditCheck):
+    """Rule on a single field (field or column key)"""
+
+    def __init__(self, rule: Dict[str, Any]):
+        super().__init__(rule)
+        self.field = self._field(rule)
+        if not self.field:
+            raise ValueError(f"Rule {self.id} ({self.type}): missing field")
+
+
+@register_check_type("range")
+class RangeCheck(FieldCheck):
+    """Value must be within [min, max] (non-numeric values fail)"""
+
+    required_keys = ("min", "max")
+
+    def __init__(self, rule: Dict[str, Any]):
+        super().__init__(rule)
+        self.lo, self.hi = rule["min"], rule["max"]
+
+    def evaluate(self, ctx: CheckContext) -> Optional[pd.DataFrame]:
+        if self.field not in ctx.df.columns:
+            return None
+        x = pd.to_numeric(ctx.df[self.field], errors="coerce").to_numpy(dtype=float)
+        with np.errstate(invalid="ignore"):
+            mask = ~((x >= self.lo) & (x <= self.hi))
+        return self.row_queries(ctx, mask, self.field, ctx.df[self.field].to_numpy(dtype=object))
+
+
+@register_check_type("diff_at_least")
+class DiffAtLeastCheck(EditCheck):
+    """larger must be >= smaller + delta"""
+
+    required_keys = ("larger", "smaller", "delta")
+
+    def __init__(self, rule: Dict[str, Any]):
+        super().__init__(rule)
+        self.larger, self.smaller, self.delta = rule["larger"], rule["smaller"], float(rule["delta"])
+
+    def evaluate(self, ctx: CheckContext) -> Optional[pd.DataFrame]:
+        a, b = self.larger, self.smaller
+        if a not in ctx.df.columns or b not in ctx.df.columns:
+            return None
+        xa = pd.to_numeric(ctx.df[a], errors="coerce").to_numpy(dtype=float)
+        xb = pd.to_numeric(ctx.df[b], errors="coerce").to_numpy(dtype=float)
+        with np.errstate(invalid="ignore"):
+            mask = xa < xb + self.delta
+        idx = np.flatnonzero(mask)
+        values = (ctx.df[a].iloc[idx].astype(str) + "/" + ctx.df[b].iloc[idx].astype(str)).to_numpy(dtype=object)
+        out = self.row_queries(ctx, mask, f"{a}/{b}", "")
+        out["Value"] = values
+        return out
+
+
+def _broadcast_unique(ctx: CheckContext, col: str, codes: np.ndarray, unique_result: np.ndarray,
+                      evaluate_rows) -> np.ndarray:
+    """
+    Per-unique-value result -> per-row result
+
+    Rows with missing values (code -1) are evaluated directly by
+    evaluate_rows(values).
+    """
+    out = unique_result.take(np.maximum(codes, 0)) if len(unique_result) else np.zeros(len(codes), dtype=bool)
+    missing = np.flatnonzero(codes < 0)
+    if len(missing):
+        out[missing] = evaluate_rows(ctx.df[col].iloc[missing])
+    return out
+
+
+@register_check_type("allowed_values")
+class AllowedValuesCheck(FieldCheck):
+    """Value must be in the allowed list (once per distinct value when codes are shared)"""
+
+    required_keys = ("values",)
+
+    def __init__(self, rule: Dict[str, Any]):
+        super().__init__(rule)
+        self.values = set(rule["values"])
+        self._values = list(self.values)
+
+    def evaluate(self, ctx: CheckContext) -> Optional[pd.DataFrame]:
+        if self.field not in ctx.df.columns:
+            return None
+        if not ctx.has_codes(self.field):
+            # isin hashes each row once already; factorizing only pays off
+            # when the codes are shared or free
+            allowed = ctx.df[self.field].isin(self._values).to_numpy()
+        else:
+            codes, uniques = ctx.factorized(self.field)
+            allowed = _broadcast_unique(ctx, self.field, codes, np.asarray(uniques.isin(self._values)),
+                                        lambda values: values.isin(self._values).to_numpy())
+        return self.row_queries(ctx, ~allowed, self.field, ctx.df[self.field].to_numpy(dtype=object))
+
+
+@register_check_type("regex")
+class RegexCheck(FieldCheck):
+    """Value (as string) must match the pattern (matched once per distinct value)"""
+
+    required_keys = ("pattern",)
+
+    def __init__(self, rule: Dict[str, Any]):
+        super().__init__(rule)
+        try:
+            self.pattern = re.compile(rule["pattern"])
+        except re.error as e:
+            raise ValueError(f"Rule {self.id} (regex): invalid pattern: {e}")
+
+    def _match_strings(self, values) -> np.ndarray:
+        match = self.pattern.match
+        return np.array([match(v) is not None for v in values], dtype=bool)
+
+    def _match_rows(self, values: pd.Series) -> np.ndarray:
+        return self._match_strings([str(v) for v in values])
+
+    def evaluate(self, ctx: CheckContext) -> Optional[pd.DataFrame]:
+        if self.field not in ctx.df.columns:
+            return None
+        codes, uniques = ctx.factorized(self.field)
+        try:
+            matched = _broadcast_unique(ctx, self.field, codes, self._match_strings(np.asarray(uniques, dtype=object)),
+                                        self._match_rows)
+        except TypeError:
+            # Non-string values: match their string forms, still once per
+            # distinct string. astype(str) runs on a copy: pandas 2.1 can
+            # convert an object column in place when its buffer is not owned
+            # (e.g. an unpickled frame)
+            strings = pd.Series(ctx.df[self.field].to_numpy(dtype=object, copy=True)).astype(str)
+            codes, uniques = pd.factorize(strings)
+            matched = self._match_strings(np.asarray(uniques, dtype=object)).take(codes)
+        return self.row_queries(ctx, ~matched, self.field, ctx.df[self.field].to_numpy(dtype=object))
+
+
+@register_check_type("constant_within_subject")
+class ConstantWithinSubjectCheck(FieldCheck):
+    """Field must take one value per subject"""
+
+    scope = "subject"
+    row_local = False
+
+    def evaluate(self, ctx: CheckContext) -> Optional[pd.DataFrame]:
+        if not ctx.has_subject_id or self.field not in ctx.df.columns:
+            return None
+        counts = ctx.df.groupby("SubjectID")[self.field].nunique()
+        return self.subject_queries(counts.index[counts.to_numpy() > 1].to_numpy(dtype=object), self.field)
+
+
+@register_check_type("required_visits")
+class RequiredVisitsCheck(EditCheck):
+    """Every subject must have all required visits"""
+
+    required_keys = ("visits",)
+    scope = "subject"
+    row_local = False
+
+    def __init__(self, rule: Dict[str, Any]):
+        super().__init__(rule)
+        self.visits = sorted(set(rule["visits"]))
+
+    def evaluate(self, ctx: CheckContext) -> Optional[pd.DataFrame]:
+        if not ctx.has_subject_id or "VisitName" not in ctx.df.columns:
+            return None
+        codes, subjects = ctx.subject_codes()
+        visit_codes = pd.Categorical(ctx.df["VisitName"], categories=self.visits).codes
+        keep = (codes >= 0) & (visit_codes >= 0)
+
+        # Subjects x required visits presence grid
+        present = np.zeros((len(subjects), len(self.visits)), dtype=bool)
+        present[codes[keep], visit_codes[keep]] = True
+        seen = np.zeros(len(subjects), dtype=bool)
+        seen[codes[codes >= 0]] = True
+        bad = np.flatnonzero(seen & ~present.all(axis=1))
+
+        # One message per distinct missing-visit pattern
+        patterns, inverse = np.unique(~present[bad], axis=0, return_inverse=True)
+        texts = np.array([
+            f"{self.message}: {', '.join(v for v, miss in zip(self.visits, row) if miss)}"
+            for row in patterns
+        ], dtype=object)
+        return self.subject_queries(np.asarray(subjects, dtype=object).take(bad), "VisitName",
+                                    texts[inverse.ravel()] if len(bad) else None)
+
+
+@register_check_type("unique_combo")
+class UniqueComboCheck(EditCheck):
+    """Field combination must be unique across rows"""
+
+    required_keys = ("fields",)
+    row_local = False
+
+    def __init__(self, rule: Dict[str, Any]):
+        super().__init__(rule)
+        self.fields = list(rule["fields"])
+
+    @property
+    def subject_local(self) -> bool:
+        # Without SubjectID, duplicates can span subjects
+        return "SubjectID" in self.fields
+
+    def evaluate(self, ctx: CheckContext) -> Optional[pd.DataFrame]:
+        if not all(f in ctx.df.columns for f in self.fields):
+            return None
+        mask = ctx.df.duplicated(subset=self.fields, keep=False).to_numpy()
+        return self.row_queries(ctx, mask, "+".join(self.fields), "")
+
+
+_COMPARISONS = {"==": "eq", "!=": "ne", "<": "lt", "<=": "le", ">": "gt", ">=": "ge"}
+_CONDITION_OPS = set(_COMPARISONS) | {"in", "not_in", "missing", "present"}
+
+
+def _compare(left: pd.Series, op: str, right) -> np.ndarray:
+    """
+    left <op> right as a boolean array; missing values never satisfy a
+    comparison. Numeric operands (or a numeric column) compare as floats.
+    """
+    right_numeric = isinstance(right, (int, float)) and not isinstance(right, bool)
+    if right_numeric or (isinstance(right, pd.Series) and pd.api.types.is_numeric_dtype(right)
+                         and pd.api.types.is_numeric_dtype(left)):
+        left = pd.to_numeric(left, errors="coerce")
+        if isinstance(right, pd.Series):
+            right = pd.to_numeric(right, errors="coerce")
+    result = getattr(left, _COMPARISONS[op])(right).to_numpy(dtype=bool)
+    present = left.notna().to_numpy()
+    if isinstance(right, pd.Series):
+        present &= right.notna().to_numpy()
+    return result & present
+
+
+def _parse_conditions(rule_id: Any, rule_type: str, spec: Any, key: str) -> List[Dict[str, Any]]:
+    conditions = spec if isinstance(spec, list) else [spec]
+    for cond in conditions:
+        if not isinstance(cond, dict) or "field" not in cond:
+            raise ValueError(f"Rule {rule_id} ({rule_type}): each {key} condition needs a field")
+        op = cond.get("op", "==")
+        if op not in _CONDITION_OPS:
+            raise ValueError(f"Rule {rule_id} ({rule_type}): unknown operator {op}")
+        if op not in ("missing", "present") and "value" not in cond:
+            raise ValueError(f"Rule {rule_id} ({rule_type}): {key} condition on {cond['field']} needs a value")
+    return conditions
+
+
+def _conditions_mask(df: pd.DataFrame, conditions: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+    """Rows meeting all conditions (None if a field is absent)"""
+    mask = np.ones(len(df), dtype=bool)
+    for cond in conditions:
+        if cond["field"] not in df.columns:
+            return None
+        col, op = df[cond["field"]], cond.get("op", "==")
+        if op == "missing":
+            mask &= col.isna().to_numpy()
+        elif op == "present":
+            mask &= col.notna().to_numpy()
+        elif op in ("in", "not_in"):
+            member = col.isin(list(cond["value"])).to_numpy()
+            mask &= member if op == "in" else ~member
+        else:
+            mask &= _compare(col, op, cond["value"])
+    return mask
+
+
+class RowCheck(EditCheck):
+    """
+    Base for vectorized plugin rules
+
+    Subclasses implement flagged_rows(ctx), returning the ascending
+    positions of violating rows - or (positions, values) when the rule
+    builds the Value column itself - or None when the rule does not apply
+    to the frame, and set query_field; evaluate() turns the positions
+    into queries.
+    """
+
+    query_field = ""
+
+    def flagged_rows(self, ctx: CheckContext):
+        raise NotImplementedError
+
+    def query_values(self, ctx: CheckContext, idx: np.ndarray):
+        """Value column for flagged rows (default: blank)"""
+        return ""
+
+    def evaluate(self, ctx: CheckContext) -> Optional[pd.DataFrame]:
+        flagged = self.flagged_rows(ctx)
+        if flagged is None:
+            return None
+        idx, values = flagged if isinstance(flagged, tuple) else (flagged, self.query_values(ctx, flagged))
+        return self.index_queries(ctx, idx, self.query_field, values)
+
+
+@register_check_type("delta")
+class DeltaCheck(RowCheck):
+    """
+    Change between a subject's consecutive visits must stay within limits
+
+    Visits are ordered by visit_order (list of VisitName values), by the
+    order_by column, or by row order. Rows with a missing value are
+    skipped, so each value is compared with the subject's previous
+    recorded one. Limits: max_change (absolute), max_increase,
+    max_decrease.
+    """
+
+    row_local = False
+
+    def __init__(self, rule: Dict[str, Any]):
+        super().__init__(rule)
+        self.field = self.query_field = self._field(rule)
+        if not self.field:
+            raise ValueError(f"Rule {self.id} (delta): missing field")
+        limits = {k: rule.get(k) for k in ("max_change", "max_increase", "max_decrease")}
+        if all(v is None for v in limits.values()):
+            raise ValueError(f"Rule {self.id} (delta): needs max_change, max_increase or max_decrease")
+        self.max_change, self.max_increase, self.max_decrease = (
+            float(v) if v is not None else None for v in limits.values())
+        self.visit_order = list(rule["visit_order"]) if rule.get("visit_order") else None
+        self.order_by = rule.get("order_by")
+
+    def _order(self, ctx: CheckContext) -> Optional[np.ndarray]:
+        """Sort key per row; -1 for rows that cannot be placed"""
+        if self.visit_order:
+            if "VisitName" not in ctx.df.columns:
+                return None
+            return pd.Categorical(ctx.df["VisitName"], categories=self.visit_order).codes.astype(np.int64)
+        if self.order_by:
+            if self.order_by not in ctx.df.columns:
+                return None
+            return pd.factorize(ctx.df[self.order_by], sort=True)[0]
+        return np.arange(ctx.n)
+
+    def flagged_rows(self, ctx: CheckContext):
+        if not ctx.has_subject_id or self.field not in ctx.df.columns:
+            return None
+        order = self._order(ctx)
+        if order is None:
+            return None
+        subjects = ctx.subject_codes()[0]
+        x = pd.to_numeric(ctx.df[self.field], errors="coerce").to_numpy(dtype=float)
+        rows = np.flatnonzero((subjects >= 0) & (order >= 0) & ~np.isnan(x))
+
+        # Sort by subject, then visit; the previous row is the shift by one
+        rows = rows[np.lexsort((order[rows], subjects[rows]))]
+        same_subject = subjects[rows[1:]] == subjects[rows[:-1]]
+        diff = x[rows[1:]] - x[rows[:-1]]
+        bad = np.zeros(len(diff), dtype=bool)
+        if self.max_change is not None:
+            bad |= np.abs(diff) > self.max_change
+        if self.max_increase is not None:
+            bad |= diff > self.max_increase
+        if self.max_decrease is not None:
+            bad |= -diff > self.max_decrease
+        bad &= same_subject
+
+        by_row = np.argsort(rows[1:][bad], kind="stable")
+        current, previous = rows[1:][bad][by_row], rows[:-1][bad][by_row]
+        values = ctx.df[self.field].to_numpy(dtype=object)
+        # Value shows the change as "previous->current"
+        change = (pd.Series(values.take(previous)).astype(str) + "->" +
+                  pd.Series(values.take(current)).astype(str))
+        return current, change.to_numpy(dtype=object)
+
+
+@register_check_type("conditional")
+class ConditionalCheck(RowCheck):
+    """
+    Rows meeting every "if" condition must meet every "then" condition
+
+    Conditions are {field, op, value} with op one of ==, !=, <, <=, >, >=,
+    in, not_in, missing, present. A missing value fails a "then"
+    comparison (as in range checks).
     """
-    if df is None or df.empty:
-        return pd.DataFrame(columns=[
-            "CheckID", "Severity", "Message", "SubjectID", "VisitName", "Field", "Value"
-        ])
 
+    required_keys = ("if", "then")
+
+    def __init__(self, rule: Dict[str, Any]):
+        super().__init__(rule)
+        self.when = _parse_conditions(self.id, "conditional", rule["if"], "if")
+        self.then = _parse_conditions(self.id, "conditional", rule["then"], "then")
+        self.query_field = "/".join(dict.fromkeys(c["field"] for c in self.then))
+
+    def flagged_rows(self, ctx: CheckContext) -> Optional[np.ndarray]:
+        when = _conditions_mask(ctx.df, self.when)
+        then = _conditions_mask(ctx.df, self.then)
+        if when is None or then is None:
+            return None
+        return np.flatnonzero(when & ~then)
+
+    def query_values(self, ctx: CheckContext, idx: np.ndarray):
+        fields = list(dict.fromkeys(c["field"] for c in self.then))
+        values = ctx.df[fields[0]].iloc[idx].astype(str)
+        for field in fields[1:]:
+            values = values + "/" + ctx.df[field].iloc[idx].astype(str)
+        return values.to_numpy(dtype=object)
+
+
+@register_check_type("cross_domain")
+class CrossDomainCheck(RowCheck):
+    """
+    Rows must match a record of another domain (e.g. demographics, labs)
+
+    Rows are joined on keys (default SubjectID; lookup_keys names the
+    lookup columns if they differ). Without field, a row fails when it
+    has no match. With field/op/lookup_field, the value is compared with
+    the matched row's lookup_field too; rows without a match fail unless
+    missing: ignore. The lookup domain is keyed by its first row per key.
+    """
+
+    required_keys = ("domain",)
+
+    def __init__(self, rule: Dict[str, Any]):
+        super().__init__(rule)
+        self.domain = rule["domain"]
+        keys = rule.get("keys", ["SubjectID"])
+        self.on = [keys] if isinstance(keys, str) else list(keys)
+        lookup_keys = rule.get("lookup_keys", self.on)
+        self.other_on = [lookup_keys] if isinstance(lookup_keys, str) else list(lookup_keys)
+        if len(self.on) != len(self.other_on):
+            raise ValueError(f"Rule {self.id} (cross_domain): keys and lookup_keys differ in length")
+        self.field = self._field(rule)
+        self.op = rule.get("op", "==")
+        self.other = rule.get("lookup_field", self.field)
+        if self.field and self.op not in _COMPARISONS:
+            raise ValueError(f"Rule {self.id} (cross_domain): unknown operator {self.op}")
+        self.flag_missing = rule.get("missing", "flag") != "ignore"
+        self.query_field = self.field or "+".join(self.on)
+
+    def _lookup_positions(self, ctx: CheckContext, lookup: pd.DataFrame):
+        """(row in the deduplicated lookup for every row of the frame, -1 if
+        none; the deduplicated lookup)"""
+        lookup = lookup.drop_duplicates(subset=self.other_on, keep="first")
+        if len(self.on) == 1:
+            index = pd.Index(lookup[self.other_on[0]])
+            found = index.get_indexer(ctx.df[self.on[0]])
+        else:
+            index = pd.MultiIndex.from_frame(lookup[self.other_on])
+            found = index.get_indexer(pd.MultiIndex.from_frame(ctx.df[self.on]))
+        return found, lookup
+
+    def flagged_rows(self, ctx: CheckContext) -> Optional[np.ndarray]:
+        lookup = ctx.domains.get(self.domain)
+        if lookup is None or not all(c in ctx.df.columns for c in self.on) \
+                or not all(c in lookup.columns for c in self.other_on):
+            return None
+        if self.field and (self.field not in ctx.df.columns or self.other not in lookup.columns):
+            return None
+
+        found, lookup = self._lookup_positions(ctx, lookup)
+        matched = found >= 0
+        bad = ~matched if self.flag_missing else np.zeros(ctx.n, dtype=bool)
+        if self.field:
+            rows = np.flatnonzero(matched)
+            left = ctx.df[self.field].iloc[rows].reset_index(drop=True)
+            right = lookup[self.other].iloc[found[rows]].reset_index(drop=True)
+            bad[rows] = ~_compare(left, self.op, right)
+        return np.flatnonzero(bad)
+
+    def query_values(self, ctx: CheckContext, idx: np.ndarray):
+        if self.field:
+            return ctx.df[self.field].to_numpy(dtype=object).take(idx)
+        values = ctx.df[self.on[0]].iloc[idx].astype(str)
+        for col in self.on[1:]:
+            values = values + "+" + ctx.df[col].iloc[idx].astype(str)
+        return values.to_numpy(dtype=object)
+
+
+def rule_profile(check: EditCheck, seconds: float, rows: int,
+                 out: Optional[pd.DataFrame]) -> Dict[str, Any]:
+    """
+    Profile entry for one check evaluation: rule_id, type, seconds, rows
+    scanned (0 if the check did not apply), violations, memory_bytes
+    (None unless filled by CompiledRuleset.profile_memory)
+    """
+    return {
+        "rule_id": check.id,
+        "type": check.type,
+        "seconds": seconds,
+        "rows": rows if out is not None else 0,
+        "violations": 0 if out is None else len(out),
+        "memory_bytes": None
+    }
+
+
+class CompiledRuleset:
+    """Parsed and validated rules, reusable across runs"""
+
+    def __init__(self, checks: List[EditCheck], total_checks: int):
+        self.checks = checks
+        # Rules in the YAML, including types this engine does not evaluate
+        self.total_checks = total_checks
+
+    def evaluate(self, df: pd.DataFrame, row_ids: Optional[np.ndarray] = None,
+                 check_indices: Optional[List[int]] = None,
+                 domains: Optional[Dict[str, pd.DataFrame]] = None,
+                 profile: Optional[List[Dict[str, Any]]] = None) -> List[Optional[pd.DataFrame]]:
+        """
+        Per-check violation frames (None for checks that did not apply)
+
+        With a profile list, one entry per evaluated check is appended
+        (see rule_profile).
+        """
+        ctx = CheckContext(df, row_ids, domains)
+        indices = range(len(self.checks)) if check_indices is None else check_indices
+        if profile is None:
+            return [self.checks[i].evaluate(ctx) for i in indices]
+        results = []
+        for i in indices:
+            start = time.perf_counter()
+            out = self.checks[i].evaluate(ctx)
+            profile.append(rule_profile(self.checks[i], time.perf_counter() - start, len(df), out))
+            results.append(out)
+        return results
+
+    def profile_memory(self, df: pd.DataFrame, profile: List[Dict[str, Any]],
+                       domains: Optional[Dict[str, pd.DataFrame]] = None):
+        """
+        Fill memory_bytes (peak bytes allocated per check) into the
+        profile of a run over df
+
+        Runs a separate serial pass under tracemalloc: tracing slows the
+        engine several times over, so it stays out of the timed run.
+        """
+        ctx = CheckContext(df, None, domains)
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            for check, entry in zip(self.checks, profile):
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                check.evaluate(ctx)
+                entry["memory_bytes"] = tracemalloc.get_traced_memory()[1] - base
+        finally:
+            if started:
+                tracemalloc.stop()
+
+    def run(self, df: pd.DataFrame, workers: int = 1,
+            domains: Optional[Dict[str, pd.DataFrame]] = None,
+            profile: Optional[List[Dict[str, Any]]] = None) -> pd.DataFrame:
+        """
+        Evaluate every check and build the query frame with one concat
+
+        Args:
+            df: DataFrame to validate
+            workers: Processes for partitioned execution (1 = serial);
+                the output is identical either way
+            domains: Lookup datasets for cross_domain rules
+            profile: If given, receives one rule_profile entry per check
+                (in check order)
+
+        Returns:
+            DataFrame with QUERY_COLUMNS, one row per violation
+        """
+        if df is None or df.empty:
+            return _empty_queries()
+        if workers > 1:
+            from parallel_checks import run_partitioned
+            return run_partitioned(self, df, workers, domains=domains, profile=profile)
+        frames = [out for out in self.evaluate(df, domains=domains, profile=profile) if out is not None and len(out)]
+        if not frames:
+            return _empty_queries()
+        return pd.concat(frames, ignore_index=True)
+
+
+def _parse_rules(rules_yaml: str) -> List[Dict[str, Any]]:
     spec = yaml.safe_load(rules_yaml)
 
     # Handle both formats: direct list or wrapped in "rules:" key
     if isinstance(spec, list):
-        rules = spec
-    elif isinstance(spec, dict):
-        rules = spec.get("rules", [])
-    else:
-        rules = []
-    queries = []
-
-    def add_q(rid, sev, msg, subj, visit, field, value):
-        """Add a query to the list"""
-        queries.append({
-            "CheckID": rid,
-            "Severity": sev,
-            "Message": msg,
-            "SubjectID": subj,
-            "VisitName": visit,
-            "Field": field,
-            "Value": value
-        })
+        return spec
+    if isinstance(spec, dict):
+        return spec.get("rules", []) or []
+    return []
 
-    # Check if required columns exist for grouping
-    has_subject_id = "SubjectID" in df.columns
-    per_subj = df.groupby("SubjectID") if has_subject_id else None
 
-    for rule in rules:
-        t = rule.get("type")
-        # Support both "id" and "name" for rule identifier
-        rid = rule.get("id") or rule.get("name", "RULE")
-        sev = rule.get("severity", "Major")
-        msg = rule.get("message", "")
-
-        if t == "range":
-            # Check if value is within [min, max]
-            # Support both "field" and "column" keys
-            f = rule.get("field") or rule.get("column")
-            if not f:
-                continue
-            lo, hi = rule["min"], rule["max"]
-            if f not in df.columns:
-                continue
-            x = pd.to_numeric(df[f], errors="coerce")
-            mask = ~x.between(lo, hi)
-            for _, r in df[mask].iterrows():
-                subj = r.get("SubjectID", "")
-                visit = r.get("VisitName", "")
-                add_q(rid, sev, msg, subj, visit, f, r[f])
-
-        elif t == "diff_at_least":
-            # Check if larger >= smaller + delta
-            a, b, d = rule["larger"], rule["smaller"], float(rule["delta"])
-            if a not in df.columns or b not in df.columns:
-                continue
-            xa = pd.to_numeric(df[a], errors="coerce")
-            xb = pd.to_numeric(df[b], errors="coerce")
-            mask = (xa < xb + d)
-            for _, r in df[mask].iterrows():
-                subj = r.get("SubjectID", "")
-                visit = r.get("VisitName", "")
-                add_q(rid, sev, msg, subj, visit, f"{a}/{b}", f"{r[a]}/{r[b]}")
-
-        elif t == "allowed_values":
-            # Check if value is in allowed set
-            f = rule.get("field") or rule.get("column")
-            if not f:
-                continue
-            vals = set(rule["values"])
-            if f not in df.columns:
-                continue
-            mask = ~df[f].isin(vals)
-            for _, r in df[mask].iterrows():
-                subj = r.get("SubjectID", "")
-                visit = r.get("VisitName", "")
-                add_q(rid, sev, msg, subj, visit, f, r[f])
-
-        elif t == "regex":
-            # Check if value matches regex pattern
-            f = rule.get("field") or rule.get("column")
-            if not f:
-                continue
-            pat = re.compile(rule["pattern"])
-            if f not in df.columns:
-                continue
-            mask = ~df[f].astype(str).str.match(pat)
-            for _, r in df[mask].iterrows():
-                subj = r.get("SubjectID", "")
-                visit = r.get("VisitName", "")
-                add_q(rid, sev, msg, subj, visit, f, r[f])
-
-        elif t == "constant_within_subject":
-            # Check if field is constant per subject
-            if per_subj is None:
-                continue
-            f = rule.get("field") or rule.get("column")
-            if not f or f not in df.columns:
-                continue
-            bad = per_subj[f].nunique()
-            bad = bad[bad > 1].index
-            for subj in bad:
-                add_q(rid, sev, msg, subj, "", f, "")
-
-        elif t == "required_visits":
-            # Check if all required visits are present per subject
-            if per_subj is None or "VisitName" not in df.columns:
-                continue
-            visits = set(rule["visits"])
-            seen = per_subj["VisitName"].apply(set)
-            for subj, s in seen.items():
-                missing = sorted(list(visits - s))
-                if missing:
-                    add_q(rid, sev, f"{msg}: {', '.join(missing)}", subj, "", "VisitName", "")
-
-        elif t == "unique_combo":
-            # Check if field combination is unique
-            fields = rule["fields"]
-            # Check if all fields exist
-            if not all(f in df.columns for f in fields):
-                continue
-            dup_mask = df.duplicated(subset=fields, keep=False)
-            for _, r in df[dup_mask].iterrows():
-                subj = r.get("SubjectID", "")
-                visit = r.get("VisitName", "")
-                add_q(rid, sev, msg, subj, visit, "+".join(fields), "")
-
-    return pd.DataFrame(queries)
+def compile_rules(rules_yaml: str) -> CompiledRuleset:
+    """
+    Parse and validate YAML rules into check objects
+
+    Unknown rule types are counted but not evaluated.
+
+    Args:
+        rules_yaml: YAML string with edit check rules
+
+    Returns:
+        CompiledRuleset
+
+    Raises:
+        ValueError: Malformed YAML or a rule missing required keys
+    """
+    try:
+        rules = _parse_rules(rules_yaml)
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid rules YAML: {e}")
+
+    checks = []
+    for i, rule in enumerate(rules):
+        if not isinstance(rule, dict):
+            raise ValueError(f"Rule {i + 1}: expected a mapping")
+        check_cls = CHECK_TYPES.get(rule.get("type"))
+        if check_cls is not None:
+            checks.append(check_cls(rule))
+    return CompiledRuleset(checks, total_checks=len(rules))
+
+
+def run_edit_checks_yaml(df: pd.DataFrame, rules_yaml: str, workers: int = 1,
+                         domains: Optional[Dict[str, pd.DataFrame]] = None) -> pd.DataFrame:
+    """
+    Run YAML-based edit checks on DataFrame
+
+    Args:
+        df: DataFrame to validate
+        rules_yaml: YAML string with edit check rules
+        workers: Processes for subject-partitioned execution (1 = serial)
+        domains: Lookup datasets for cross_domain rules, by domain name
+
+    Returns:
+        DataFrame with queries (violations)
+    """
+    return compile_rules(rules_yaml).run(df, workers=workers, domains=domains)
 
 
 def simulate_entry_noise(df: pd.DataFrame, typo_rate: float = 0.02,
@@ -0,0 +1,307 @@
+"""
+Incremental edit checks
+A session holds the current dataset per subject and the open violations;
+each delta re-evaluates only the subjects it touches and reconciles
+queries (new violations opened, resolved ones closed, the rest kept)
+"""
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from edit_checks import QUERY_COLUMNS, CompiledRuleset, UniqueComboCheck
+
+SESSION_TTL_SECONDS = int(os.getenv("INCREMENTAL_CHECKS_TTL_SECONDS", "86400"))
+
+# Bucket for rows without a SubjectID
+NO_SUBJECT = "__no_subject__"
+
+# A violation is the same query while these stay the same
+VIOLATION_KEY = ["CheckID", "SubjectID", "VisitName", "Field", "Message"]
+
+
+def _subject_strings(values: pd.Series) -> pd.Series:
+    """
+    SubjectID values as strings, so 101, 101.0 and "101" name the same
+    subject (JSON keeps numeric IDs numeric; a column with nulls parses as
+    float). Nulls stay null.
+    """
+    values = pd.Series(values, dtype=object) if not isinstance(values, pd.Series) else values
+    if pd.api.types.infer_dtype(values, skipna=True) == "string":
+        return values.astype(object)
+    valid = values.notna()
+    strings = pd.Series([str(int(v)) if isinstance(v, (float, np.floating)) and float(v).is_integer() else str(v)
+                         for v in values[valid]], index=values.index[valid], dtype=object)
+    return strings.reindex(values.index)
+
+
+def _buckets(values: pd.Series) -> np.ndarray:
+    """Normalized SubjectID strings with nulls mapped to NO_SUBJECT"""
+    strings = _subject_strings(values)
+    return strings.where(strings.notna(), NO_SUBJECT).to_numpy(dtype=object)
+
+
+def _violation_keys(queries_df: pd.DataFrame) -> List[Tuple]:
+    cols = [(_subject_strings(queries_df[c]) if c == "SubjectID" else queries_df[c].astype(object))
+            for c in VIOLATION_KEY]
+    cols = [c.where(c.notna(), "").astype(str) for c in cols]
+    return list(zip(*cols))
+
+
+class IncrementalCheckSession:
+    """
+    Per-subject dataset state plus open violations for one rule set
+
+    Row-level checks and the subject-level rules (constant_within_subject,
+    required_visits, unique_combo including SubjectID) only see a
+    subject's own rows, so a delta re-runs the rule set on the changed
+    subjects alone. unique_combo rules without SubjectID can tie rows of
+    different subjects: every subject sharing a changed key is re-checked
+    too, evaluated together with all holders of its own keys so its
+    duplicates are complete.
+    """
+
+    def __init__(self, ruleset: CompiledRuleset, ruleset_id: Optional[str] = None,
+                 domains: Optional[Dict[str, pd.DataFrame]] = None):
+        self.session_id = uuid.uuid4().hex
+        self.ruleset = ruleset
+        self.ruleset_id = ruleset_id
+        # Lookup datasets for cross_domain rules, fixed for the session
+        self.domains = domains
+        self._columns: List[str] = []
+        # Rows from the initial load, addressed by position, until a
+        # delta replaces the subject
+        self._base = pd.DataFrame()
+        self._positions: Dict[Any, np.ndarray] = {}
+        self._overrides: Dict[Any, pd.DataFrame] = {}
+        # Cross-subject unique_combo checks: key -> {subject: row count},
+        # and each subject's own key counts
+        self._combo_checks = [c for c in ruleset.checks
+                              if isinstance(c, UniqueComboCheck) and "SubjectID" not in c.fields]
+        self._combo_index: List[Dict[Tuple, Dict[Any, int]]] = [{} for _ in self._combo_checks]
+        self._subject_combos: List[Dict[Any, Dict[Tuple, int]]] = [{} for _ in self._combo_checks]
+        # Open violations: key -> query row tuple (QUERY_COLUMNS) and
+        # query_id (None until persisted)
+        self._subject_keys: Dict[Any, Set[Tuple]] = {}
+        self._open: Dict[Tuple, Dict[str, Any]] = {}
+        self.updates = 0
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._lock = threading.Lock()
+
+    def _subject_rows(self, subject: Any) -> Optional[pd.DataFrame]:
+        if subject in self._overrides:
+            return self._overrides[subject]
+        if subject in self._positions:
+            return self._base.iloc[self._positions[subject]]
+        return None
+
+    def _combo_keys(self, check: UniqueComboCheck, rows: Optional[pd.DataFrame]) -> Dict[Tuple, int]:
+        if rows is None or rows.empty or not all(f in rows.columns for f in check.fields):
+            return {}
+        keys = rows[check.fields].astype(object).where(rows[check.fields].notna(), None)
+        counts: Dict[Tuple, int] = {}
+        for key in keys.itertuples(index=False, name=None):
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def _reindex_combos(self, subject: Any, new_rows: Optional[pd.DataFrame]) -> Set[Any]:
+        """Move a subject's combo keys in the index; returns subjects sharing them"""
+        touched: Set[Any] = set()
+        for check, index, by_subject in zip(self._combo_checks, self._combo_index, self._subject_combos):
+            for key in by_subject.pop(subject, {}):
+                holders = index.get(key, {})
+                touched.update(holders)
+                holders.pop(subject, None)
+                if not holders:
+                    index.pop(key, None)
+            new_keys = self._combo_keys(check, new_rows)
+            for key, count in new_keys.items():
+                holders = index.setdefault(key, {})
+                touched.update(holders)
+                holders[subject] = count
+            if new_keys:
+                by_subject[subject] = new_keys
+        touched.discard(subject)
+        return touched
+
+    def _combo_partners(self, subjects: Set[Any]) -> Set[Any]:
+        """All subjects holding any combo key of the given subjects"""
+        partners: Set[Any] = set()
+        for index, by_subject in zip(self._combo_index, self._subject_combos):
+            for subject in subjects:
+                for key in by_subject.get(subject, {}):
+                    partners.update(index[key])
+        return partners
+
+    def apply_delta(self, records: pd.DataFrame,
+                    deleted_subjects: Iterable[Any] = ()) -> Dict[str, Any]:
+        """
+        Replace the rows of the subjects in records, drop deleted subjects,
+        and re-check every affected subject
+
+        Each subject present in records is replaced by exactly the rows
+        given for it (send a subject's full current rows).
+
+        Args:
+            records: Changed subjects' rows
+            deleted_subjects: Subjects to remove entirely (matched by their
+                string form, so 101 and "101" are the same subject)
+
+        Returns:
+            Dict with dirty_subjects, records_checked, opened (query frame,
+            one row per new violation), closed (query rows with their
+            query_id) and open_total
+        """
+        with self._lock:
+            groups: Dict[Any, pd.DataFrame] = {}
+            if records is not None and not records.empty:
+                for col in records.columns:
+                    if col not in self._columns:
+                        self._columns.append(col)
+                if "SubjectID" in records.columns:
+                    buckets = _buckets(records["SubjectID"])
+                    for bucket, pos in pd.Series(np.arange(len(records))).groupby(buckets, sort=False):
+                        groups[bucket] = records.iloc[pos.to_numpy()]
+                else:
+                    groups[NO_SUBJECT] = records
+
+            deleted = _buckets(pd.Series(list(deleted_subjects), dtype=object))
+            changed = set(groups) | {s for s in deleted if s not in groups}
+            dirty = set(changed)
+            for subject in changed:
+                new_rows = groups.get(subject)
+                if self._combo_checks:
+                    dirty |= self._reindex_combos(subject, new_rows)
+                self._positions.pop(subject, None)
+                if new_rows is None:
+                    self._overrides.pop(subject, None)
+                else:
+                    self._overrides[subject] = new_rows
+
+            # Dirty subjects are reconciled; their combo partners only
+            # complete the duplicate counts
+            evaluated = dirty | self._combo_partners(dirty) if self._combo_checks else dirty
+            frames = [rows for rows in (self._subject_rows(s) for s in evaluated) if rows is not None]
+            checked = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=self._columns)
+            violations = self.ruleset.run(checked, domains=self.domains)
+            if evaluated is not dirty and len(violations):
+                violations = violations[pd.Series(_buckets(violations["SubjectID"])).isin(dirty).to_numpy()]
+            return self._reconcile(dirty, violations, len(checked))
+
+    def load(self, df: pd.DataFrame, workers: int = 1) -> Dict[str, Any]:
+        """Initial full load: index subjects by position, then check everything"""
+        with self._lock:
+            self._columns = list(df.columns)
+            self._base = df.reset_index(drop=True)
+            buckets = _buckets(df["SubjectID"]) if "SubjectID" in df.columns else \
+                np.full(len(df), NO_SUBJECT, dtype=object)
+            self._positions = pd.Series(np.arange(len(df))).groupby(buckets, sort=False).indices
+            self._positions = {k: np.asarray(v) for k, v in self._positions.items()}
+            if self._combo_checks:
+                for subject in self._positions:
+                    self._reindex_combos(subject, self._subject_rows(subject))
+            return self._reconcile(set(self._positions), self.ruleset.run(self._base, workers=workers, domains=self.domains),
+                                  len(self._base))
+
+    def _reconcile(self, dirty: Set[Any], violations: pd.DataFrame, n_checked: int) -> Dict[str, Any]:
+        violations = violations.reset_index(drop=True)
+        keys = _violation_keys(violations) if len(violations) else []
+        subjects = _buckets(violations["SubjectID"]) if len(violations) else np.empty(0, dtype=object)
+
+        new_by_subject: Dict[Any, Set[Tuple]] = {}
+        first_row: Dict[Tuple, int] = {}
+        for i, (key, subject) in enumerate(zip(keys, subjects)):
+            new_by_subject.setdefault(subject, set()).add(key)
+            first_row.setdefault(key, i)
+
+        old_keys: Set[Tuple] = set()
+        for subject in dirty:
+            old_keys |= self._subject_keys.pop(subject, set())
+        new_keys = set(first_row)
+
+        closed = []
+        for key in old_keys - new_keys:
+            entry = self._open.pop(key)
+            closed.append({**dict(zip(QUERY_COLUMNS, entry["row"])), "query_id": entry["query_id"]})
+        opened_keys = [key for key in first_row if key not in old_keys]
+        opened = violations.iloc[[first_row[k] for k in opened_keys]][QUERY_COLUMNS].reset_index(drop=True) \
+            if opened_keys else pd.DataFrame(columns=QUERY_COLUMNS)
+        rows = zip(*(opened[c].to_numpy(dtype=object) for c in QUERY_COLUMNS))
+        for key, row in zip(opened_keys, rows):
+            self._open[key] = {"row": row, "query_id": None}
+        for subject, subject_keys in new_by_subject.items():
+            self._subject_keys[subject] = subject_keys
+
+        self.updates += 1
+        self.updated_at = time.time()
+        return {
+            "dirty_subjects": len(dirty),
+            "records_checked": int(n_checked),
+            "opened": opened,
+            "opened_keys": opened_keys,
+            "closed": closed,
+            "open_total": len(self._open)
+        }
+
+    def unpersisted(self) -> Tuple[List[Tuple], pd.DataFrame]:
+        """Open violations without a query_id yet (keys, query frame)"""
+        with self._lock:
+            keys = [key for key, entry in self._open.items() if entry["query_id"] is None]
+            rows = [self._open[key]["row"] for key in keys]
+        return keys, pd.DataFrame(rows, columns=QUERY_COLUMNS)
+
+    def attach_query_ids(self, keys: List[Tuple], query_ids: List[int]):
+        """Record persisted query IDs for open violations"""
+        with self._lock:
+            for key, query_id in zip(keys, query_ids):
+                if key in self._open:
+                    self._open[key]["query_id"] = query_id
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            subjects = set(self._positions) | set(self._overrides)
+            rows = sum(len(p) for p in self._positions.values()) + sum(len(f) for f in self._overrides.values())
+            persisted = sum(1 for entry in self._open.values() if entry["query_id"] is not None)
+            return {
+                "session_id": self.session_id,
+                "ruleset_id": self.ruleset_id,
+                "subjects": len(subjects),
+                "rows": rows,
+                "open_queries": len(self._open),
+                "persisted_queries": persisted,
+                "updates": self.updates
+            }
+
+
+_sessions: Dict[str, IncrementalCheckSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def create_session(ruleset: CompiledRuleset, ruleset_id: Optional[str] = None,
+                   domains: Optional[Dict[str, pd.DataFrame]] = None) -> IncrementalCheckSession:
+    """Open a session (idle sessions older than the TTL are dropped)"""
+    session = IncrementalCheckSession(ruleset, ruleset_id, domains)
+    cutoff = time.time() - SESSION_TTL_SECONDS
+    with _sessions_lock:
+        for sid in [sid for sid, s in _sessions.items() if s.updated_at < cutoff]:
+            del _sessions[sid]
+        _sessions[session.session_id] = session
+    return session
+
+
+def get_session(session_id: str) -> IncrementalCheckSession:
+    """Session by ID (KeyError if unknown or expired)"""
+    with _sessions_lock:
+        if session_id not in _sessions:
+            raise KeyError(f"Unknown session_id: {session_id}")
+        return _sessions[session_id]
+
+
+def close_session(session_id: str) -> bool:
+    with _sessions_lock:
+        return _sessions.pop(session_id, None) is not None
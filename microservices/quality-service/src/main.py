@@ -2,18 +2,36 @@
 Quality Service - Edit Checks and Data Quality Validation
 Handles YAML edit checks, validation, and query generation
 """
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+from starlette.requests import ClientDisconnect
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 import pandas as pd
 from datetime import datetime
 import uvicorn
 import os
-
-from edit_checks import run_edit_checks_yaml, load_default_rules, simulate_entry_noise
+import json
+import asyncio
+import functools
+import logging
+
+from edit_checks import load_default_rules, simulate_entry_noise
+from check_profiling import PROMETHEUS_AVAILABLE, metrics_payload, observe_profile, profile_records, ruleset_label
+from ruleset_cache import (
+    get_ruleset, register_ruleset, resolve_ruleset,
+    unregister_ruleset, list_rulesets, ruleset_cache_stats
+)
+from query_store import insert_queries, close_queries, QUERY_INSERT_BATCH_SIZE
+from incremental_checks import create_session, get_session, close_session
+from parallel_checks import EDIT_CHECK_WORKERS, shutdown_pool
+from noise_engine import inject_noise, validate_noise_rates
+from streaming_checks import STREAM_CHUNK_ROWS, STREAM_FORMATS, StreamingCheckRunner, record_chunks
 from db_utils import db, cache, startup_db, shutdown_db
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(
     title="Quality Service",
     description="Data Quality Checks and YAML Edit Check Engine",
@@ -30,6 +48,7 @@ async def startup_event():
 async def shutdown_event():
     """Close database connections on shutdown"""
     await shutdown_db()
+    shutdown_pool()
 
 # CORS configuration
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "*").split(",") if os.getenv("ALLOWED_ORIGINS") else ["*"]
@@ -49,6 +68,43 @@ app.add_middleware(
 class EditChecksRequest(BaseModel):
     data: List[Dict[str, Any]]
     rules_yaml: Optional[str] = None
+    ruleset_id: Optional[str] = Field(default=None, description="Registered rule set (instead of rules_yaml)")
+    workers: int = Field(default=EDIT_CHECK_WORKERS, ge=1, le=64, description="Processes for subject-partitioned checks")
+    domains: Dict[str, List[Dict[str, Any]]] = Field(default={}, description="Lookup datasets for cross_domain rules (e.g. demographics, labs)")
+
+class SaveQueriesRequest(EditChecksRequest):
+    batch_size: int = Field(default=QUERY_INSERT_BATCH_SIZE, ge=1, le=100000, description="Violations per bulk INSERT")
+
+class IncrementalSessionRequest(EditChecksRequest):
+    persist: bool = Field(default=False, description="Create/close queries in the database")
+    batch_size: int = Field(default=QUERY_INSERT_BATCH_SIZE, ge=1, le=100000, description="Queries per bulk statement")
+
+class IncrementalDeltaRequest(BaseModel):
+    records: List[Dict[str, Any]] = Field(default=[], description="Full current rows of every changed subject")
+    deleted_subjects: List[Union[str, int]] = Field(default=[], description="Subjects removed entirely")
+    persist: bool = Field(default=False, description="Create/close queries in the database")
+    batch_size: int = Field(default=QUERY_INSERT_BATCH_SIZE, ge=1, le=100000, description="Queries per bulk statement")
+
+class IncrementalChecksResponse(BaseModel):
+    session_id: str
+    dirty_subjects: int
+    records_checked: int
+    opened: List[Dict[str, Any]] = Field(..., description="New violations (queries to open)")
+    closed: List[Dict[str, Any]] = Field(..., description="Resolved violations (queries to close), with query_id when persisted")
+    open_queries: int
+    queries_created: int = 0
+    queries_closed: int = 0
+
+class RulesetRegisterRequest(BaseModel):
+    rules_yaml: str = Field(..., description="YAML edit check rules to compile and pin")
+    ruleset_id: Optional[str] = Field(default=None, description="ID to register under (defaults to YAML hash)")
+
+class RulesetInfo(BaseModel):
+    ruleset_id: str
+    rules_hash: str
+    total_checks: int
+    check_ids: List[str]
+    created_at: str
 
 class EditChecksResponse(BaseModel):
     total_records: int
@@ -56,6 +112,7 @@ class EditChecksResponse(BaseModel):
     violations: List[Dict[str, Any]]
     quality_score: float
     passed: bool
+    profile: Optional[List[Dict[str, Any]]] = None
 
 class NoiseRequest(BaseModel):
     data: List[Dict[str, Any]]
@@ -67,6 +124,93 @@ class NoiseResponse(BaseModel):
     noisy_data: List[Dict[str, Any]]
     rows: int
 
+class InjectNoiseRequest(BaseModel):
+    data: List[Dict[str, Any]]
+    rates: Dict[str, float] = Field(default_factory=dict, description="Error rates by type (jitter, scale, transpose, missing, unit_flip, wrong_visit, duplicate)")
+    columns: Optional[List[str]] = Field(default=None, description="Numeric columns to corrupt (default: all numeric)")
+    visit_labels: Optional[List[str]] = Field(default=None, description="Labels for wrong_visit errors (default: observed)")
+    seed: int = Field(default=123)
+    include_log: bool = Field(default=False, description="Return the injected errors")
+
+class InjectNoiseResponse(BaseModel):
+    noisy_data: List[Dict[str, Any]]
+    rows: int
+    counts: Dict[str, Dict[str, int]]
+    total_errors: int
+    log: Optional[List[Dict[str, Any]]] = None
+
+def _load_ruleset(rules_yaml: Optional[str], ruleset_id: Optional[str] = None):
+    """
+    Compiled rules for a request: registered ID, posted YAML or the
+    default rules (404 for an unknown ID, 400 for invalid YAML)
+    """
+    if ruleset_id:
+        try:
+            return resolve_ruleset(ruleset_id).compiled
+        except KeyError as e:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e.args[0]))
+    try:
+        return get_ruleset(rules_yaml).compiled
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+async def _run_blocking(func, *args, **kwargs):
+    """Run CPU-bound work in the default executor, off the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+def _domain_frames(domains: Dict[str, List[Dict[str, Any]]]) -> Dict[str, pd.DataFrame]:
+    return {name: pd.DataFrame(rows) for name, rows in domains.items()}
+
+def _violation_records(queries_df: pd.DataFrame, columns: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Query frame -> list of dicts, renaming columns (new_name -> query column); missing values as None"""
+    if queries_df.empty:
+        return []
+    out = pd.DataFrame({name: queries_df[col] for name, col in columns.items()})
+    if "severity" in out.columns:
+        out["severity"] = out["severity"].astype(str).str.lower()
+    return out.astype(object).where(out.notna(), None).to_dict(orient="records")
+
+_QUERY_FIELDS = {
+    "subject_id": "SubjectID",
+    "visit": "VisitName",
+    "check_id": "CheckID",
+    "field": "Field",
+    "severity": "Severity",
+    "message": "Message"
+}
+
+async def _incremental_response(session, result: Dict[str, Any], persist: bool,
+                                batch_size: int) -> IncrementalChecksResponse:
+    """Persist session changes if requested and format the reconciliation"""
+    created = closed = 0
+    if persist and db.pool:
+        try:
+            # Includes violations whose earlier persist failed
+            keys, pending = session.unpersisted()
+            if len(pending):
+                query_ids = await insert_queries(db, pending, batch_size=batch_size)
+                session.attach_query_ids(keys, query_ids)
+                created = len(query_ids)
+            resolved_ids = [int(q["query_id"]) for q in result["closed"] if q["query_id"] is not None]
+            if resolved_ids:
+                closed = await close_queries(db, resolved_ids, batch_size=batch_size)
+        except Exception as db_error:
+            logger.warning(f"Failed to reconcile queries in database: {db_error}")
+
+    closed_df = pd.DataFrame(result["closed"])
+    closed_rows = _violation_records(closed_df, {**_QUERY_FIELDS, "query_id": "query_id"})
+    return IncrementalChecksResponse(
+        session_id=session.session_id,
+        dirty_subjects=result["dirty_subjects"],
+        records_checked=result["records_checked"],
+        opened=_violation_records(result["opened"], _QUERY_FIELDS),
+        closed=closed_rows,
+        open_queries=result["open_total"],
+        queries_created=created,
+        queries_closed=closed
+    )
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -101,11 +245,24 @@ async def root():
             "health": "/health",
             "checks": "/checks/validate",
             "rules": "/checks/rules",
+            "rulesets": "/checks/rulesets",
+            "incremental": "/checks/incremental/sessions",
+            "validate_stream": "/checks/validate/stream",
             "noise": "/quality/simulate-noise",
+            "inject_noise": "/quality/inject-noise",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint (per-rule edit-check histograms)"""
+    if not PROMETHEUS_AVAILABLE:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="prometheus_client not installed")
+    body, content_type = metrics_payload()
+    return Response(content=body, headers={"Content-Type": content_type})
+
 @app.get("/checks/rules")
 async def get_default_rules():
     """
@@ -117,8 +274,38 @@ async def get_default_rules():
         "rules_yaml": load_default_rules()
     }
 
+@app.post("/checks/rulesets", response_model=RulesetInfo)
+async def register_checks_ruleset(request: RulesetRegisterRequest):
+    """
+    Compile and register a YAML rule set
+
+    Validation endpoints can then be called with ruleset_id instead of
+    re-sending rules_yaml. Registering identical YAML reuses the compiled
+    rules.
+    """
+    try:
+        ruleset = register_ruleset(request.rules_yaml, request.ruleset_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return RulesetInfo(**ruleset.describe())
+
+@app.get("/checks/rulesets")
+async def get_checks_rulesets():
+    """Registered rule sets and compiled rule-set cache statistics"""
+    return {"rulesets": list_rulesets(), **ruleset_cache_stats()}
+
+@app.delete("/checks/rulesets/{ruleset_id}")
+async def delete_checks_ruleset(ruleset_id: str):
+    """Unregister a rule set"""
+    if not unregister_ruleset(ruleset_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown ruleset_id: {ruleset_id}")
+    return {"deleted": ruleset_id}
+
 @app.post("/checks/validate", response_model=EditChecksResponse)
-async def validate_with_edit_checks(request: EditChecksRequest):
+async def validate_with_edit_checks(
+    request: EditChecksRequest,
+    profile: bool = Query(default=False, description="Return per-rule time, rows, violations and memory")
+):
     """
     Run YAML-based edit checks on data
 
@@ -130,37 +317,38 @@ async def validate_with_edit_checks(request: EditChecksRequest):
     - constant_within_subject: Field must be constant per subject
     - required_visits: All subjects must have required visits
     - unique_combo: Field combination must be unique
+    - delta: Change between consecutive visits of a subject within limits
+    - conditional: Rows meeting "if" conditions must meet "then" conditions
+    - cross_domain: Rows must match (and agree with) a record in domains
+
+    With profile=true the response lists each rule's wall time, rows
+    scanned, violations and peak memory (measured in a second, traced
+    pass). Per-rule numbers are always exported on /metrics.
     """
+    # Use default rules if none provided
+    ruleset = _load_ruleset(request.rules_yaml, request.ruleset_id)
+
     try:
         df = pd.DataFrame(request.data)
         total_records = len(df)
-
-        # Use default rules if none provided
-        rules_yaml = request.rules_yaml or load_default_rules()
+        domains = _domain_frames(request.domains)
 
         # Run edit checks
-        queries_df = run_edit_checks_yaml(df, rules_yaml)
-
-        # Count total checks run (from YAML rules)
-        import yaml
-        spec = yaml.safe_load(rules_yaml)
-        if isinstance(spec, list):
-            total_checks = len(spec)
-        elif isinstance(spec, dict):
-            total_checks = len(spec.get("rules", []))
-        else:
-            total_checks = 0
+        rule_profile = []
+        queries_df = await _run_blocking(ruleset.run, df, workers=request.workers, domains=domains,
+                                         profile=rule_profile)
+        total_checks = ruleset.total_checks
+        if profile and rule_profile:
+            await _run_blocking(ruleset.profile_memory, df, rule_profile, domains=domains)
+        observe_profile(rule_profile, ruleset_label(request.rules_yaml, request.ruleset_id))
 
         # Format violations
-        violations = []
-        if not queries_df.empty:
-            for _, row in queries_df.iterrows():
-                violations.append({
-                    "record": row.get("SubjectID", ""),
-                    "rule": row.get("CheckID", ""),
-                    "severity": row.get("Severity", "").lower(),
-                    "message": row.get("Message", "")
-                })
+        violations = _violation_records(queries_df, {
+            "record": "SubjectID",
+            "rule": "CheckID",
+            "severity": "Severity",
+            "message": "Message"
+        })
 
         # Calculate quality score (1.0 = perfect, 0.0 = all checks failed)
         # Score = (total_checks - violations) / total_checks
@@ -178,7 +366,8 @@ async def validate_with_edit_checks(request: EditChecksRequest):
             total_checks=total_checks,
             violations=violations,
             quality_score=round(quality_score, 2),
-            passed=passed
+            passed=passed,
+            profile=profile_records(rule_profile) if profile else None
         )
     except Exception as e:
         raise HTTPException(
@@ -186,86 +375,123 @@ async def validate_with_edit_checks(request: EditChecksRequest):
             detail=f"Edit checks failed: {str(e)}"
         )
 
+_STREAM_FIELDS = {
+    "row": "Row",
+    **_QUERY_FIELDS,
+    "value": "Value"
+}
+
+def _stream_lines(queries_df: pd.DataFrame) -> str:
+    """Violations as NDJSON event lines"""
+    out = pd.DataFrame({"type": "violation", **{name: queries_df[col] for name, col in _STREAM_FIELDS.items()}})
+    out["severity"] = out["severity"].astype(str).str.lower()
+    return out.to_json(orient="records", lines=True, force_ascii=False).rstrip("\n") + "\n"
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body iterator reads the request body
+
+    The stock response listens for disconnects on receive(), which would
+    consume the upload's body messages; here the iterator owns receive
+    (request.stream() raises ClientDisconnect when the client goes away).
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+@app.post("/checks/validate/stream")
+async def validate_stream(
+    request: Request,
+    ruleset_id: Optional[str] = Query(default=None, description="Registered rule set (default rules if omitted)"),
+    format: Optional[str] = Query(default=None, description="ndjson or csv (default from Content-Type)"),
+    chunk_rows: int = Query(default=STREAM_CHUNK_ROWS, ge=1, le=1000000, description="Records per evaluated chunk")
+):
+    """
+    Streaming edit checks for large uploads
+
+    The body is NDJSON (one record per line) or CSV (header line first),
+    read as it arrives. Row-level rules run on every chunk; cross-row
+    rules keep per-subject/per-key state. The response is NDJSON:
+    violation events as they are found (row = 0-based record number, null
+    for subject-level queries), a progress event per chunk, missing-visit
+    violations at the end, then a summary event. A failure mid-stream is
+    reported as an error event.
+    """
+    ruleset = _load_ruleset(None, ruleset_id)
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    if fmt not in STREAM_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format: {fmt} (expected one of {', '.join(STREAM_FORMATS)})"
+        )
+    try:
+        runner = StreamingCheckRunner(ruleset)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    async def events():
+        loop = asyncio.get_running_loop()
+        try:
+            async for chunk in record_chunks(request.stream(), fmt, chunk_rows):
+                found = await loop.run_in_executor(None, runner.feed, chunk)
+                if len(found):
+                    yield _stream_lines(found)
+                yield json.dumps({"type": "progress", "rows": runner.rows, "violations": runner.violations}) + "\n"
+            found = runner.finish()
+            if len(found):
+                yield _stream_lines(found)
+            yield json.dumps({"type": "summary", **runner.summary()}) + "\n"
+        except ClientDisconnect:
+            logger.info(f"Streaming edit checks: client disconnected after {runner.rows} rows")
+        except Exception as e:
+            logger.warning(f"Streaming edit checks failed after {runner.rows} rows: {e}")
+            yield json.dumps({"type": "error", "rows": runner.rows,
+                              "detail": f"Streaming edit checks failed: {str(e)}"}) + "\n"
+
+    return _DuplexStreamingResponse(events(), media_type="application/x-ndjson")
+
 @app.post("/checks/validate-and-save-queries")
-async def validate_and_save_queries(request: EditChecksRequest):
+async def validate_and_save_queries(request: SaveQueriesRequest):
     """
     Run validation and automatically save violations as queries
 
     This replaces the old /checks/validate endpoint for EDC integration.
     It runs edit checks and creates query records for any violations found.
     """
+    ruleset = _load_ruleset(request.rules_yaml, request.ruleset_id)
+
     try:
         # Convert to DataFrame
         df = pd.DataFrame(request.data)
 
         # Run existing validation
-        rules_yaml = request.rules_yaml or load_default_rules()
-        queries_df = run_edit_checks_yaml(df, rules_yaml)
-
-        # Count total checks
-        import yaml
-        spec = yaml.safe_load(rules_yaml)
-        if isinstance(spec, list):
-            total_checks = len(spec)
-        elif isinstance(spec, dict):
-            total_checks = len(spec.get("rules", []))
-        else:
-            total_checks = 0
+        rule_profile = []
+        queries_df = await _run_blocking(ruleset.run, df, workers=request.workers,
+                                         domains=_domain_frames(request.domains), profile=rule_profile)
+        total_checks = ruleset.total_checks
+        observe_profile(rule_profile, ruleset_label(request.rules_yaml, request.ruleset_id))
 
         # Format violations
-        violations = []
-        if not queries_df.empty:
-            for _, row in queries_df.iterrows():
-                violations.append({
-                    "subject_id": row.get("SubjectID", "UNKNOWN"),
-                    "check_id": row.get("CheckID", ""),
-                    "field": row.get("Field", ""),
-                    "severity": row.get("Severity", "warning").lower(),
-                    "message": row.get("Message", ""),
-                    "check_name": row.get("CheckName", "")
-                })
-
-        # Save violations as queries in database
+        violations = _violation_records(queries_df, {
+            "subject_id": "SubjectID",
+            "check_id": "CheckID",
+            "field": "Field",
+            "severity": "Severity",
+            "message": "Message"
+        })
+        for violation in violations:
+            violation["check_name"] = ""
+
+        # Save violations as queries in database (one transaction, bulk batches)
         queries_created = 0
         if violations and db.pool:
-            for violation in violations:
-                # Generate query text
-                query_text = f"{violation.get('check_name', 'Check')}: {violation['message']}"
-
-                # Determine severity based on check
-                severity_map = {
-                    "error": "critical",
-                    "warning": "warning",
-                    "info": "info"
-                }
-                severity = severity_map.get(violation.get("severity", "warning"), "warning")
-
-                # Insert query into database
-                try:
-                    query_id = await db.fetchval("""
-                        INSERT INTO queries (
-                            subject_id, check_id, field_id, query_text,
-                            severity, query_type, status, opened_at
-                        )
-                        VALUES ($1, $2, $3, $4, $5, 'auto', 'open', NOW())
-                        RETURNING query_id
-                    """,
-                        violation.get("subject_id", "UNKNOWN"),
-                        violation.get("check_id", ""),
-                        violation.get("field", ""),
-                        query_text,
-                        severity
-                    )
-
-                    # Log to query_history
-                    await db.execute("""
-                        INSERT INTO query_history (query_id, action, action_at, notes)
-                        VALUES ($1, 'opened', NOW(), 'Auto-generated from edit check')
-                    """, query_id)
-
-                    queries_created += 1
-                except Exception as db_error:
-                    logger.warning(f"Failed to save query to database: {db_error}")
+            try:
+                query_ids = await insert_queries(db, queries_df, batch_size=request.batch_size)
+                queries_created = len(query_ids)
+            except Exception as db_error:
+                logger.warning(f"Failed to save queries to database: {db_error}")
 
         # Calculate quality score
         num_violations = len(violations)
@@ -292,6 +518,68 @@ async def validate_and_save_queries(request: EditChecksRequest):
             detail=f"Validation and query creation failed: {str(e)}"
         )
 
+@app.post("/checks/incremental/sessions", response_model=IncrementalChecksResponse)
+async def create_incremental_session(request: IncrementalSessionRequest):
+    """
+    Start an incremental edit-check session
+
+    Loads the full dataset and runs every check once. Later deltas
+    (/checks/incremental/sessions/{session_id}/delta) re-check only the
+    subjects they touch. With persist, violations are created as queries.
+    """
+    ruleset = _load_ruleset(request.rules_yaml, request.ruleset_id)
+
+    try:
+        session = create_session(ruleset, request.ruleset_id, _domain_frames(request.domains))
+        result = await _run_blocking(session.load, pd.DataFrame(request.data), workers=request.workers)
+        return await _incremental_response(session, result, request.persist, request.batch_size)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Incremental checks failed: {str(e)}"
+        )
+
+@app.post("/checks/incremental/sessions/{session_id}/delta", response_model=IncrementalChecksResponse)
+async def apply_incremental_delta(session_id: str, request: IncrementalDeltaRequest):
+    """
+    Re-check changed subjects and reconcile their queries
+
+    Each subject in records is replaced by the rows sent for it (send the
+    subject's full current rows); deleted_subjects are removed. Only
+    those subjects - plus subjects sharing a key with them under
+    cross-subject unique_combo rules - are re-evaluated. Violations that
+    are still present keep their query; new ones are opened and resolved
+    ones closed.
+    """
+    try:
+        session = get_session(session_id)
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e.args[0]))
+
+    try:
+        result = await _run_blocking(session.apply_delta, pd.DataFrame(request.records), request.deleted_subjects)
+        return await _incremental_response(session, result, request.persist, request.batch_size)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Incremental checks failed: {str(e)}"
+        )
+
+@app.get("/checks/incremental/sessions/{session_id}")
+async def get_incremental_session(session_id: str):
+    """Session size and open/persisted query counts"""
+    try:
+        return get_session(session_id).status()
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e.args[0]))
+
+@app.delete("/checks/incremental/sessions/{session_id}")
+async def delete_incremental_session(session_id: str):
+    """Drop an incremental session (database queries are left as they are)"""
+    if not close_session(session_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown session_id: {session_id}")
+    return {"deleted": session_id}
+
 @app.post("/quality/simulate-noise", response_model=NoiseResponse)
 async def add_entry_noise(request: NoiseRequest):
     """
@@ -324,6 +612,55 @@ async def add_entry_noise(request: NoiseRequest):
             detail=f"Noise simulation failed: {str(e)}"
         )
 
+def _json_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Records with missing values as None"""
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+@app.post("/quality/inject-noise", response_model=InjectNoiseResponse)
+async def inject_entry_noise(request: InjectNoiseRequest):
+    """
+    Inject a full taxonomy of data entry errors
+
+    Per numeric cell (at most one each): ±1 jitter (±0.1 for decimal
+    values), ×1.1/×0.9 scaling, transposed digits, missing value, unit
+    flip (C→F, mmHg→kPa, kg→lb, cm→in, otherwise ×10). Per row: wrong
+    visit label, duplicated row. Returns error counts per column and,
+    with include_log, each injected error (0-based input row).
+    """
+    try:
+        validate_noise_rates(request.rates)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if request.columns:
+        known = set().union(*request.data)
+        unknown = [c for c in request.columns if c not in known]
+        if unknown:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown columns: {', '.join(unknown)}")
+
+    try:
+        df = pd.DataFrame(request.data)
+        noisy_df, report = inject_noise(
+            df,
+            rates=request.rates,
+            columns=request.columns,
+            visit_labels=request.visit_labels,
+            seed=request.seed,
+            return_log=request.include_log
+        )
+
+        return InjectNoiseResponse(
+            noisy_data=_json_records(noisy_df),
+            rows=len(noisy_df),
+            counts=report["counts"],
+            total_errors=report["total_errors"],
+            log=_json_records(report["log"]) if request.include_log else None
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Noise injection failed: {str(e)}"
+        )
+
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8004)
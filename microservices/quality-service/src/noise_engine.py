@@ -0,0 +1,220 @@
+"""
+Vectorized data-entry noise engine
+All error decisions for all columns come from one uniform matrix; errors
+are applied to compact column buffers and the frame is assembled once
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Per-cell error types for numeric columns, in bin order; a cell gets at
+# most one of them
+CELL_ERRORS = ("jitter", "scale", "transpose", "missing", "unit_flip")
+# Per-row error types
+ROW_ERRORS = ("wrong_visit", "duplicate")
+NOISE_TYPES = CELL_ERRORS + ROW_ERRORS
+
+DEFAULT_NOISE_RATES = {
+    "jitter": 0.02,
+    "scale": 0.01,
+    "transpose": 0.005,
+    "missing": 0.01,
+    "unit_flip": 0.01,
+    "wrong_visit": 0.005,
+    "duplicate": 0.002
+}
+
+# Column -> (factor, offset) of the wrong-unit value
+UNIT_FLIPS = {
+    "Temperature": (9.0 / 5.0, 32.0),     # °C entered as °F
+    "SystolicBP": (0.133322, 0.0),        # mmHg entered as kPa
+    "DiastolicBP": (0.133322, 0.0),
+    "Weight": (2.20462, 0.0),             # kg entered as lb
+    "Height": (1.0 / 2.54, 0.0),          # cm entered as in
+    "Glucose": (18.0, 0.0)                # mmol/L entered as mg/dL
+}
+# Other numeric columns: misplaced decimal
+DEFAULT_UNIT_FLIP = (10.0, 0.0)
+
+
+def validate_noise_rates(rates: Optional[Dict[str, float]]) -> Dict[str, float]:
+    """
+    Full rate table (defaults for unspecified types)
+
+    Raises:
+        ValueError: Unknown type, rate outside [0, 1], or per-cell rates
+            summing to more than 1
+    """
+    rates = rates or {}
+    unknown = sorted(set(rates) - set(NOISE_TYPES))
+    if unknown:
+        raise ValueError(f"Unknown noise types: {', '.join(unknown)} (expected {', '.join(NOISE_TYPES)})")
+    merged = {**DEFAULT_NOISE_RATES, **rates}
+    for name, rate in merged.items():
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError(f"Noise rate {name} must be within [0, 1]")
+    if sum(merged[name] for name in CELL_ERRORS) > 1.0:
+        raise ValueError(f"Rates of {', '.join(CELL_ERRORS)} must sum to at most 1")
+    return merged
+
+
+def _transpose_digits(values: np.ndarray, u: np.ndarray) -> np.ndarray:
+    """Swap two adjacent digits of the integer part (position chosen by u)"""
+    sign = np.sign(values)
+    magnitude = np.abs(values)
+    whole = np.floor(magnitude).astype(np.int64)
+    frac = magnitude - whole
+    n_digits = np.where(whole > 0, np.floor(np.log10(np.maximum(whole, 1))).astype(np.int64) + 1, 1)
+    position = np.minimum((u * (n_digits - 1)).astype(np.int64), np.maximum(n_digits - 2, 0))
+    low = 10 ** position
+    a = (whole // low) % 10
+    b = (whole // (low * 10)) % 10
+    swapped = whole + (b - a) * low + (a - b) * low * 10
+    swapped = np.where(n_digits >= 2, swapped, whole)
+    return sign * (swapped + frac)
+
+
+def inject_noise(df: pd.DataFrame, rates: Optional[Dict[str, float]] = None,
+                 columns: Optional[Sequence[str]] = None, visit_col: str = "VisitName",
+                 visit_labels: Optional[Sequence[str]] = None,
+                 unit_flips: Optional[Dict[str, Tuple[float, float]]] = None,
+                 seed: int = 123, return_log: bool = False) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Inject a full taxonomy of data-entry errors
+
+    One float32 uniform matrix (rows x (numeric columns + 2)) decides every
+    error: each numeric cell falls into at most one error bin, and the
+    position within the bin drives the error's details (jitter sign,
+    scale direction, digit position, replacement visit), so no further
+    draws are made. Integer-valued columns stay integer-valued; corrupted
+    columns are returned as float64 (missing cells are NaN) and columns
+    without any injected error keep their original dtype.
+
+    Args:
+        df: Clean DataFrame (not modified)
+        rates: Error rates by type (see NOISE_TYPES); unspecified types
+            use DEFAULT_NOISE_RATES
+        columns: Numeric columns to corrupt (default: all numeric columns)
+        visit_col: Column for wrong_visit errors
+        visit_labels: Labels to draw wrong visits from (default: observed)
+        unit_flips: Per-column (factor, offset) overrides for unit_flip
+        seed: Random seed
+        return_log: Also return the injected errors (input row, column,
+            error, original value)
+
+    Returns:
+        (noisy DataFrame, report with counts per column/error, rows and
+        optionally the log DataFrame)
+    """
+    rates = validate_noise_rates(rates)
+    flips = {**UNIT_FLIPS, **(unit_flips or {})}
+    if columns is None:
+        columns = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])]
+    else:
+        missing = [c for c in columns if c not in df.columns]
+        if missing:
+            raise ValueError(f"Unknown columns: {', '.join(missing)}")
+    columns = list(columns)
+
+    n = len(df)
+    rng = np.random.default_rng(seed)
+    # Columns: one per numeric column, then wrong_visit, duplicate
+    u = rng.random((n, len(columns) + 2), dtype=np.float32)
+
+    edges = np.cumsum([rates[name] for name in CELL_ERRORS])
+    lows = np.concatenate([[0.0], edges[:-1]])
+    # Output columns; the frame is built once at the end
+    arrays: Dict[str, Any] = {col: df[col].array if isinstance(df[col].dtype, pd.api.extensions.ExtensionDtype)
+                              else df[col].to_numpy() for col in df.columns}
+    counts: Dict[str, Dict[str, int]] = {}
+    log: List[pd.DataFrame] = []
+
+    def record(column: str, error: str, rows: np.ndarray, original: np.ndarray):
+        counts.setdefault(column, {})[error] = int(len(rows))
+        if return_log and len(rows):
+            log.append(pd.DataFrame({"Row": rows, "Column": column, "Error": error,
+                                     "Original": np.asarray(original, dtype=object)}))
+
+    for j, col in enumerate(columns):
+        x = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64, copy=True)
+        finite = np.isfinite(x)
+        integral = bool(np.all(x[finite] == np.rint(x[finite])))
+        step = 1.0 if integral else 0.1
+        uj = u[:, j]
+        # Only the few cells inside the error bins are binned further;
+        # missing values stay as they are
+        hit = np.flatnonzero((uj < edges[-1]) & finite)
+        kind = np.searchsorted(edges, uj[hit], side="right")
+        changed = False
+
+        for t, error in enumerate(CELL_ERRORS):
+            rate = rates[error]
+            idx = hit[kind == t] if rate > 0 else np.empty(0, dtype=np.int64)
+            if not len(idx):
+                counts.setdefault(col, {})[error] = 0
+                continue
+            # Position within the bin: a fresh uniform for the error details
+            v = (uj[idx] - lows[t]) / rate
+            original = x[idx].copy()
+            if error == "jitter":
+                x[idx] += np.where(v < 0.5, step, -step)
+            elif error == "scale":
+                x[idx] *= np.where(v < 0.5, 1.10, 0.90)
+            elif error == "transpose":
+                x[idx] = _transpose_digits(x[idx], v)
+            elif error == "missing":
+                x[idx] = np.nan
+            elif error == "unit_flip":
+                factor, offset = flips.get(col, DEFAULT_UNIT_FLIP)
+                x[idx] = x[idx] * factor + offset
+            if error != "missing":
+                x[idx] = np.rint(x[idx]) if integral else np.round(x[idx], 6)
+            record(col, error, idx, original)
+            changed = True
+        if changed:
+            # float64 holds integers exactly up to 2**53 (float32 only to 2**24)
+            arrays[col] = x
+
+    if visit_col in df.columns and rates["wrong_visit"] > 0:
+        labels = pd.Index(visit_labels) if visit_labels is not None else None
+        codes, uniques = pd.factorize(df[visit_col])
+        if labels is not None:
+            codes = labels.get_indexer(df[visit_col])
+            uniques = labels
+        n_labels = len(uniques)
+        idx = np.flatnonzero((u[:, -2] < rates["wrong_visit"]) & (codes >= 0)) if n_labels >= 2 \
+            else np.empty(0, dtype=np.int64)
+        if len(idx):
+            v = u[idx, -2] / rates["wrong_visit"]
+            original = np.asarray(uniques, dtype=object).take(codes[idx])
+            codes = codes.copy()
+            codes[idx] = (codes[idx] + 1 + (v * (n_labels - 1)).astype(np.int64) % (n_labels - 1)) % n_labels
+            values = df[visit_col].to_numpy(dtype=object, copy=True)
+            values[idx] = np.asarray(uniques, dtype=object).take(codes[idx])
+            dtype = df[visit_col].dtype
+            arrays[visit_col] = pd.Categorical(values, dtype=dtype) if isinstance(dtype, pd.CategoricalDtype) else values
+            record(visit_col, "wrong_visit", idx, original)
+        else:
+            counts.setdefault(visit_col, {})["wrong_visit"] = 0
+
+    duplicated = np.flatnonzero(u[:, -1] < rates["duplicate"])
+    index = df.index
+    if len(duplicated):
+        # Duplicates follow their original row
+        order = np.sort(np.concatenate([np.arange(n), duplicated]), kind="stable")
+        arrays = {col: values.take(order) for col, values in arrays.items()}
+        index = None
+    out = pd.DataFrame(arrays, index=index, columns=list(df.columns), copy=False)
+    record("*", "duplicate", duplicated, np.full(len(duplicated), "", dtype=object))
+
+    report: Dict[str, Any] = {
+        "rows_in": n,
+        "rows_out": len(out),
+        "counts": counts,
+        "total_errors": int(sum(sum(c.values()) for c in counts.values()))
+    }
+    if return_log:
+        report["log"] = pd.concat(log, ignore_index=True) if log else \
+            pd.DataFrame(columns=["Row", "Column", "Error", "Original"])
+    return out, report
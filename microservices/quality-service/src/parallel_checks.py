@@ -0,0 +1,242 @@
+"""
+Subject-partitioned edit checks
+Rows are hash-partitioned by SubjectID so per-subject rules stay inside one
+partition; partitions run in a process pool and the per-check results are
+merged back into the serial output order
+"""
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from edit_checks import QUERY_COLUMNS, CompiledRuleset, compile_rules, load_default_rules
+
+EDIT_CHECK_WORKERS = int(os.getenv("EDIT_CHECK_WORKERS", "1"))
+EDIT_CHECK_MAX_WORKERS = int(os.getenv("EDIT_CHECK_MAX_WORKERS", str(os.cpu_count() or 1)))
+# Below this many rows process start-up and pickling outweigh the gain
+PARALLEL_MIN_ROWS = int(os.getenv("EDIT_CHECK_PARALLEL_MIN_ROWS", "20000"))
+# spawn avoids forking a process that already runs threads (event loop, DB pool)
+START_METHOD = os.getenv("EDIT_CHECK_START_METHOD", "spawn")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Shared process pool (EDIT_CHECK_MAX_WORKERS processes, started on demand)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=EDIT_CHECK_MAX_WORKERS,
+                                        mp_context=multiprocessing.get_context(START_METHOD))
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+def partition_by_subject(subjects: pd.Series, n_partitions: int) -> List[np.ndarray]:
+    """
+    Row positions per partition, by a stable hash of SubjectID
+
+    Every row of a subject lands in the same partition (missing IDs
+    included); positions stay ascending within a partition.
+    """
+    hashes = pd.util.hash_pandas_object(subjects, index=False).to_numpy()
+    buckets = hashes % np.uint64(n_partitions)
+    order = np.argsort(buckets, kind="stable")
+    bounds = np.searchsorted(buckets[order], np.arange(1, n_partitions, dtype=np.uint64))
+    return [part for part in np.split(order, bounds) if len(part)]
+
+
+def _check_partition(ruleset: CompiledRuleset, part: pd.DataFrame, row_ids: np.ndarray,
+                     check_indices: List[int], domains: Optional[Dict[str, pd.DataFrame]],
+                     profiled: bool = False) -> Tuple[List[Optional[pd.DataFrame]], Optional[List[Dict[str, Any]]]]:
+    profile = [] if profiled else None
+    return ruleset.evaluate(part, row_ids, check_indices, domains, profile), profile
+
+
+def _merge_profile(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One check's partition profiles (seconds summed across processes)"""
+    merged = dict(entries[0])
+    for key in ("seconds", "rows", "violations"):
+        merged[key] = sum(entry[key] for entry in entries)
+    return merged
+
+
+def _merge_check(check, frames: List[pd.DataFrame], subjects: pd.Index) -> pd.DataFrame:
+    """
+    One check's partition results in serial order
+
+    Subject-scope rows follow subjects, the full frame's sorted SubjectIDs
+    (the order CheckContext.subject_codes gives the serial run; IDs of
+    mixed types cannot be compared directly)
+    """
+    if len(frames) == 1:
+        return frames[0]
+    merged = pd.concat(frames)
+    if check.scope == "subject":
+        order = np.argsort(subjects.get_indexer(merged["SubjectID"]), kind="stable")
+        return merged.iloc[order]
+    return merged.sort_index(kind="stable")
+
+
+def run_partitioned(ruleset: CompiledRuleset, df: pd.DataFrame, workers: int,
+                    executor: Optional[Executor] = None,
+                    min_rows: int = PARALLEL_MIN_ROWS,
+                    domains: Optional[Dict[str, pd.DataFrame]] = None,
+                    profile: Optional[List[Dict[str, Any]]] = None) -> pd.DataFrame:
+    """
+    Run a rule set over SubjectID partitions in a process pool
+
+    Checks that compare rows across subjects (unique_combo without
+    SubjectID) run on the full frame in this process while the partitions
+    are evaluated. Output is identical to CompiledRuleset.run(df).
+
+    Args:
+        ruleset: Compiled rule set
+        df: DataFrame to validate
+        workers: Number of partitions
+        executor: Pool to use (default: the shared process pool)
+        min_rows: Smaller frames run serially
+        domains: Lookup datasets for cross_domain rules
+        profile: If given, receives one rule_profile entry per check;
+            seconds are summed over the partitions
+
+    Returns:
+        DataFrame with QUERY_COLUMNS, one row per violation
+    """
+    if workers <= 1 or len(df) < min_rows or "SubjectID" not in df.columns:
+        return ruleset.run(df, domains=domains, profile=profile)
+
+    local = [i for i, check in enumerate(ruleset.checks) if check.subject_local]
+    shared = [i for i, check in enumerate(ruleset.checks) if not check.subject_local]
+    executor = executor or get_pool()
+    futures = [
+        executor.submit(_check_partition, ruleset, df.iloc[positions], positions, local, domains,
+                        profile is not None)
+        for positions in partition_by_subject(df["SubjectID"], workers)
+    ] if local else []
+
+    results: Dict[int, List[pd.DataFrame]] = {}
+    profiles: Dict[int, List[Dict[str, Any]]] = {}
+    shared_profile = [] if profile is not None else None
+    for i, out in zip(shared, ruleset.evaluate(df, check_indices=shared, domains=domains, profile=shared_profile)):
+        if out is not None and len(out):
+            results[i] = [out]
+    for i, entry in zip(shared, shared_profile or []):
+        profiles[i] = [entry]
+    # Collected in submission order, so the merge is deterministic
+    for future in futures:
+        outs, part_profile = future.result()
+        for i, out in zip(local, outs):
+            if out is not None and len(out):
+                results.setdefault(i, []).append(out)
+        for i, entry in zip(local, part_profile or []):
+            profiles.setdefault(i, []).append(entry)
+    if profile is not None:
+        profile.extend(_merge_profile(profiles[i]) for i in range(len(ruleset.checks)) if i in profiles)
+
+    subjects = pd.Index(pd.factorize(df["SubjectID"], sort=True)[1])
+    frames = [_merge_check(ruleset.checks[i], results[i], subjects) for i in range(len(ruleset.checks)) if i in results]
+    if not frames:
+        return pd.DataFrame(columns=QUERY_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def synthetic_vitals(n_subjects: int, seed: int = 7) -> pd.DataFrame:
+    """Vitals-shaped benchmark data with a few percent of rule violations"""
+    rng = np.random.default_rng(seed)
+    visits = np.array(["Screening", "Day 1", "Week 4", "Week 12"], dtype=object)
+    n = n_subjects * len(visits)
+    subjects = np.repeat([f"RA{1 + i // 1000:03d}-{i % 1000:03d}" for i in range(n_subjects)], len(visits))
+    arms = np.repeat(rng.choice(["Active", "Placebo"], n_subjects), len(visits)).astype(object)
+    df = pd.DataFrame({
+        "SubjectID": subjects,
+        "VisitName": np.tile(visits, n_subjects),
+        "TreatmentArm": arms,
+        "SystolicBP": rng.normal(130, 18, n).round().astype(int),
+        "DiastolicBP": rng.normal(82, 10, n).round().astype(int),
+        "HeartRate": rng.normal(74, 14, n).round().astype(int),
+        "Temperature": rng.normal(36.8, 0.5, n).round(1)
+    })
+    flips = rng.random(n) < 0.01
+    df.loc[flips, "TreatmentArm"] = np.where(df.loc[flips, "TreatmentArm"] == "Active", "Placebo", "Active")
+    dropped = rng.random(n) < 0.01
+    return df[~dropped].reset_index(drop=True)
+
+
+def benchmark_workers(df: pd.DataFrame, ruleset: CompiledRuleset,
+                      worker_counts: Sequence[int] = (1, 2, 4, 8),
+                      repeats: int = 3) -> List[Dict[str, Any]]:
+    """
+    Time serial vs partitioned execution
+
+    Each worker count gets its own pool, warmed up before timing, and the
+    output is compared with the serial result.
+
+    Returns:
+        One dict per worker count: workers, seconds (best of repeats),
+        speedup over the serial run, identical
+    """
+    def best_of(fn):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            out = fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings), out
+
+    serial_seconds, expected = best_of(lambda: ruleset.run(df))
+    results = []
+    for workers in worker_counts:
+        if workers <= 1:
+            seconds, identical = serial_seconds, True
+        else:
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context(START_METHOD)) as pool:
+                run = lambda: run_partitioned(ruleset, df, workers, executor=pool, min_rows=0)
+                run()
+                seconds, out = best_of(run)
+            identical = out.equals(expected)
+        results.append({
+            "workers": workers,
+            "seconds": round(seconds, 4),
+            "speedup": round(serial_seconds / seconds, 2),
+            "identical": identical
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark partitioned edit checks")
+    parser.add_argument("--subjects", type=int, default=100000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--rules", help="YAML rules file (default rules if omitted)")
+    args = parser.parse_args()
+
+    rules_yaml = load_default_rules()
+    if args.rules:
+        with open(args.rules) as f:
+            rules_yaml = f.read()
+    df = synthetic_vitals(args.subjects)
+    print(f"{len(df)} rows, {args.subjects} subjects, {os.cpu_count()} CPUs")
+    for row in benchmark_workers(df, compile_rules(rules_yaml), args.workers, args.repeats):
+        print(f"workers={row['workers']:<3} {row['seconds']:>8.3f}s  "
+              f"speedup={row['speedup']:<5} identical={row['identical']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Query persistence for edit-check violations
+Violations are written to queries and query_history in bulk: one
+transaction, one round trip per batch
+"""
+import os
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+QUERY_INSERT_BATCH_SIZE = int(os.getenv("QUERY_INSERT_BATCH_SIZE", "5000"))
+
+# Edit-check severities have no direct query equivalent; anything not
+# listed maps to "warning"
+SEVERITY_MAP = {
+    "error": "critical",
+    "warning": "warning",
+    "info": "info"
+}
+
+# Column widths from database/init.sql
+_VARCHAR_LIMITS = {"subject_id": 50, "check_id": 50, "field_id": 50, "severity": 20}
+
+# IDs are drawn from the serial sequence up front so they line up with
+# the violations by position
+ALLOCATE_QUERY_IDS_SQL = """
+    SELECT nextval(pg_get_serial_sequence('queries', 'query_id')) AS query_id
+    FROM generate_series(1, $1)
+"""
+
+# Each batch inserts queries and their 'opened' history rows in one statement
+INSERT_QUERIES_SQL = """
+    WITH new_queries AS (
+        INSERT INTO queries (
+            query_id, subject_id, check_id, field_id, query_text,
+            severity, query_type, status, opened_at
+        )
+        SELECT query_id, subject_id, check_id, field_id, query_text, severity, 'auto', 'open', NOW()
+        FROM unnest($1::int[], $2::varchar[], $3::varchar[], $4::varchar[], $5::text[], $6::varchar[])
+            AS v(query_id, subject_id, check_id, field_id, query_text, severity)
+        RETURNING query_id
+    )
+    INSERT INTO query_history (query_id, action, action_at, notes)
+    SELECT query_id, 'opened', NOW(), 'Auto-generated from edit check'
+    FROM new_queries
+"""
+
+CLOSE_QUERIES_SQL = """
+    WITH closed AS (
+        UPDATE queries
+        SET status = 'closed',
+            resolved_at = NOW(),
+            resolution_notes = $2,
+            updated_at = NOW()
+        WHERE query_id = ANY($1::int[]) AND status <> 'closed'
+        RETURNING query_id
+    )
+    INSERT INTO query_history (query_id, action, action_at, notes)
+    SELECT query_id, 'closed', NOW(), $2
+    FROM closed
+"""
+
+
+def _text_column(values: pd.Series, default: str, limit: Optional[int] = None) -> List[str]:
+    out = values.astype(object).where(values.notna(), default).astype(str)
+    if limit:
+        out = out.str.slice(0, limit)
+    return out.tolist()
+
+
+def query_columns(queries_df: pd.DataFrame, check_name: str = "") -> Tuple[List[str], ...]:
+    """
+    Column arrays for INSERT_QUERIES_SQL from an edit-check query frame
+
+    Args:
+        queries_df: Output of CompiledRuleset.run
+        check_name: Prefix of the query text ("<check_name>: <message>")
+
+    Returns:
+        (subject_ids, check_ids, field_ids, query_texts, severities)
+    """
+    severity = queries_df["Severity"].astype(str).str.lower().map(SEVERITY_MAP).fillna("warning")
+    return (
+        _text_column(queries_df["SubjectID"], "UNKNOWN", _VARCHAR_LIMITS["subject_id"]),
+        _text_column(queries_df["CheckID"], "", _VARCHAR_LIMITS["check_id"]),
+        _text_column(queries_df["Field"], "", _VARCHAR_LIMITS["field_id"]),
+        (f"{check_name}: " + queries_df["Message"].astype(str)).tolist(),
+        severity.str.slice(0, _VARCHAR_LIMITS["severity"]).tolist()
+    )
+
+
+async def insert_queries(db, queries_df: pd.DataFrame,
+                         batch_size: int = QUERY_INSERT_BATCH_SIZE) -> List[int]:
+    """
+    Insert violations as open auto queries with their history rows
+
+    All batches share one connection and one transaction, so either every
+    query is created or none is. Each batch allocates its IDs, then runs
+    a single unnest INSERT (queries) chained to the query_history INSERT.
+
+    Args:
+        db: DatabaseConnection with an open pool
+        queries_df: Output of CompiledRuleset.run
+        batch_size: Violations per statement
+
+    Returns:
+        Created query IDs, aligned with the rows of queries_df
+    """
+    if not db.pool:
+        raise RuntimeError("Database not connected")
+    if queries_df.empty:
+        return []
+
+    columns = query_columns(queries_df)
+    query_ids: List[int] = []
+    async with db.pool.acquire() as conn:
+        async with conn.transaction():
+            for start in range(0, len(queries_df), batch_size):
+                batch = [col[start:start + batch_size] for col in columns]
+                ids = [row["query_id"] for row in await conn.fetch(ALLOCATE_QUERY_IDS_SQL, len(batch[0]))]
+                await conn.execute(INSERT_QUERIES_SQL, ids, *batch)
+                query_ids.extend(ids)
+    return query_ids
+
+
+async def close_queries(db, query_ids: List[int], notes: str = "Resolved by edit check re-run",
+                        batch_size: int = QUERY_INSERT_BATCH_SIZE) -> int:
+    """
+    Close open queries and log 'closed' history rows, in one transaction
+
+    Args:
+        db: DatabaseConnection with an open pool
+        query_ids: Queries to close (already closed ones are skipped)
+        notes: Resolution notes
+        batch_size: Queries per statement
+
+    Returns:
+        Number of queries closed
+    """
+    if not db.pool:
+        raise RuntimeError("Database not connected")
+    closed = 0
+    async with db.pool.acquire() as conn:
+        async with conn.transaction():
+            for start in range(0, len(query_ids), batch_size):
+                result = await conn.execute(CLOSE_QUERIES_SQL, query_ids[start:start + batch_size], notes)
+                # asyncpg returns the command tag, e.g. "INSERT 0 42"
+                closed += int(result.split()[-1])
+    return closed
@@ -0,0 +1,146 @@
+"""
+Compiled edit-check rule set cache
+YAML rule sets compiled once (regexes, allowed-value sets, validated
+parameters) and reused, keyed by content hash or by a registered ID
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from edit_checks import CompiledRuleset, compile_rules, load_default_rules
+
+
+def rules_hash(rules_yaml: str) -> str:
+    """Content hash of a YAML rule set"""
+    return hashlib.blake2b(rules_yaml.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class LRUCache:
+    """Small thread-safe LRU mapping with hit/miss counters"""
+
+    def __init__(self, maxsize: int = 8):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
+
+
+class RuleSet:
+    """A compiled rule set with its source hash and optional registered ID"""
+
+    def __init__(self, compiled: CompiledRuleset, content_hash: str, ruleset_id: Optional[str] = None):
+        self.compiled = compiled
+        self.content_hash = content_hash
+        self.ruleset_id = ruleset_id or content_hash
+        self.created_at = datetime.utcnow()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "ruleset_id": self.ruleset_id,
+            "rules_hash": self.content_hash,
+            "total_checks": self.compiled.total_checks,
+            "check_ids": [str(check.id) for check in self.compiled.checks],
+            "created_at": self.created_at.isoformat()
+        }
+
+
+# Anonymous rule sets (looked up by YAML hash) are LRU-evicted;
+# registered rule sets stay until explicitly removed
+ruleset_cache = LRUCache(maxsize=int(os.getenv("RULESET_CACHE_SIZE", "32")))
+_registered: Dict[str, RuleSet] = {}
+_registered_lock = threading.Lock()
+
+
+def get_ruleset(rules_yaml: Optional[str] = None) -> RuleSet:
+    """
+    Compiled rule set for posted YAML (default rules if None)
+
+    Identical YAML maps to the same compiled set, so it is parsed and
+    validated once. Raises ValueError for invalid rules.
+    """
+    rules_yaml = rules_yaml or load_default_rules()
+    content_hash = rules_hash(rules_yaml)
+    ruleset = ruleset_cache.get(content_hash)
+    if ruleset is None:
+        ruleset = RuleSet(compile_rules(rules_yaml), content_hash)
+        ruleset_cache.put(content_hash, ruleset)
+    return ruleset
+
+
+def register_ruleset(rules_yaml: str, ruleset_id: Optional[str] = None) -> RuleSet:
+    """
+    Pin a rule set under an ID (defaults to its YAML hash)
+
+    Args:
+        rules_yaml: YAML string with edit check rules
+        ruleset_id: Optional caller-chosen ID
+
+    Returns:
+        The registered RuleSet
+    """
+    compiled = get_ruleset(rules_yaml)
+    ruleset = compiled if not ruleset_id or ruleset_id == compiled.ruleset_id else \
+        RuleSet(compiled.compiled, compiled.content_hash, ruleset_id)
+    with _registered_lock:
+        _registered[ruleset.ruleset_id] = ruleset
+    return ruleset
+
+
+def resolve_ruleset(ruleset_id: str) -> RuleSet:
+    """Registered rule set by ID (KeyError if unknown)"""
+    with _registered_lock:
+        if ruleset_id not in _registered:
+            raise KeyError(f"Unknown ruleset_id: {ruleset_id}")
+        return _registered[ruleset_id]
+
+
+def unregister_ruleset(ruleset_id: str) -> bool:
+    with _registered_lock:
+        return _registered.pop(ruleset_id, None) is not None
+
+
+def list_rulesets() -> List[Dict[str, Any]]:
+    with _registered_lock:
+        rulesets = list(_registered.values())
+    return [ruleset.describe() for ruleset in rulesets]
+
+
+def ruleset_cache_stats() -> Dict[str, Any]:
+    with _registered_lock:
+        registered = len(_registered)
+    return {"registered": registered, "cache": ruleset_cache.stats()}
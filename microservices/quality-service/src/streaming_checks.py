@@ -0,0 +1,430 @@
+"""
+Streaming edit checks
+Records arrive in chunks (NDJSON or CSV); row-local rules run on each chunk
+as it is parsed and cross-row rules keep compact per-subject/per-key state,
+so violations can be reported long before the upload ends
+"""
+import io
+import json
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from edit_checks import (
+    QUERY_COLUMNS, CheckContext, CompiledRuleset, ConstantWithinSubjectCheck,
+    EditCheck, RequiredVisitsCheck, UniqueComboCheck
+)
+
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "10000"))
+STREAM_FORMATS = ("ndjson", "csv")
+
+_MISSING = object()
+_REPORTED = object()
+
+
+class ConstantWithinSubjectState:
+    """First non-null value per subject; reported on the first different value"""
+
+    row_level = False
+
+    def __init__(self, check: ConstantWithinSubjectCheck):
+        self.check = check
+        self.values: Dict[Any, Any] = {}
+
+    def feed(self, ctx: CheckContext) -> Optional[pd.DataFrame]:
+        field = self.check.field
+        if not ctx.has_subject_id or field not in ctx.df.columns:
+            return None
+        rows = ctx.df[["SubjectID", field]]
+        rows = rows[rows.notna().all(axis=1).to_numpy()]
+        if rows.empty:
+            return None
+        groups = rows.groupby("SubjectID", sort=False)[field]
+        firsts, counts = groups.first(), groups.nunique()
+
+        flagged = []
+        for subject, value, n in zip(firsts.index, firsts.to_numpy(dtype=object), counts.to_numpy()):
+            previous = self.values.get(subject, _MISSING)
+            if previous is _REPORTED:
+                continue
+            if n > 1 or (previous is not _MISSING and previous != value):
+                self.values[subject] = _REPORTED
+                flagged.append(subject)
+            elif previous is _MISSING:
+                self.values[subject] = value
+        return self.check.subject_queries(np.asarray(flagged, dtype=object), field) if flagged else None
+
+    def finish(self) -> Optional[pd.DataFrame]:
+        return None
+
+
+class RequiredVisitsState:
+    """Bitmask of required visits seen per subject; reported at the end"""
+
+    row_level = False
+
+    def __init__(self, check: RequiredVisitsCheck):
+        if len(check.visits) > 62:
+            raise ValueError(f"Rule {check.id} (required_visits): streaming supports at most 62 visits")
+        self.check = check
+        self.masks: Dict[Any, int] = {}
+
+    def feed(self, ctx: CheckContext) -> Optional[pd.DataFrame]:
+        if not ctx.has_subject_id or "VisitName" not in ctx.df.columns:
+            return None
+        keep = ctx.df["SubjectID"].notna().to_numpy()
+        codes = pd.Categorical(ctx.df["VisitName"], categories=self.check.visits).codes[keep]
+        # Bit 0 marks the subject as seen; required visit i is bit i + 1
+        bits = np.left_shift(np.int64(1), codes.astype(np.int64) + 1)
+        pairs = pd.DataFrame({"subject": ctx.subjects[keep], "bit": bits}).drop_duplicates()
+        # Distinct bits, so the sum is the OR
+        chunk_masks = pairs.groupby("subject", sort=False)["bit"].sum()
+        masks = self.masks
+        for subject, mask in zip(chunk_masks.index, chunk_masks.to_numpy()):
+            masks[subject] = masks.get(subject, 0) | int(mask)
+        return None
+
+    def finish(self) -> Optional[pd.DataFrame]:
+        full = (1 << (len(self.check.visits) + 1)) - 1
+        subjects, texts, by_mask = [], [], {}
+        for subject in sorted(self.masks):
+            mask = self.masks[subject] | 1
+            if mask == full:
+                continue
+            if mask not in by_mask:
+                missing = [v for i, v in enumerate(self.check.visits) if not mask & (1 << (i + 1))]
+                by_mask[mask] = f"{self.check.message}: {', '.join(missing)}"
+            subjects.append(subject)
+            texts.append(by_mask[mask])
+        if not subjects:
+            return None
+        return self.check.subject_queries(np.asarray(subjects, dtype=object), "VisitName",
+                                          np.asarray(texts, dtype=object))
+
+
+def _key_hashes(keys: pd.DataFrame) -> np.ndarray:
+    """
+    uint64 hash per row of the key columns, stable across chunks: numeric
+    columns hash as float64 (a chunk may parse a column as int, the next as
+    float) and missing values hash equal, as in duplicated()
+    """
+    columns = {}
+    for field in keys.columns:
+        col = keys[field]
+        if pd.api.types.is_numeric_dtype(col):
+            # + 0.0 folds -0.0 into 0.0; one NaN bit pattern
+            x = pd.to_numeric(col, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan) + 0.0
+            x[np.isnan(x)] = np.nan
+            columns[field] = x
+        else:
+            col = col.astype(object)
+            columns[field] = col.where(col.notna(), None).to_numpy()
+    return pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy()
+
+
+class _KeyIndex:
+    """
+    Key hash -> first row, as sorted numpy levels merged like a binary
+    counter (16-24 bytes per key, O(log n) levels to search)
+    """
+
+    def __init__(self, labels: bool):
+        self.labels = labels
+        # Per level: [hashes (sorted), rows, reported, subject codes, visit codes]
+        self.levels: List[List[np.ndarray]] = []
+        self._codes: Dict[str, Dict[Any, int]] = {"subject": {}, "visit": {}}
+        self._values: Dict[str, List[Any]] = {"subject": [], "visit": []}
+
+    def __len__(self) -> int:
+        return sum(len(level[0]) for level in self.levels)
+
+    def lookup(self, hashes: np.ndarray):
+        """(level, position) per hash; level -1 when unseen"""
+        level = np.full(len(hashes), -1, dtype=np.int64)
+        position = np.zeros(len(hashes), dtype=np.int64)
+        for i, (keys, *_) in enumerate(self.levels):
+            pos = np.minimum(np.searchsorted(keys, hashes), len(keys) - 1)
+            found = (level < 0) & (keys[pos] == hashes)
+            level[found] = i
+            position[found] = pos[found]
+        return level, position
+
+    def encode(self, kind: str, values: np.ndarray) -> np.ndarray:
+        """Interned codes of subject/visit labels (distinct labels only)"""
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        table, known = self._codes[kind], self._values[kind]
+        mapping = np.empty(len(uniques), dtype=np.int64)
+        for i, value in enumerate(uniques):
+            code = table.get(value)
+            if code is None:
+                code = table[value] = len(known)
+                known.append(value)
+            mapping[i] = code
+        return mapping[codes]
+
+    def decode(self, kind: str, codes: np.ndarray) -> np.ndarray:
+        return np.asarray(self._values[kind], dtype=object)[codes] if len(codes) else np.empty(0, dtype=object)
+
+    def add(self, hashes: np.ndarray, rows: np.ndarray, reported: np.ndarray,
+            subjects: Optional[np.ndarray], visits: Optional[np.ndarray]):
+        if not len(hashes):
+            return
+        subject_codes = self.encode("subject", subjects) if self.labels else np.empty(0, dtype=np.int64)
+        visit_codes = self.encode("visit", visits) if self.labels else np.empty(0, dtype=np.int64)
+        order = np.argsort(hashes, kind="stable")
+        level = [hashes[order], rows[order], reported[order],
+                 subject_codes[order] if self.labels else subject_codes,
+                 visit_codes[order] if self.labels else visit_codes]
+        self.levels.append(level)
+        while len(self.levels) >= 2 and len(self.levels[-2][0]) <= 2 * len(self.levels[-1][0]):
+            upper, lower = self.levels.pop(), self.levels.pop()
+            merged = [np.concatenate([a, b]) for a, b in zip(lower, upper)]
+            order = np.argsort(merged[0], kind="stable")
+            self.levels.append([a[order] if len(a) else a for a in merged])
+
+
+class UniqueComboState:
+    """
+    First row per key; on a repeat both rows are reported (the first one
+    only once). Keys are kept as 64-bit hashes in a _KeyIndex and each chunk
+    is checked with duplicated/isin-style array operations. The first row's
+    SubjectID/VisitName come from the repeat row when they are part of the
+    key (the default VS012 keeps nothing else per key); otherwise they are
+    stored as interned codes.
+    """
+
+    row_level = True
+
+    def __init__(self, check: UniqueComboCheck):
+        self.check = check
+        fields = check.fields
+        self.subject_in_key = "SubjectID" in fields
+        self.visit_in_key = "VisitName" in fields
+        self.seen = _KeyIndex(labels=not (self.subject_in_key and self.visit_in_key))
+
+    def feed(self, ctx: CheckContext) -> Optional[pd.DataFrame]:
+        fields = self.check.fields
+        if not all(f in ctx.df.columns for f in fields) or ctx.n == 0:
+            return None
+        hashes = _key_hashes(ctx.df[fields])
+        rows, subjects, visits = np.asarray(ctx.row_ids), ctx.subjects, ctx.visits
+
+        # Keys within the chunk: first occurrence, second occurrence, count
+        codes, uniques = pd.factorize(hashes)
+        n_keys = len(uniques)
+        count = np.bincount(codes, minlength=n_keys)
+        first = np.full(n_keys, len(codes), dtype=np.int64)
+        np.minimum.at(first, codes, np.arange(len(codes)))
+        later = np.where(np.arange(len(codes)) == first[codes], len(codes), np.arange(len(codes)))
+        second = np.full(n_keys, len(codes), dtype=np.int64)
+        np.minimum.at(second, codes, later)
+
+        level, position = self.seen.lookup(uniques)
+        known = level >= 0
+        reported = np.zeros(n_keys, dtype=bool)
+        for i, state in enumerate(self.seen.levels):
+            at = level == i
+            reported[at] = state[2][position[at]]
+
+        # Every row of a known key or a key repeated within the chunk; the
+        # chunk's first row of a new repeated key sorts just before its repeat
+        hit = known[codes] | (count[codes] > 1)
+        pos = np.flatnonzero(hit)
+        sort_pos = pos.copy()
+        head = ~known[codes[pos]] & (pos == first[codes[pos]])
+        sort_pos[head] = second[codes[pos[head]]]
+        out_rows, out_subjects, out_visits = rows[pos], subjects[pos], visits[pos]
+        out_sort, out_tie = sort_pos, np.ones(len(pos), dtype=np.int8)
+
+        # Earlier first rows not reported yet, just before their first repeat
+        earlier = np.flatnonzero(known & ~reported)
+        if len(earlier):
+            trigger = first[earlier]
+            prior_rows = np.empty(len(earlier), dtype=np.int64)
+            prior_subjects = subjects[trigger].astype(object)
+            prior_visits = visits[trigger].astype(object)
+            for i, state in enumerate(self.seen.levels):
+                at = level[earlier] == i
+                p = position[earlier][at]
+                prior_rows[at] = state[1][p]
+                state[2][p] = True
+                if not self.subject_in_key:
+                    prior_subjects[at] = self.seen.decode("subject", state[3][p])
+                if not self.visit_in_key:
+                    prior_visits[at] = self.seen.decode("visit", state[4][p])
+            out_rows = np.concatenate([out_rows, prior_rows])
+            out_subjects = np.concatenate([np.asarray(out_subjects, dtype=object), prior_subjects])
+            out_visits = np.concatenate([np.asarray(out_visits, dtype=object), prior_visits])
+            out_sort = np.concatenate([out_sort, trigger])
+            out_tie = np.concatenate([out_tie, np.zeros(len(earlier), dtype=np.int8)])
+
+        new = np.flatnonzero(~known)
+        at = first[new]
+        self.seen.add(uniques[new], rows[at].astype(np.int64), count[new] > 1,
+                      subjects[at], visits[at])
+        if not len(out_rows):
+            return None
+
+        order = np.lexsort((out_tie, out_sort))
+        n = len(order)
+        return pd.DataFrame({
+            "CheckID": np.full(n, self.check.id, dtype=object),
+            "Severity": np.full(n, self.check.severity, dtype=object),
+            "Message": np.full(n, self.check.message, dtype=object),
+            "SubjectID": np.asarray(out_subjects, dtype=object)[order],
+            "VisitName": np.asarray(out_visits, dtype=object)[order],
+            "Field": np.full(n, "+".join(fields), dtype=object),
+            "Value": np.full(n, "", dtype=object)
+        }, index=np.asarray(out_rows, dtype=np.int64)[order])
+
+    def finish(self) -> Optional[pd.DataFrame]:
+        return None
+
+
+# Cross-row check type -> streaming state
+STREAM_STATES: Dict[type, type] = {
+    ConstantWithinSubjectCheck: ConstantWithinSubjectState,
+    RequiredVisitsCheck: RequiredVisitsState,
+    UniqueComboCheck: UniqueComboState
+}
+
+
+class StreamingCheckRunner:
+    """
+    Incremental evaluation of a compiled rule set over record chunks
+
+    Violations come back with a Row column (position in the stream; None
+    for subject-level queries). Together they match CompiledRuleset.run on
+    the concatenated data, in discovery order rather than check order.
+    """
+
+    def __init__(self, ruleset: CompiledRuleset):
+        self.ruleset = ruleset
+        self.row_checks: List[EditCheck] = [c for c in ruleset.checks if c.row_local]
+        self.states = []
+        for check in ruleset.checks:
+            if check.row_local:
+                continue
+            state_cls = STREAM_STATES.get(type(check))
+            if state_cls is None:
+                raise ValueError(f"Rule {check.id} ({check.type}) cannot run in streaming mode")
+            self.states.append(state_cls(check))
+        self.rows = 0
+        self.violations = 0
+        self.by_check: Dict[str, int] = {}
+
+    def _collect(self, frames: List[Optional[pd.DataFrame]], row_level: bool) -> pd.DataFrame:
+        frames = [f for f in frames if f is not None and len(f)]
+        if not frames:
+            return pd.DataFrame(columns=QUERY_COLUMNS + ["Row"])
+        out = pd.concat(frames)
+        out["Row"] = out.index.to_numpy() if row_level else None
+        out = out.reset_index(drop=True)
+        self.violations += len(out)
+        for check_id, n in out["CheckID"].astype(str).value_counts(sort=False).items():
+            self.by_check[check_id] = self.by_check.get(check_id, 0) + int(n)
+        return out
+
+    def feed(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Check the next chunk of records
+
+        Args:
+            chunk: Records following the previous chunk
+
+        Returns:
+            Violations found so far in this chunk (row-level and any
+            cross-row violations the chunk completes)
+        """
+        if chunk.empty:
+            return self._collect([], True)
+        ctx = CheckContext(chunk.reset_index(drop=True), np.arange(self.rows, self.rows + len(chunk)))
+        self.rows += len(chunk)
+        row_frames = [check.evaluate(ctx) for check in self.row_checks]
+        subject_frames = []
+        for state in self.states:
+            (row_frames if state.row_level else subject_frames).append(state.feed(ctx))
+        rows = self._collect(row_frames, row_level=True)
+        subjects = self._collect(subject_frames, row_level=False)
+        return pd.concat([rows, subjects], ignore_index=True) if len(subjects) else rows
+
+    def finish(self) -> pd.DataFrame:
+        """Violations only known at the end of the stream (missing visits)"""
+        return self._collect([state.finish() for state in self.states], row_level=False)
+
+    def summary(self) -> Dict[str, Any]:
+        total_checks = self.ruleset.total_checks
+        if total_checks > 0 and self.rows > 0:
+            quality_score = max(0.0, (self.rows * total_checks - self.violations) / (self.rows * total_checks))
+        else:
+            quality_score = 1.0
+        return {
+            "total_records": self.rows,
+            "total_checks": total_checks,
+            "violations": self.violations,
+            "by_check": self.by_check,
+            "quality_score": round(quality_score, 2),
+            "passed": self.violations == 0
+        }
+
+
+def parse_ndjson(lines: List[bytes]) -> pd.DataFrame:
+    """One JSON object per line (blank lines skipped)"""
+    records = []
+    for line in lines:
+        if line.strip():
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("NDJSON lines must be JSON objects")
+            records.append(record)
+    return pd.DataFrame(records)
+
+
+def parse_csv(header: bytes, lines: List[bytes]) -> pd.DataFrame:
+    """CSV rows under the upload's header line (one record per line)"""
+    body = b"\n".join(line for line in lines if line.strip())
+    if not body:
+        return pd.DataFrame()
+    return pd.read_csv(io.BytesIO(header + b"\n" + body))
+
+
+async def record_chunks(stream: AsyncIterator[bytes], fmt: str,
+                        chunk_rows: int = STREAM_CHUNK_ROWS) -> AsyncIterator[pd.DataFrame]:
+    """
+    Parse an uploaded byte stream into DataFrames of up to chunk_rows records
+
+    Args:
+        stream: Request body chunks
+        fmt: "ndjson" or "csv" (first line is the header)
+        chunk_rows: Records per DataFrame
+    """
+    header: Optional[bytes] = None
+    pending: List[bytes] = []
+    buffer = b""
+
+    def parse(lines: List[bytes]) -> pd.DataFrame:
+        return parse_csv(header, lines) if fmt == "csv" else parse_ndjson(lines)
+
+    async for data in stream:
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line = line.rstrip(b"\r")
+            if fmt == "csv" and header is None:
+                header = line
+                continue
+            pending.append(line)
+        while len(pending) >= chunk_rows:
+            chunk, pending = pending[:chunk_rows], pending[chunk_rows:]
+            yield parse(chunk)
+
+    tail = buffer.rstrip(b"\r")
+    if tail.strip():
+        if fmt == "csv" and header is None:
+            header = tail
+        else:
+            pending.append(tail)
+    if pending and (fmt != "csv" or header is not None):
+        yield parse(pending)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Check that service copies of shared modules match microservices/shared
+
+Each service image is built from its own directory, so shared modules are
+copied into the service's src/. Exits non-zero (with a diff) when a copy
+has drifted from the canonical module.
+
+Usage: python scripts/check_shared_modules.py
+"""
+import difflib
+import sys
+from pathlib import Path
+
+MICROSERVICES = Path(__file__).resolve().parent.parent / "microservices"
+
+# Module in microservices/shared -> services that ship a copy
+SHARED_MODULES = {
+    "neighbors.py": ["analytics-service", "linkup-integration-service"],
+}
+
+
+def main() -> int:
+    drifted = 0
+    for module, services in SHARED_MODULES.items():
+        canonical = MICROSERVICES / "shared" / module
+        expected = canonical.read_text().splitlines(keepends=True)
+        for service in services:
+            copy = MICROSERVICES / service / "src" / module
+            actual = copy.read_text().splitlines(keepends=True) if copy.exists() else []
+            if actual != expected:
+                drifted += 1
+                print(f"DRIFT: {copy.relative_to(MICROSERVICES.parent)} differs from "
+                      f"{canonical.relative_to(MICROSERVICES.parent)}")
+                sys.stdout.writelines(difflib.unified_diff(
+                    expected, actual, str(canonical.relative_to(MICROSERVICES.parent)),
+                    str(copy.relative_to(MICROSERVICES.parent))
+                ))
+    if drifted:
+        print(f"{drifted} shared module cop{'y' if drifted == 1 else 'ies'} out of sync; "
+              "edit microservices/shared and copy the module into each service")
+        return 1
+    print("Shared modules in sync")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())